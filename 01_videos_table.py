@@ -1,60 +1,157 @@
 import os
 import csv
-import google_auth_oauthlib.flow
-import googleapiclient.discovery
-from google.oauth2.credentials import Credentials
+import json
+import clients
+import metrics
+from datetime import datetime, timezone
+from pipeline_state import write_json_atomic
+from video_catalog import CSV_COLUMNS, CSV_PATH, PLACEHOLDER_FILE_NAME
 
 # Configuração
-MAX_VIDEOS = 30
+PAGE_SIZE = 50  # Máximo de itens por página aceito por playlistItems.list
+FULL_SYNC = False  # True percorre toda a playlist mesmo ao encontrar vídeos já conhecidos
+SYNC_STATE_FILE = os.path.join("YouTube_Data", "videos_table_sync.json")  # Marca a última leitura completa da playlist
 SCOPES = ["https://www.googleapis.com/auth/youtube.readonly"]
 
+def iter_playlist_pages(youtube, playlist_id, page_size=PAGE_SIZE):
+    """Percorre a playlist página a página seguindo nextPageToken"""
+    page_token = None
+    while True:
+        response = youtube.playlistItems().list(
+            part="snippet",
+            playlistId=playlist_id,
+            maxResults=page_size,
+            pageToken=page_token,
+            fields="nextPageToken,items(snippet(title,resourceId/videoId))"
+        ).execute()
+        yield response.get("items", [])
+        
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            return
+
+def load_existing_table(csv_path=CSV_PATH):
+    """Carrega CSV existente preservando colunas editadas manualmente"""
+    if not os.path.exists(csv_path):
+        return {}, list(CSV_COLUMNS)
+    
+    with open(csv_path, "r", newline="", encoding="utf-8") as csvfile:
+        reader = csv.DictReader(csvfile)
+        # Mantém colunas extras adicionadas pelo usuário
+        fieldnames = list(CSV_COLUMNS) + [name for name in (reader.fieldnames or []) if name not in CSV_COLUMNS]
+        rows = {row["video_id"]: row for row in reader}
+    return rows, fieldnames
+
+def load_sync_state(path=SYNC_STATE_FILE):
+    """Marca da última sincronização completa ({} se nunca houve uma)"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except json.JSONDecodeError:
+        return {}
+
+def needs_full_sync(sync_state, playlist_id):
+    """Leitura completa se configurada ou se a playlist nunca foi percorrida até o fim
+
+    Um CSV criado antes da sincronização incremental (limitado aos 30
+    vídeos mais recentes) não tem marca: a primeira execução busca os
+    vídeos antigos em vez de parar na primeira página conhecida.
+    """
+    return FULL_SYNC or sync_state.get("playlist_id") != playlist_id or not sync_state.get("full_sync_at")
+
+def sync_videos(youtube, playlist_id, existing_rows, full_sync=FULL_SYNC):
+    """Adiciona vídeos novos e atualiza títulos dos conhecidos
+    
+    A playlist de uploads vem do mais recente para o mais antigo, então a
+    leitura para na primeira página que contém um vídeo já presente no CSV.
+    Retorna (linhas combinadas, novos, páginas lidas, playlist lida até o fim).
+    """
+    rows = dict(existing_rows)
+    new_count = 0
+    pages = 0
+    
+    for items in iter_playlist_pages(youtube, playlist_id):
+        pages += 1
+        reached_known = False
+        
+        for item in items:
+            video_id = item["snippet"]["resourceId"]["videoId"]
+            video_title = item["snippet"]["title"]
+            
+            if video_id in rows:
+                # Atualiza apenas o título; colunas manuais são preservadas
+                rows[video_id]["video_title"] = video_title
+                reached_known = True
+            else:
+                rows[video_id] = {
+                    "video_id": video_id,
+                    "video_title": video_title,
+                    "file_name": PLACEHOLDER_FILE_NAME,
+                    "file_type": "pdf",
+                    "reference_link": ""
+                }
+                new_count += 1
+        
+        print(f"  📄 Página {pages}: {len(items)} vídeos")
+        if reached_known and not full_sync:
+            print("  ⏹️  Vídeos já conhecidos encontrados, encerrando leitura")
+            return rows, new_count, pages, False
+    
+    return rows, new_count, pages, True
+
+def save_table(rows, fieldnames, csv_path=CSV_PATH):
+    """Salva CSV de forma atômica (arquivo temporário + rename)"""
+    os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+    
+    # Ordenar por título alfabeticamente
+    ordered = sorted(rows.values(), key=lambda row: row["video_title"])
+    
+    temp_path = csv_path + ".tmp"
+    with open(temp_path, "w", newline="", encoding="utf-8") as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames, restval="")
+        writer.writeheader()
+        writer.writerows(ordered)
+    os.replace(temp_path, csv_path)
+
 def main():
-    # Autenticação
-    if os.path.exists("token.json"):
-        creds = Credentials.from_authorized_user_file("token.json", scopes=SCOPES)
-    else:
-        flow = google_auth_oauthlib.flow.InstalledAppFlow.from_client_secrets_file(
-            "client_secret.json", SCOPES)
-        creds = flow.run_local_server(port=0)
-        with open("token.json", "w") as token:
-            token.write(creds.to_json())
-
-    youtube = googleapiclient.discovery.build("youtube", "v3", credentials=creds)
+    # Autenticação (token reutilizado e documento de descoberta em cache)
+    youtube = clients.build_youtube_client(scopes=SCOPES)
 
     # Obter playlist de uploads
     channel_request = youtube.channels().list(part="contentDetails", mine=True)
     channel_response = channel_request.execute()
     uploads_playlist_id = channel_response["items"][0]["contentDetails"]["relatedPlaylists"]["uploads"]
 
-    # Obter vídeos recentes
-    videos_request = youtube.playlistItems().list(
-        part="snippet",
-        playlistId=uploads_playlist_id,
-        maxResults=MAX_VIDEOS
-    )
-    videos_response = videos_request.execute()
-
-    # Preparar dados
-    videos_data = []
-    for item in videos_response["items"]:
-        video_id = item["snippet"]["resourceId"]["videoId"]
-        video_title = item["snippet"]["title"]
-        videos_data.append([video_id, video_title, "ADICIONAR_NOME_ARQUIVO_MANUALMENTE", "pdf", ""])
+    # Carrega tabela existente para sincronização incremental
+    existing_rows, fieldnames = load_existing_table()
+    print(f"Vídeos já na tabela: {len(existing_rows)}")
 
-    # Ordenar por título alfabeticamente
-    videos_data.sort(key=lambda x: x[1])
+    sync_state = load_sync_state()
+    full_sync = needs_full_sync(sync_state, uploads_playlist_id)
+    if full_sync:
+        print("🔄 Sincronização completa (sem leitura completa anterior registrada ou FULL_SYNC ativo)")
+
+    # Obter vídeos com paginação
+    with metrics.timer("stage_seconds", stage="sync_playlist"):
+        rows, new_count, pages, complete = sync_videos(youtube, uploads_playlist_id, existing_rows, full_sync)
 
     # Salvar CSV
-    os.makedirs("YouTube_Data", exist_ok=True)
-    csv_path = os.path.join("YouTube_Data", "videos_table.csv")
-    
-    with open(csv_path, "w", newline="", encoding="utf-8") as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow(["video_id", "video_title", "file_name", "file_type", "reference_link"])
-        writer.writerows(videos_data)
+    save_table(rows, fieldnames)
+    if complete:
+        # Só depois do CSV gravado: uma leitura interrompida é refeita por completo na próxima execução
+        write_json_atomic(SYNC_STATE_FILE, {
+            "playlist_id": uploads_playlist_id,
+            "full_sync_at": datetime.now(timezone.utc).isoformat(),
+            "videos": len(rows)
+        }, indent=2)
     
-    print(f"CSV salvo em: {csv_path}")
-    print(f"Total de vídeos: {len(videos_data)}")
+    print(f"CSV salvo em: {CSV_PATH}")
+    print(f"Páginas consultadas: {pages}")
+    print(f"Vídeos novos: {new_count}")
+    print(f"Total de vídeos: {len(rows)}")
+    metrics.write_report("01_videos_table")
 
 if __name__ == "__main__":
     main()
@@ -1,88 +1,132 @@
-import csv
-import boto3
-import google.auth
-import google_auth_oauthlib.flow
-import googleapiclient.discovery
-from google.oauth2.credentials import Credentials
-from botocore.exceptions import ClientError
-import os
+import asyncio
+import clients
+import metrics
+from s3_inventory import S3Inventory
+from video_catalog import load_video_data
 
 # Configurações
 S3_BUCKET = "randon-bucket-name"
 SCOPES = ["https://www.googleapis.com/auth/youtube.readonly"]
+YOUTUBE_BATCH_SIZE = 50  # Máximo de IDs aceitos por chamada videos.list
+YOUTUBE_LIST_QUOTA_COST = 1  # Unidades de quota por chamada videos.list
 
 def setup_youtube_client():
-    """Configura cliente YouTube Data API"""
-    if os.path.exists("token.json"):
-        creds = Credentials.from_authorized_user_file("token.json", scopes=SCOPES)
-    else:
-        flow = google_auth_oauthlib.flow.InstalledAppFlow.from_client_secrets_file(
-            "client_secret.json", SCOPES)
-        creds = flow.run_local_server(port=0)
-        with open("token.json", "w") as token:
-            token.write(creds.to_json())
-    
-    return googleapiclient.discovery.build("youtube", "v3", credentials=creds)
+    """Configura cliente YouTube Data API (um por thread, reutilizado)"""
+    return clients.youtube_client(scopes=SCOPES)
 
-def load_video_data():
-    """Carrega dados dos vídeos do CSV"""
-    videos = []
-    with open("YouTube_Data/videos_table.csv", "r", encoding="utf-8") as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            if row["file_name"] != "ADICIONAR_NOME_ARQUIVO_MANUALMENTE":
-                videos.append({
-                    "video_id": row["video_id"],
-                    "video_title": row["video_title"],
-                    "file_name": row["file_name"],
-                    "file_type": row.get("file_type", "pdf")  # Default para PDF se não especificado
-                })
-    return videos
+def get_file_key(video):
+    """Mapeia file_type para extensão correta"""
+    file_type = video["file_type"].lower()
+    if file_type in ["pdf", "doc", "docx", "html", "txt", "md"]:
+        return video["file_name"].replace(".mp4", f".{file_type}")
+    return video["file_name"].replace(".mp4", ".pdf")  # Default para PDF
 
-def check_pdfs_in_s3(videos):
-    """Verifica se arquivos existem no S3"""
-    s3 = boto3.client("s3")
+def check_pdfs_in_s3(videos, s3=None):
+    """Verifica se arquivos existem no S3 com uma única listagem paginada"""
+    if s3 is None:
+        s3 = clients.s3_client()
     missing_files = []
     found_files = []
     
-    for video in videos:
-        # Mapeia file_type para extensão correta
-        file_type = video["file_type"].lower()
-        if file_type in ["pdf", "doc", "docx", "html", "txt", "md"]:
-            file_name = video["file_name"].replace(".mp4", f".{file_type}")
-        else:
-            file_name = video["file_name"].replace(".mp4", ".pdf")  # Default para PDF
-            
-        try:
-            s3.head_object(Bucket=S3_BUCKET, Key=file_name)
+    file_names = [get_file_key(video) for video in videos]
+    inventory = S3Inventory.for_keys(s3, S3_BUCKET, file_names)
+    print(f"  📦 Índice S3: {len(inventory)} objetos em {inventory.list_requests} requisição(ões) de listagem")
+    
+    for file_name in file_names:
+        if inventory.exists(file_name):
             found_files.append(file_name)
-        except ClientError:
+        else:
             missing_files.append(file_name)
     
     return found_files, missing_files
 
-def check_videos_in_youtube(videos):
-    """Verifica se vídeos existem no YouTube usando video_id"""
-    youtube = setup_youtube_client()
-    missing_videos = []
-    found_videos = []
+def chunked(items, size):
+    """Divide uma lista em blocos de tamanho máximo 'size'"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def list_existing_ids(youtube, batch):
+    """IDs do lote que existem no YouTube (uma chamada videos.list)"""
+    video_response = youtube.videos().list(
+        part="id",
+        id=",".join(batch)
+    ).execute()
+    return {item["id"] for item in video_response.get("items", [])}
+
+def split_videos(videos, existing_ids):
+    """Separa os file_name dos vídeos em encontrados e faltando"""
+    found_videos = [video["file_name"] for video in videos if video["video_id"] in existing_ids]
+    missing_videos = [video["file_name"] for video in videos if video["video_id"] not in existing_ids]
+    return found_videos, missing_videos
+
+def check_videos_in_youtube(videos, youtube=None):
+    """Verifica se vídeos existem no YouTube usando video_id
     
-    for video in videos:
+    Os IDs são consultados em lotes de YOUTUBE_BATCH_SIZE por chamada.
+    Retorna (encontrados, faltando, uso) onde uso contém requisições e quota.
+    """
+    if youtube is None:
+        youtube = setup_youtube_client()
+    usage = {"requests": 0, "quota_units": 0}
+    
+    # Remove IDs duplicados mantendo a ordem
+    unique_ids = list(dict.fromkeys(video["video_id"] for video in videos))
+    existing_ids = set()
+    
+    for batch in chunked(unique_ids, YOUTUBE_BATCH_SIZE):
         try:
-            video_request = youtube.videos().list(
-                part="snippet",
-                id=video["video_id"]
-            )
-            video_response = video_request.execute()
-            
-            if video_response["items"]:
-                found_videos.append(video["file_name"])
-            else:
-                missing_videos.append(video["file_name"])
-        except:
-            missing_videos.append(video["file_name"])
+            usage["requests"] += 1
+            usage["quota_units"] += YOUTUBE_LIST_QUOTA_COST
+            existing_ids.update(list_existing_ids(youtube, batch))
+        except Exception as e:
+            # Falha no lote: os vídeos do lote são considerados faltando
+            print(f"  ⚠️  Erro ao consultar lote de {len(batch)} vídeos: {e}")
+    
+    return (*split_videos(videos, existing_ids), usage)
+
+async def check_videos_in_youtube_async(videos, youtube):
+    """Como check_videos_in_youtube, com todos os lotes consultados ao mesmo tempo
+    
+    youtube é um clients.AsyncClient: cada lote é uma corrotina executada no
+    pool de threads do cliente, sem uma thread nova por requisição.
+    """
+    unique_ids = list(dict.fromkeys(video["video_id"] for video in videos))
+    batches = list(chunked(unique_ids, YOUTUBE_BATCH_SIZE))
+    usage = {"requests": len(batches), "quota_units": len(batches) * YOUTUBE_LIST_QUOTA_COST}
+    existing_ids = set()
+    
+    with metrics.timer("stage_seconds", stage="validate_youtube"):
+        results = await asyncio.gather(
+            *(youtube.run(lambda client, batch=batch: list_existing_ids(client, batch)) for batch in batches),
+            return_exceptions=True
+        )
+    for batch, result in zip(batches, results):
+        if isinstance(result, Exception):
+            # Falha no lote: os vídeos do lote são considerados faltando
+            print(f"  ⚠️  Erro ao consultar lote de {len(batch)} vídeos: {result}")
+        else:
+            existing_ids.update(result)
     
-    return found_videos, missing_videos
+    return (*split_videos(videos, existing_ids), usage)
+
+def timed(stage, function, *args):
+    """Executa function(*args) registrando a duração da etapa"""
+    with metrics.timer("stage_seconds", stage=stage):
+        return function(*args)
+
+async def validate_resources(videos, s3=None, youtube=None):
+    """Executa as verificações do S3 e do YouTube ao mesmo tempo
+    
+    Usa os clientes assíncronos de clients (pools de threads limitados ao
+    pool de conexões); s3 e youtube permitem injetar outros AsyncClient.
+    """
+    s3 = s3 or clients.async_s3_client()
+    youtube = youtube or clients.async_youtube_client(scopes=SCOPES)
+    async with s3, youtube:
+        return await asyncio.gather(
+            s3.run(lambda client: timed("validate_s3", check_pdfs_in_s3, videos, client)),
+            check_videos_in_youtube_async(videos, youtube)
+        )
 
 def main():
     print("=== Validação de Arquivos ===\n")
@@ -98,10 +142,11 @@ def main():
     
     print(f"Vídeos com file_name preenchido: {len(videos)}\n")
     
-    # Verifica arquivos no S3
-    print("Verificando arquivos no S3...")
-    found_files, missing_files = check_pdfs_in_s3(videos)
+    # Verifica arquivos no S3 e vídeos no YouTube simultaneamente
+    print("Verificando arquivos no S3 e vídeos no YouTube...")
+    (found_files, missing_files), (found_videos, missing_videos, youtube_usage) = asyncio.run(validate_resources(videos))
     
+    print("\nArquivos no S3:")
     if found_files:
         print("✓ Arquivos encontrados:")
         for file in sorted(found_files):
@@ -112,10 +157,7 @@ def main():
         for file in sorted(missing_files):
             print(f"  - {file}")
     
-    # Verifica vídeos no YouTube
-    print("\nVerificando vídeos no YouTube...")
-    found_videos, missing_videos = check_videos_in_youtube(videos)
-    
+    print("\nVídeos no YouTube:")
     if found_videos:
         print("✓ Vídeos encontrados:")
         for video in sorted(found_videos):
@@ -130,11 +172,14 @@ def main():
     print(f"\n=== Resumo ===")
     print(f"Arquivos: {len(found_files)} encontrados, {len(missing_files)} faltando")
     print(f"Vídeos: {len(found_videos)} encontrados, {len(missing_videos)} faltando")
+    print(f"YouTube API: {youtube_usage['requests']} requisições, {youtube_usage['quota_units']} unidades de quota")
     
     if not missing_files and not missing_videos:
         print("\n✅ Todos os arquivos estão disponíveis!")
     else:
         print("\n⚠️  Alguns arquivos estão faltando.")
+    
+    metrics.write_report("02_validate_files")
 
 if __name__ == "__main__":
     main()
@@ -1,44 +1,174 @@
-import csv
+import copy
+import hashlib
 import json
-import boto3
-import os
 import time
-from datetime import datetime, timedelta
+import batch_inference
+import clients
+import metadata_schema
+import metrics
 from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from document_fingerprint import FingerprintIndex
+from document_preparation import prepare_document
+from incremental_json import IncrementalJsonValidator, StreamValidationError
+from pipeline_state import FAILED, GENERATED, PENDING, UPLOADED, PipelineState
+from rate_limiter import AdaptiveRateLimiter, call_with_retry
+from response_cache import ResponseCache
+from s3_inventory import S3Inventory
+from video_catalog import VideoCatalog, load_video_data
 
 # Configurações
 S3_BUCKET = "randon-bucket-name"
 PROMPT_ARN = "arn:aws:bedrock:us-east-1:471112955224:prompt/RR77CDGDJM"
 REGION = "us-east-1"
+METADATA_FILE = "YouTube_Data/generated_metadata.json"
 
 # Configurações de agendamento
 START_DATE = "2025-12-15"  # Data inicial no formato YYYY-MM-DD
 INTERVAL_DAYS = 1  # Intervalo entre publicações (1=diário, 7=semanal)
 
-def load_video_data():
-    """Carrega dados dos vídeos do CSV"""
-    videos = []
-    with open("YouTube_Data/videos_table.csv", "r", encoding="utf-8") as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            if row["file_name"] != "ADICIONAR_NOME_ARQUIVO_MANUALMENTE":
-                videos.append({
-                    "video_id": row["video_id"],
-                    "video_title": row["video_title"],
-                    "file_name": row["file_name"],
-                    "file_type": row.get("file_type", "pdf").lower(),  # Normaliza para minúsculo
-                    "reference_link": row.get("reference_link", "").strip()  # Link opcional
-                })
-    return videos
-
-def generate_metadata_with_bedrock(bedrock_client, file_s3_key, file_type, video_title, video_id, scheduled_date, reference_link=""):
-    """Gera metadados usando AWS Bedrock com document via S3"""
+# Seleção de vídeos no catálogo
+GENERATION_STATUSES = [None, PENDING, FAILED]  # Status sempre gerados (None = vídeo ainda sem status)
+PENDING_ONLY = False  # True consulta só GENERATION_STATUSES (mais rápido; não detecta documento/prompt alterados nem reagenda datas)
+
+# Configurações de concorrência
+MAX_WORKERS = 4  # Chamadas simultâneas ao Bedrock (1 = sequencial)
+
+# Modo de geração
+GENERATION_MODE = "on_demand"  # "on_demand" (converse por vídeo) ou "batch" (Bedrock Batch Inference, ver batch_inference.py)
+STREAM_RESPONSES = True  # No modo on_demand usa converse_stream e valida o JSON enquanto os tokens chegam
+
+# Saída estruturada (toolConfig com o esquema de metadata_schema.py) e reparo de campos
+STRUCTURED_OUTPUT = True  # Resposta como entrada de ferramenta com esquema JSON em vez de JSON em texto
+STRUCTURED_MODEL_ID = None  # None usa o modelo do prompt (PROMPT_ARN); um ID substitui só o modelo, mantendo o inferenceConfig do prompt
+REPAIR_FIELDS = True  # Campos inválidos são corrigidos com uma chamada curta em vez de descartar a geração
+REPAIR_MODEL_ID = "amazon.nova-lite-v1:0"  # Reparos recebem só os metadados, sem o documento
+REPAIR_MAX_TOKENS = 2048
+ESTIMATED_TOKENS_PER_REPAIR = 4000
+REPAIR_TOOL_NAME = "repair_youtube_metadata"
+REPAIR_INSTRUCTIONS = (
+    "You fix invalid fields of YouTube video metadata. Return only the listed fields through the tool, "
+    "keeping the meaning, tone and language of the current metadata. Titles have at most 100 characters, "
+    "descriptions at most 5000 bytes, no '<' or '>' characters, and all tags together at most 500 characters. "
+    "localizations.<code> holds the title and description translated into that language code; "
+    "keep AWS service names in English."
+)
+
+# Traduções em paralelo (requer STRUCTURED_OUTPUT; o modo em lote sempre gera tudo em uma resposta)
+LOCALIZATION_MODE = "single"  # "single" (tudo em uma resposta, como no prompt) ou "parallel" (documento gera só o inglês; uma tradução por idioma em paralelo)
+TRANSLATION_MODEL_ID = None  # Traduz o texto em inglês, sem o documento; None usa o mesmo modelo da geração (o do prompt)
+TRANSLATION_WORKERS = 8  # Traduções simultâneas por vídeo
+TRANSLATION_MAX_TOKENS = 2048
+TRANSLATION_REQUESTS_PER_MINUTE = 200  # Quota do modelo de tradução (separada da geração)
+TRANSLATION_TOKENS_PER_MINUTE = 400000
+ESTIMATED_TOKENS_PER_TRANSLATION = 1500
+TRANSLATION_TOOL_NAME = "translate_youtube_metadata"
+TRANSLATION_INSTRUCTIONS = (
+    "You translate YouTube video metadata written in English. Keep AWS service names in English and keep "
+    "hashtags, URLs and line breaks unchanged. Use an accessible, beginner-friendly tone adapted to the "
+    "target audience. Titles have at most 100 characters and must not contain '<' or '>'."
+)
+ENGLISH_ONLY_INSTRUCTION = "Generate only scheduledPublishTime and the English default metadata; the translations are produced separately."
+
+# Cache de prompt do Bedrock (cachePoint; só no modo estruturado, em que o prompt é montado localmente)
+PROMPT_CACHING = True  # Prompt e contexto da série antes de marcadores cachePoint, reaproveitados entre vídeos
+SERIES_CONTEXT = True  # Bloco compartilhado com os capítulos da mesma série (mesmo reference_link)
+SERIES_CONTEXT_MAX_TITLES = 200  # Limite de títulos listados no contexto da série
+# Marcadores no lugar das variáveis: o prompt fica idêntico entre vídeos e os valores vão depois do cache
+PROMPT_PLACEHOLDERS = {
+    "video_id": "<VIDEO_ID>",
+    "scheduled_date": "<SCHEDULED_DATE>",
+    "reference_link": "<REFERENCE_LINK_INSTRUCTION>"
+}
+
+# Chaves aceitas durante o streaming; qualquer outra interrompe a resposta
+VIDEO_METADATA_KEYS = {"scheduledPublishTime", "default", "localizations"}
+
+# Configurações de limite de taxa (ajuste conforme a quota da conta)
+REQUESTS_PER_MINUTE = 10  # Requisições por minuto ao modelo
+TOKENS_PER_MINUTE = 200000  # Tokens (entrada + saída) por minuto
+ESTIMATED_TOKENS_PER_CALL = 20000  # Estimativa usada antes de conhecer o consumo real
+MAX_RETRIES = 6  # Retentativas para throttling e erros transitórios
+RETRY_BASE_DELAY = 2.0  # Atraso base (segundos) do backoff exponencial
+
+# Configurações de preparação de documentos
+CONDENSE_DOCUMENTS = False  # Condensa documentos PDF/MD/TXT acima do orçamento e envia a versão gravada em condensed/ no bucket
+DOCUMENT_TOKEN_BUDGET = 30000  # Orçamento estimado de tokens por documento
+
+# Configurações de cache de respostas
+CACHE_DIR = "YouTube_Data/bedrock_cache"
+PROMPT_VERSION = "1"  # Altere ao editar o prompt sem mudar o ARN (invalida o cache)
+CACHE_KEY_VERSION = 2  # Formato da chave; registros de última chave de outro formato são tratados como ausentes
+CACHE_MAX_AGE_DAYS = 180  # Idade máxima das entradas
+CACHE_MAX_SIZE_MB = 200  # Tamanho máximo do diretório de cache
+
+# Configurações de deduplicação de documentos
+DEDUPLICATE_DOCUMENTS = True  # Analisa cada documento único uma vez e replica o resultado para os vídeos que o usam
+NEAR_DUPLICATES = False  # Também agrupa documentos quase idênticos (SimHash do texto); os vídeos do grupo recebem os mesmos títulos e descrições
+FINGERPRINT_WORKERS = 8  # Downloads simultâneos para calcular as impressões digitais
+
+_prompt_resource = {}
+
+def prompt_resource(agent_client=None):
+    """Modelo, inferenceConfig e texto do prompt PROMPT_ARN (consultado uma vez por processo)
+
+    O modo estruturado e o lote não aceitam o ARN do Prompt Manager: em vez
+    de uma cópia local que pode divergir, usam a configuração do próprio
+    prompt (bedrock-agent get_prompt). Falha se o prompt não puder ser lido.
+    """
+    if not _prompt_resource:
+        agent_client = agent_client or clients.bedrock_agent_client(REGION)
+        _prompt_resource.update(batch_inference.fetch_prompt_resource(agent_client, PROMPT_ARN))
+    return _prompt_resource
+
+def resolve_prompt_mode(agent_client=None):
+    """Lê o prompt para o modo estruturado/lote; sem bedrock:GetPrompt volta a invocar o ARN
+
+    Com acesso negado, STRUCTURED_OUTPUT e o modo em lote são desligados
+    nesta execução e o converse usa o ARN do Prompt Manager (JSON em texto,
+    modelo e parâmetros do próprio prompt). Retorna True se o prompt foi lido.
+    """
+    global STRUCTURED_OUTPUT, GENERATION_MODE
+    if not (STRUCTURED_OUTPUT or GENERATION_MODE == "batch"):
+        return False
+    try:
+        prompt_resource(agent_client)
+        return True
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") != "AccessDeniedException":
+            raise
+        print(f"⚠️  Sem permissão bedrock:GetPrompt em {PROMPT_ARN}: usando o ARN do prompt (JSON em texto, sem modo em lote)")
+        STRUCTURED_OUTPUT = False
+        GENERATION_MODE = "on_demand"
+        return False
+
+def structured_model_id():
+    """Modelo do modo estruturado: STRUCTURED_MODEL_ID ou, sem ele, o modelo do prompt"""
+    return STRUCTURED_MODEL_ID or prompt_resource()["model_id"]
+
+def translation_model_id():
+    """Modelo das traduções em paralelo: TRANSLATION_MODEL_ID ou, sem ele, o mesmo da geração"""
+    return TRANSLATION_MODEL_ID or structured_model_id()
+
+def structured_prompt_template():
+    """Variante do prompt para a saída estruturada (sem a estrutura JSON em texto, definida pela ferramenta)"""
+    return batch_inference.load_prompt_template(batch_inference.STRUCTURED_PROMPT_TEMPLATE_FILE)
+
+def build_prompt_variables(video_id, scheduled_date, reference_link=""):
+    """Monta as variáveis do prompt"""
+    reference_instruction = ""
+    if reference_link:
+        reference_instruction = f"Include at the end of all video descriptions this reference link: {reference_link}"
     
-    print(f"  🔍 Iniciando geração de metadados...")
-    print(f"     Arquivo: {file_s3_key} ({file_type.upper()})")
-    print(f"     Título: {video_title}")
-    print(f"     Video ID: {video_id}")
-    print(f"     Data: {scheduled_date}")
+    return {
+        "video_id": {"text": video_id},
+        "scheduled_date": {"text": scheduled_date},
+        "reference_link": {"text": reference_instruction}
+    }
+
+def build_document_messages(file_s3_key, file_type):
+    """Mensagem com o documento via S3 (mesma estrutura no converse e no lote)"""
     
     # Monta URI do S3
     s3_uri = f"s3://{S3_BUCKET}/{file_s3_key}"
@@ -49,7 +179,7 @@ def generate_metadata_with_bedrock(bedrock_client, file_s3_key, file_type, video
     print(f"  📄 Nome do documento: {document_name}")
     
     # Mensagem com documento via S3
-    messages = [
+    return [
         {
             "role": "user",
             "content": [
@@ -70,64 +200,429 @@ def generate_metadata_with_bedrock(bedrock_client, file_s3_key, file_type, video
             ]
         }
     ]
+
+# Limitador das chamadas de tradução, compartilhado entre os vídeos (quota própria do modelo de tradução)
+TRANSLATION_LIMITER = AdaptiveRateLimiter(TRANSLATION_REQUESTS_PER_MINUTE, TRANSLATION_TOKENS_PER_MINUTE)
+
+def parallel_localizations():
+    """Geração em duas fases: inglês a partir do documento, depois traduções em paralelo"""
+    return STRUCTURED_OUTPUT and LOCALIZATION_MODE == "parallel"
+
+def build_stream_validator(video_id):
+    """Validador do JSON esperado: uma única chave raiz (o video_id) com as seções do prompt"""
+    return IncrementalJsonValidator({(): {video_id}, ("*",): VIDEO_METADATA_KEYS})
+
+def series_titles(videos):
+    """Títulos dos vídeos de cada série: {reference_link: [títulos na ordem do CSV]}"""
+    series = {}
+    for video in videos:
+        link = video.get("reference_link", "")
+        if link and len(series.setdefault(link, [])) < SERIES_CONTEXT_MAX_TITLES:
+            series[link].append(video["video_title"])
+    return series
+
+def build_series_context(reference_link, titles):
+    """Texto compartilhado por todos os capítulos de uma série (mesmo documento de referência)"""
+    chapters = "\n".join(f"- {title}" for title in titles)
+    return (
+        f"Series context: the videos below are chapters of the same AWS documentation ({reference_link}). "
+        f"Use them to differentiate this chapter from the others in the series.\n{chapters}"
+    )
+
+def build_cached_prompt(messages, prompt_variables, series=None):
+    """System e mensagens com o conteúdo estático antes de marcadores cachePoint
+
+    O prefixo ferramentas + prompt (com marcadores no lugar das variáveis)
+    é igual em todos os vídeos; o contexto da série é igual entre capítulos
+    da mesma série. Documento e valores das variáveis vêm depois dos
+    marcadores, então o Bedrock reaproveita o prefixo entre chamadas.
+    """
+    template = structured_prompt_template()
+    placeholders = {name: {"text": text} for name, text in PROMPT_PLACEHOLDERS.items()}
+    system = [{"text": batch_inference.render_prompt(template, placeholders)}, {"cachePoint": {"type": "default"}}]
+
+    values = "\n".join(
+        f"{PROMPT_PLACEHOLDERS[name]} = {variable['text'] or 'none'}" for name, variable in prompt_variables.items()
+    )
+    messages = copy.deepcopy(messages)
+    content = messages[0]["content"]
+    content.append({"text": f"Values for this video:\n{values}"})
+    if series:
+        content[:0] = [{"text": build_series_context(*series)}, {"cachePoint": {"type": "default"}}]
+    return system, messages
+
+def build_converse_request(messages, prompt_variables, series=None):
+    """Parâmetros do converse/converse_stream conforme o modo de saída
+
+    Com STRUCTURED_OUTPUT a variante estruturada do prompt é renderizada
+    localmente (o ARN do Prompt Manager não aceita toolConfig), com modelo e
+    inferenceConfig do prompt, e a resposta vem como entrada da ferramenta
+    de metadata_schema.py, já no formato do esquema. series é
+    (reference_link, títulos) para o contexto compartilhado da série.
+    """
+    if not STRUCTURED_OUTPUT:
+        return {"modelId": PROMPT_ARN, "messages": messages, "promptVariables": prompt_variables}
+    schema = metadata_schema.METADATA_SCHEMA
+    if PROMPT_CACHING:
+        system, messages = build_cached_prompt(messages, prompt_variables, series if SERIES_CONTEXT else None)
+    else:
+        system = [{"text": batch_inference.render_prompt(structured_prompt_template(), prompt_variables)}]
+    if parallel_localizations():
+        # Primeira fase: a resposta longa com todos os idiomas vira só a parte em inglês
+        schema = metadata_schema.BASE_METADATA_SCHEMA
+        messages = copy.deepcopy(messages)
+        messages[0]["content"].append({"text": ENGLISH_ONLY_INSTRUCTION})
+    return {
+        "modelId": structured_model_id(),
+        "system": system,
+        "messages": messages,
+        "inferenceConfig": prompt_resource()["inference_config"],
+        "toolConfig": metadata_schema.tool_config(schema)
+    }
+
+def record_usage_metrics(usage, **labels):
+    """Tokens de entrada/saída e de cache (leitura e escrita) informados em usage"""
+    metrics.observe("bedrock_input_tokens", usage.get("inputTokens", 0), **labels)
+    metrics.observe("bedrock_output_tokens", usage.get("outputTokens", 0), **labels)
+    if "cacheReadInputTokens" in usage or "cacheWriteInputTokens" in usage:
+        metrics.observe("bedrock_cache_read_tokens", usage.get("cacheReadInputTokens", 0), **labels)
+        metrics.observe("bedrock_cache_write_tokens", usage.get("cacheWriteInputTokens", 0), **labels)
+
+def prompt_cache_summary():
+    """Totais de tokens lidos/gravados no cache de prompt nas chamadas de geração"""
+    read = sum(metrics.REGISTRY.values("bedrock_cache_read_tokens"))
+    written = sum(metrics.REGISTRY.values("bedrock_cache_write_tokens"))
+    uncached = sum(metrics.REGISTRY.values("bedrock_input_tokens"))
+    total = read + written + uncached
+    return f"{read} tokens lidos, {written} gravados ({read / total:.0%} da entrada servida do cache)" if total else "sem chamadas"
+
+def converse_stream_metadata(bedrock_client, request, video_id):
+    """Chama converse_stream validando cada trecho da resposta
+
+    Retorna uma resposta no mesmo formato do converse (com o JSON já isolado
+    do texto, ou a entrada da ferramenta já decodificada). Ao detectar saída
+    inválida, fecha o stream e lança StreamValidationError sem esperar o
+    restante da geração.
+    """
+    # No modo estruturado o texto livre não é validado: o resultado vem da ferramenta
+    text_validator = None if STRUCTURED_OUTPUT else build_stream_validator(video_id)
+    tool_validator = None
+    tool_use = None
+    texts = []
+    start_time = time.perf_counter()
+    response = bedrock_client.converse_stream(**request)
+    stream = response["stream"]
+    first_token_time = None
+    stop_reason = None
+    usage = {}
+    response_metrics = {}
+    try:
+        for event in stream:
+            if "contentBlockStart" in event:
+                start = event["contentBlockStart"].get("start", {})
+                if "toolUse" in start:
+                    tool_use = dict(start["toolUse"])
+                    tool_validator = IncrementalJsonValidator({(): VIDEO_METADATA_KEYS}, max_preamble=0)
+            elif "contentBlockDelta" in event:
+                delta = event["contentBlockDelta"]["delta"]
+                chunk = delta.get("text") or delta.get("toolUse", {}).get("input", "")
+                if not chunk:
+                    continue
+                if first_token_time is None:
+                    first_token_time = time.perf_counter() - start_time
+                    metrics.observe("bedrock_ttft_seconds", first_token_time)
+                    print(f"  ⚡ [{video_id}] Primeiro token em {first_token_time:.2f} segundos")
+                if "toolUse" in delta and tool_validator:
+                    tool_validator.feed(chunk)
+                elif "text" in delta:
+                    texts.append(chunk)
+                    if text_validator:
+                        text_validator.feed(chunk)
+            elif "messageStop" in event:
+                stop_reason = event["messageStop"].get("stopReason")
+            elif "metadata" in event:
+                usage = event["metadata"].get("usage", {})
+                response_metrics = event["metadata"].get("metrics", {})
+        if tool_validator:
+            tool_use["input"] = json.loads(tool_validator.finish())
+            content = [{"toolUse": tool_use}]
+        else:
+            if text_validator is None:
+                # Modelo respondeu em texto apesar da ferramenta: valida o texto completo
+                text_validator = build_stream_validator(video_id)
+                text_validator.feed("".join(texts))
+            content = [{"text": text_validator.finish()}]
+    except StreamValidationError as e:
+        elapsed = time.perf_counter() - start_time
+        metrics.increment("bedrock_stream_aborts", reason=e.kind)
+        metrics.observe("bedrock_abort_seconds", elapsed)
+        print(f"  🛑 [{video_id}] Resposta interrompida após {elapsed:.2f}s: {e}")
+        raise
+    finally:
+        stream.close()
+
+    return {
+        "output": {"message": {"role": "assistant", "content": content}},
+        "stopReason": stop_reason,
+        "usage": usage,
+        "metrics": response_metrics
+    }
+
+def parse_metadata_text(metadata_text):
+    """Remove blocos markdown da resposta e faz o parse do JSON"""
+    print(f"  📊 Tamanho da resposta: {len(metadata_text)} caracteres")
     
-    # Variáveis do prompt
-    reference_instruction = ""
-    if reference_link:
-        reference_instruction = f"Include at the end of all video descriptions this reference link: {reference_link}"
+    # Remove markdown code blocks se existirem
+    if "```json" in metadata_text:
+        metadata_text = metadata_text.split("```json")[1].split("```")[0]
+        print(f"  🔧 Removido bloco markdown json")
+    elif "```" in metadata_text:
+        metadata_text = metadata_text.split("```")[1].split("```")[0]
+        print(f"  🔧 Removido bloco markdown genérico")
     
-    prompt_variables = {
-        "video_id": {"text": video_id},
-        "scheduled_date": {"text": scheduled_date},
-        "reference_link": {"text": reference_instruction}
-    }
+    print(f"  🔍 Tentando fazer parse do JSON...")
+    parsed_json = json.loads(metadata_text.strip())
+    print(f"  ✅ JSON válido com {len(parsed_json)} chaves")
+    return parsed_json
+
+def metadata_from_content(content, video_id):
+    """Metadados da resposta: entrada da ferramenta (modo estruturado) ou JSON no texto"""
+    for block in content:
+        if "toolUse" in block:
+            print(f"  🧰 Resposta estruturada via ferramenta {block['toolUse'].get('name')}")
+            return {video_id: block["toolUse"]["input"]}
+    return parse_metadata_text("".join(block.get("text", "") for block in content))
+
+def repair_metadata_fields(bedrock_client, video_id, video_metadata, issues, rate_limiter=None):
+    """Pede ao modelo só os campos inválidos, sem reenviar o documento
+
+    Uma chamada curta a REPAIR_MODEL_ID com os metadados atuais como
+    contexto e uma ferramenta cujo esquema contém apenas os campos com
+    problema. Retorna {campo: novo valor}.
+    """
+    fields = list(dict.fromkeys(field for field, _ in issues))
+    problems = "\n".join(f"- {field}: {reason}" for field, reason in issues)
+    messages = [{
+        "role": "user",
+        "content": [{"text": f"Invalid fields:\n{problems}\n\nCurrent metadata:\n{json.dumps(video_metadata, ensure_ascii=False, indent=2)}"}]
+    }]
+    
+    def on_retry(attempt, kind, error, delay):
+        metrics.increment("bedrock_retries", kind=kind, call="repair")
+    
+    with metrics.timer("stage_seconds", stage="repair"):
+        response = call_with_retry(
+            lambda: bedrock_client.converse(
+                modelId=REPAIR_MODEL_ID,
+                system=[{"text": REPAIR_INSTRUCTIONS}],
+                messages=messages,
+                inferenceConfig={"maxTokens": REPAIR_MAX_TOKENS, "temperature": 0.2},
+                toolConfig=metadata_schema.tool_config(metadata_schema.repair_schema(fields), REPAIR_TOOL_NAME, "Devolve os campos corrigidos")
+            ),
+            rate_limiter=rate_limiter,
+            estimated_tokens=ESTIMATED_TOKENS_PER_REPAIR,
+            max_retries=MAX_RETRIES,
+            base_delay=RETRY_BASE_DELAY,
+            on_retry=on_retry
+        )
+    
+    usage = response.get("usage", {})
+    if usage:
+        record_usage_metrics(usage, call="repair")
+        if rate_limiter:
+            rate_limiter.record_usage(ESTIMATED_TOKENS_PER_REPAIR, usage.get("inputTokens", 0) + usage.get("outputTokens", 0))
+    for block in response["output"]["message"]["content"]:
+        if "toolUse" in block:
+            return {field: value for field, value in block["toolUse"]["input"].items() if field in fields}
+    return {}
+
+def translate_localization(bedrock_client, default, language, rate_limiter=None):
+    """Traduz título e descrição padrão para um idioma (chamada curta, sem o documento)"""
+    messages = [{
+        "role": "user",
+        "content": [{"text": (
+            f"Target language: {metadata_schema.LANGUAGE_NAMES[language]} ({language})\n\n"
+            f"Title:\n{default['title']}\n\nDescription:\n{default['description']}"
+        )}]
+    }]
+    
+    def on_retry(attempt, kind, error, delay):
+        metrics.increment("bedrock_retries", kind=kind, call="translate")
+    
+    response = call_with_retry(
+        lambda: bedrock_client.converse(
+            modelId=translation_model_id(),
+            system=[{"text": TRANSLATION_INSTRUCTIONS}],
+            messages=messages,
+            inferenceConfig={"maxTokens": TRANSLATION_MAX_TOKENS, "temperature": 0.3},
+            toolConfig=metadata_schema.tool_config(metadata_schema.LOCALIZATION_SCHEMA, TRANSLATION_TOOL_NAME, "Devolve o título e a descrição traduzidos")
+        ),
+        rate_limiter=rate_limiter,
+        estimated_tokens=ESTIMATED_TOKENS_PER_TRANSLATION,
+        max_retries=MAX_RETRIES,
+        base_delay=RETRY_BASE_DELAY,
+        on_retry=on_retry
+    )
+    
+    usage = response.get("usage", {})
+    if usage:
+        record_usage_metrics(usage, call="translate")
+        if rate_limiter:
+            rate_limiter.record_usage(ESTIMATED_TOKENS_PER_TRANSLATION, usage.get("inputTokens", 0) + usage.get("outputTokens", 0))
+    for block in response["output"]["message"]["content"]:
+        if "toolUse" in block:
+            translated = block["toolUse"]["input"]
+            return {"title": translated.get("title"), "description": translated.get("description")}
+    raise ValueError("Resposta sem tradução")
+
+def translate_localizations(bedrock_client, video_id, video_metadata, rate_limiter=None, languages=None):
+    """Segunda fase: uma chamada de tradução por idioma, todas em paralelo
+
+    Grava video_metadata["localizations"] na estrutura lida por
+    update_video_metadata. Um idioma que falha fica de fora sem derrubar
+    o vídeo (finalize_metadata ainda tenta repará-lo).
+    """
+    languages = metadata_schema.LANGUAGES if languages is None else languages
+    default = video_metadata.get("default") or {}
+    localizations = {}
+    start_time = time.perf_counter()
+    
+    with metrics.timer("stage_seconds", stage="translate"), \
+            ThreadPoolExecutor(max_workers=max(1, min(TRANSLATION_WORKERS, len(languages)))) as executor:
+        futures = {
+            executor.submit(translate_localization, bedrock_client, default, language, rate_limiter): language
+            for language in languages
+        }
+        for future in as_completed(futures):
+            language = futures[future]
+            try:
+                localizations[language] = future.result()
+            except Exception as e:
+                metrics.increment("translation_failures", language=language, error=type(e).__name__)
+                print(f"  ⚠️  [{video_id}] Tradução {language} falhou: {type(e).__name__}: {e}")
+    
+    # Mantém a ordem dos idiomas do prompt
+    video_metadata["localizations"] = {language: localizations[language] for language in languages if language in localizations}
+    print(f"  🌐 [{video_id}] {len(localizations)}/{len(languages)} traduções em {time.perf_counter() - start_time:.2f}s")
+    return video_metadata
+
+def finalize_metadata(bedrock_client, new_metadata, scheduled_date, rate_limiter=None, languages=None):
+    """Valida os metadados gerados e corrige só os campos inválidos
+
+    Ordem: correções locais determinísticas, uma chamada curta de reparo
+    (REPAIR_FIELDS, se houver cliente) com os campos ainda inválidos e, por
+    fim, corte de textos longos e remoção de traduções inválidas. languages
+    são os idiomas exigidos (padrão: todos do prompt). Lança ValueError se
+    título, descrição ou tags padrão continuarem inválidos.
+    """
+    for video_id, video_metadata in new_metadata.items():
+        for field in metadata_schema.apply_local_fixes(video_metadata, scheduled_date):
+            metrics.increment("metadata_repairs", method="local", field=field.split(".")[0])
+        issues = metadata_schema.validate_video_metadata(video_metadata, scheduled_date, languages)
+        if not issues:
+            continue
+        print(f"  🩹 [{video_id}] {len(issues)} campo(s) inválido(s): {', '.join(field for field, _ in issues)}")
+        
+        if REPAIR_FIELDS and bedrock_client is not None:
+            try:
+                repaired = repair_metadata_fields(bedrock_client, video_id, video_metadata, issues, rate_limiter)
+            except Exception as e:
+                metrics.increment("bedrock_failures", error=type(e).__name__, call="repair")
+                print(f"  ⚠️  [{video_id}] Reparo falhou: {type(e).__name__}: {e}")
+                repaired = {}
+            for field, value in repaired.items():
+                metadata_schema.set_field(video_metadata, field, value)
+                metrics.increment("metadata_repairs", method="model", field=field.split(".")[0])
+            metadata_schema.apply_local_fixes(video_metadata, scheduled_date)
+            issues = metadata_schema.validate_video_metadata(video_metadata, scheduled_date, languages)
+        
+        for field in metadata_schema.apply_fallback_fixes(video_metadata, issues):
+            metrics.increment("metadata_repairs", method="fallback", field=field.split(".")[0])
+        blocking = metadata_schema.blocking_issues(metadata_schema.validate_video_metadata(video_metadata, scheduled_date, languages))
+        if blocking:
+            raise ValueError(f"Campos inválidos após reparo: {', '.join(f'{field} ({reason})' for field, reason in blocking)}")
+        print(f"  ✅ [{video_id}] Metadados corrigidos sem nova geração")
+    return new_metadata
+
+def generate_metadata_with_bedrock(bedrock_client, file_s3_key, file_type, video_title, video_id, scheduled_date, reference_link="", rate_limiter=None, series=None):
+    """Gera metadados usando AWS Bedrock com document via S3
+
+    series é (reference_link, títulos dos capítulos) para o contexto
+    compartilhado da série, reaproveitado pelo cache de prompt.
+    """
+    
+    print(f"  🔍 Iniciando geração de metadados...")
+    print(f"     Arquivo: {file_s3_key} ({file_type.upper()})")
+    print(f"     Título: {video_title}")
+    print(f"     Video ID: {video_id}")
+    print(f"     Data: {scheduled_date}")
+    
+    messages = build_document_messages(file_s3_key, file_type)
+    
+    # Variáveis do prompt
+    prompt_variables = build_prompt_variables(video_id, scheduled_date, reference_link)
     
     print(f"  📝 Variáveis do prompt: {prompt_variables}")
     print(f"  🚀 Enviando requisição para Bedrock...")
     
     try:
         start_time = time.time()
-        print(f"  ⏳ Aguardando resposta do Bedrock (pode demorar 1-2 minutos)...")
+        if STREAM_RESPONSES:
+            print(f"  ⏳ Recebendo resposta do Bedrock em streaming...")
+        else:
+            print(f"  ⏳ Aguardando resposta do Bedrock (pode demorar 1-2 minutos)...")
         
-        response = bedrock_client.converse(
-            modelId=PROMPT_ARN,
-            messages=messages,
-            promptVariables=prompt_variables
+        def on_retry(attempt, kind, error, delay):
+            metrics.increment("bedrock_retries", kind=kind)
+            print(f"  🔁 [{video_id}] {type(error).__name__} ({kind}), tentativa {attempt}/{MAX_RETRIES} em {delay:.1f}s")
+        
+        request = build_converse_request(messages, prompt_variables, series)
+        if STREAM_RESPONSES:
+            # Erros no meio do stream (throttling, indisponibilidade) repetem a chamada inteira
+            call = lambda: converse_stream_metadata(bedrock_client, request, video_id)
+        else:
+            call = lambda: bedrock_client.converse(**request)
+        
+        response = call_with_retry(
+            call,
+            rate_limiter=rate_limiter,
+            estimated_tokens=ESTIMATED_TOKENS_PER_CALL,
+            max_retries=MAX_RETRIES,
+            base_delay=RETRY_BASE_DELAY,
+            on_retry=on_retry
         )
         
         end_time = time.time()
         duration = end_time - start_time
         print(f"  ⏱️  Resposta recebida em {duration:.2f} segundos")
         
-        metadata_text = response["output"]["message"]["content"][0]["text"]
-        print(f"  📊 Tamanho da resposta: {len(metadata_text)} caracteres")
+        # Latência total (com esperas e retentativas), latência do modelo e tokens por vídeo
+        usage = response.get("usage", {})
+        metrics.observe("bedrock_request_seconds", duration)
+        if "latencyMs" in response.get("metrics", {}):
+            metrics.observe("bedrock_model_seconds", response["metrics"]["latencyMs"] / 1000)
+        if usage:
+            record_usage_metrics(usage)
+            if usage.get("cacheReadInputTokens") or usage.get("cacheWriteInputTokens"):
+                print(f"  🗄️  Cache de prompt: {usage.get('cacheReadInputTokens', 0)} tokens lidos, {usage.get('cacheWriteInputTokens', 0)} gravados")
         
-        # Remove markdown code blocks se existirem
-        if "```json" in metadata_text:
-            metadata_text = metadata_text.split("```json")[1].split("```")[0]
-            print(f"  🔧 Removido bloco markdown json")
-        elif "```" in metadata_text:
-            metadata_text = metadata_text.split("```")[1].split("```")[0]
-            print(f"  🔧 Removido bloco markdown genérico")
+        # Ajusta o limitador com o consumo real de tokens
+        if rate_limiter and usage:
+            rate_limiter.record_usage(ESTIMATED_TOKENS_PER_CALL, usage.get("inputTokens", 0) + usage.get("outputTokens", 0))
         
-        print(f"  🔍 Tentando fazer parse do JSON...")
-        parsed_json = json.loads(metadata_text.strip())
-        print(f"  ✅ JSON válido com {len(parsed_json)} chaves")
-        
-        return parsed_json
+        new_metadata = metadata_from_content(response["output"]["message"]["content"], video_id)
+        if parallel_localizations():
+            # Valida o inglês antes de traduzir, para não traduzir um título inválido
+            new_metadata = finalize_metadata(bedrock_client, new_metadata, scheduled_date, rate_limiter, languages=[])
+            for key, video_metadata in new_metadata.items():
+                translate_localizations(bedrock_client, key, video_metadata, TRANSLATION_LIMITER)
+        return finalize_metadata(bedrock_client, new_metadata, scheduled_date, rate_limiter)
     
     except Exception as e:
+        metrics.increment("bedrock_failures", error=type(e).__name__)
         print(f"  ❌ Erro detalhado: {type(e).__name__}: {str(e)}")
         return None
 
-def verify_file_exists(s3_client, file_key):
-    """Verifica se arquivo existe no S3"""
-    try:
-        s3_client.head_object(Bucket=S3_BUCKET, Key=file_key)
-        return True
-    except ClientError:
-        return False
-
 def merge_metadata(existing_metadata, new_metadata):
     """Combina metadados novos com existentes"""
     if existing_metadata is None:
@@ -136,94 +631,484 @@ def merge_metadata(existing_metadata, new_metadata):
     existing_metadata.update(new_metadata)
     return existing_metadata
 
-def main():
-    print("=== Geração de Metadados com AWS Bedrock (Otimizado) ===\n")
-    
-    # Mostra configurações de agendamento
-    print(f"📅 Configurações de agendamento:")
-    print(f"   Data inicial: {START_DATE}")
-    print(f"   Intervalo: {INTERVAL_DAYS} dia(s)")
-    print(f"   Tipo: {'Diário' if INTERVAL_DAYS == 1 else 'Semanal' if INTERVAL_DAYS == 7 else f'A cada {INTERVAL_DAYS} dias'}\n")
-    
-    # Setup clientes AWS
-    s3_client = boto3.client("s3", region_name=REGION)
-    bedrock_client = boto3.client("bedrock-runtime", region_name=REGION)
-    
-    # Carrega dados dos vídeos
-    videos = load_video_data()
-    print(f"Vídeos para processar: {len(videos)}\n")
-    
-    if not videos:
-        print("❌ Nenhum vídeo encontrado com file_name preenchido.")
-        return
-    
-    # Carrega metadados existentes se houver
-    metadata_file = "YouTube_Data/generated_metadata.json"
-    existing_metadata = {}
+def get_file_key(video):
+    """Converte nome do arquivo para extensão correta"""
+    file_type = video["file_type"]
+    if file_type in ["pdf", "doc", "docx", "html", "txt", "md"]:
+        return video["file_name"].replace(".mp4", f".{file_type}")
+    return video["file_name"].replace(".mp4", ".pdf")  # Default para PDF
+
+def generation_settings():
+    """Configurações do modo de geração que mudam a resposta (parte da chave do cache)"""
+    if not STRUCTURED_OUTPUT:
+        # Prompt do Prompt Manager: entradas do modo texto continuam válidas no modo texto
+        return {}
+    settings = {
+        "model_id": structured_model_id(),
+        "inference_config": prompt_resource()["inference_config"],
+        "schema": metadata_schema.METADATA_SCHEMA,
+        "prompt_template": hashlib.sha256(structured_prompt_template().encode("utf-8")).hexdigest(),
+        "localization_mode": LOCALIZATION_MODE,
+        "prompt_caching": PROMPT_CACHING,
+        "series_context": SERIES_CONTEXT
+    }
+    if parallel_localizations():
+        settings["translation_model_id"] = translation_model_id()
+    return settings
+
+def make_cache_key(etag, task, settings=None):
+    """Chave do cache: conteúdo do documento + vídeo + prompt + modo de geração
+
+    A data de agendamento fica fora da chave: ela vem da posição no CSV, que
+    muda para todos os vídeos seguintes quando um vídeo é inserido. A data é
+    reaplicada ao servir uma entrada (restamp_date).
+    """
+    video = task["video"]
+    return ResponseCache.make_key(
+        version=CACHE_KEY_VERSION,
+        etag=etag,
+        file_type=task["file_type"],
+        video_id=video["video_id"],
+        reference_link=video.get("reference_link", ""),
+        prompt_arn=PROMPT_ARN,
+        prompt_version=PROMPT_VERSION,
+        document_token_budget=DOCUMENT_TOKEN_BUDGET if CONDENSE_DOCUMENTS else None,
+        **(generation_settings() if settings is None else settings)
+    )
+
+def latest_name(video_id):
+    """Nome do registro de última chave do vídeo no formato atual de chave"""
+    return f"{video_id}@v{CACHE_KEY_VERSION}"
+
+def scheduled_date_for(position):
+    """Data de agendamento pela posição no CSV, independente da ordem de conclusão"""
+    start_date = datetime.strptime(START_DATE, "%Y-%m-%d")
+    return (start_date + timedelta(days=(position - 1) * INTERVAL_DAYS)).strftime("%Y-%m-%d")
+
+def prompt_fingerprint(settings=None):
+    """Versão do prompt e do modo de geração gravada no catálogo (campos da chave do cache sem o vídeo)"""
+    return ResponseCache.make_key(
+        version=CACHE_KEY_VERSION,
+        prompt_arn=PROMPT_ARN,
+        prompt_version=PROMPT_VERSION,
+        document_token_budget=DOCUMENT_TOKEN_BUDGET if CONDENSE_DOCUMENTS else None,
+        **(generation_settings() if settings is None else settings)
+    )
+
+def is_stale(video, inventory, fingerprint):
+    """Vídeo já gerado cujo documento (ETag), prompt ou data mudou desde a geração gravada no catálogo"""
+    info = inventory.get(get_file_key(video))
+    if info is None:
+        return False  # Sem documento no S3 não há o que gerar
+    recorded = (video.get("document_etag"), video.get("prompt_version"), video.get("scheduled_date"))
+    return recorded != (info.etag, fingerprint, scheduled_date_for(video["position"]))
+
+def select_videos(catalog, state, s3_client, statuses=None):
+    """Vídeos a gerar, inventário do S3 e títulos das séries, a partir do catálogo
+
+    Vídeos com um dos statuses (padrão: GENERATION_STATUSES) sempre entram.
+    Os demais são percorridos no cursor e só entram se o ETag do documento
+    no inventário, a versão do prompt ou a data agendada diferem dos
+    gravados por record_generations (os demais nem chegam ao cache). Com
+    PENDING_ONLY só statuses são consultados, pelo índice de status.
+    Retorna (vídeos, inventário, séries).
+    """
+    statuses = GENERATION_STATUSES if statuses is None else statuses
+    catalog.sync_statuses(state)  # O diário pode ter estados que não chegaram ao catálogo
+    series = catalog.series_titles(SERIES_CONTEXT_MAX_TITLES)
+    if PENDING_ONLY:
+        videos = list(catalog.iter_videos(statuses=statuses))
+        inventory = S3Inventory.for_keys(s3_client, S3_BUCKET, [get_file_key(video) for video in videos])
+        return videos, inventory, series
     
-    if os.path.exists(metadata_file):
-        with open(metadata_file, "r", encoding="utf-8") as f:
-            existing_metadata = json.load(f)
-        print(f"📄 Carregados metadados existentes: {len(existing_metadata)} vídeos")
+    # Índice do bucket com uma listagem paginada em vez de um head_object por arquivo
+    inventory = S3Inventory.for_keys(s3_client, S3_BUCKET, (get_file_key(video) for video in catalog.iter_videos()))
+    fingerprint = prompt_fingerprint()
+    videos = [
+        video for video in catalog.iter_videos()
+        if video["status"] in statuses or is_stale(video, inventory, fingerprint)
+    ]
+    return videos, inventory, series
+
+def record_generations(catalog, state, videos, inventory):
+    """Grava no catálogo ETag, versão do prompt e data dos vídeos que terminaram gerados ou enviados"""
+    fingerprint = prompt_fingerprint()
+    generations = {}
+    for video in videos:
+        video_id = video["video_id"]
+        info = inventory.get(get_file_key(video))
+        metadata = state.metadata.get(video_id)
+        if info and metadata and state.state_of(video_id) in (GENERATED, UPLOADED):
+            generations[video_id] = (info.etag, fingerprint, metadata.get("scheduledPublishTime", "")[:10])
+    catalog.record_generations(generations)
+
+def restamp_date(metadata, scheduled_date):
+    """Troca a data de scheduledPublishTime pela data atual do vídeo, mantendo o horário gerado"""
+    value = metadata.get("scheduledPublishTime")
+    if isinstance(value, str) and len(value) > 10 and not value.startswith(scheduled_date):
+        metadata["scheduledPublishTime"] = scheduled_date + value[10:]
+    return metadata
+
+def build_generation_tasks(inventory, videos, existing_metadata, cache=None, series=None):
+    """Monta lista de vídeos pendentes com data de agendamento pela posição no CSV
     
-    # Processa cada vídeo
-    success_count = 0
+    Sem cache, vídeos já presentes em existing_metadata são pulados. Com cache,
+    um vídeo só é pulado se o documento, o prompt e as variáveis não mudaram
+    desde a última geração; respostas já conhecidas são servidas do cache.
+    series ({reference_link: títulos}) vem do catálogo quando videos é só
+    um subconjunto; sem ele é montado a partir de videos.
+    Retorna (tarefas, metadados servidos do cache).
+    """
+    tasks = []
+    cached_metadata = {}
+    series = series_titles(videos) if series is None else series
+    settings = generation_settings() if cache is not None else None
     
     for i, video in enumerate(videos, 1):
-        print(f"\n[{i}/{len(videos)}] Processando: {video['file_name']}")
-        
-        # Converte nome do arquivo para extensão correta
-        file_type = video["file_type"]
-        if file_type in ["pdf", "doc", "docx", "html", "txt", "md"]:
-            file_key = video["file_name"].replace(".mp4", f".{file_type}")
-        else:
-            file_key = video["file_name"].replace(".mp4", ".pdf")  # Default para PDF
+        print(f"\n[{i}/{len(videos)}] Verificando: {video['file_name']}")
+        file_key = get_file_key(video)
+        video_id = video["video_id"]
         
         # Verifica se arquivo existe no S3
-        if not verify_file_exists(s3_client, file_key):
+        if not inventory.exists(file_key):
             print(f"  ❌ Arquivo não encontrado no S3: {file_key}")
             continue
         
         print(f"  ✅ Arquivo encontrado no S3: {file_key}")
         
-        # Gera video_id e data de agendamento
-        video_id = video["video_id"]
+        # Data calculada pela posição original no CSV, independente da ordem de conclusão
+        position = video.get("position", i)
+        scheduled_date = scheduled_date_for(position)
         
-        # Calcula data de agendamento baseada na configuração
-        start_date = datetime.strptime(START_DATE, "%Y-%m-%d")
-        scheduled_date = (start_date + timedelta(days=(i-1) * INTERVAL_DAYS)).strftime("%Y-%m-%d")
+        task = {
+            "position": position,
+            "video": video,
+            "file_key": file_key,
+            "file_type": video["file_type"],
+            "scheduled_date": scheduled_date
+        }
+        if video.get("reference_link") in series:
+            task["series"] = (video["reference_link"], series[video["reference_link"]])
         
-        # Verifica se já foi processado
-        if video_id in existing_metadata:
-            print(f"  ⏭️  Vídeo já processado, pulando...")
+        if cache is None:
+            # Verifica se já foi processado
+            if video_id in existing_metadata:
+                print(f"  ⏭️  Vídeo já processado, pulando...")
+                continue
+            tasks.append(task)
+            continue
+        
+        task["cache_key"] = make_cache_key(inventory.get(file_key).etag, task, settings)
+        latest_key = cache.latest(latest_name(video_id))
+        
+        if video_id in existing_metadata and latest_key in (None, task["cache_key"]):
+            if latest_key is None:
+                # Metadados gerados antes do cache (ou com outro formato de chave): assume o documento atual
+                cache.put(task["cache_key"], {video_id: existing_metadata[video_id]})
+                cache.set_latest(latest_name(video_id), task["cache_key"])
+            current = existing_metadata[video_id]
+            if current.get("scheduledPublishTime", "")[:10] not in ("", scheduled_date):
+                # Posição no CSV mudou (vídeo inserido antes): só a data é atualizada
+                print(f"  📅 Vídeo sem alterações, data reagendada para {scheduled_date}")
+                cached_metadata[video_id] = restamp_date(copy.deepcopy(current), scheduled_date)
+                continue
+            print(f"  ⏭️  Vídeo já processado e sem alterações, pulando...")
             continue
         
-        # Gera metadados com Bedrock
+        cached = cache.get(task["cache_key"])
+        if cached:
+            print(f"  ♻️  Resposta encontrada no cache")
+            cached_metadata.update({key: restamp_date(value, scheduled_date) for key, value in cached.items()})
+            cache.set_latest(latest_name(video_id), task["cache_key"])
+            continue
+        
+        if video_id in existing_metadata:
+            print(f"  🔄 Documento, prompt ou variáveis alterados, gerando novamente")
+        tasks.append(task)
+    
+    return tasks, cached_metadata
+
+def deduplicate_tasks(tasks, inventory, s3_client=None, index=None):
+    """Agrupa tarefas que enviariam o mesmo documento ao Bedrock
+    
+    Documentos com o mesmo ETag/SHA-256 (ou, com NEAR_DUPLICATES, SimHash
+    próximo) e o mesmo link de referência formam um grupo: a primeira
+    tarefa é analisada e as demais ficam em task["duplicates"], recebendo
+    cópias dos metadados com a própria data de agendamento. O prompt só
+    usa o documento, o ID, a data e o link, então a cópia equivale a uma
+    nova geração. Retorna as tarefas a executar.
+    """
+    if index is None:
+        index = FingerprintIndex.load()
+    if NEAR_DUPLICATES and s3_client is not None:
+        keys = [task["file_key"] for task in tasks]
+        analyzed = index.fingerprint(s3_client, S3_BUCKET, inventory, keys, {task["file_key"]: task["file_type"] for task in tasks}, FINGERPRINT_WORKERS)
+        if analyzed:
+            print(f"🔎 Impressões digitais calculadas: {analyzed} documento(s) novo(s) ou alterado(s)")
+            index.save()
+    
+    representatives = index.group([task["file_key"] for task in tasks], inventory, NEAR_DUPLICATES)
+    primaries = {}
+    unique_tasks = []
+    for task in tasks:
+        group = (representatives.get(task["file_key"], task["file_key"]), task["video"].get("reference_link", ""))
+        if group in primaries:
+            primaries[group].setdefault("duplicates", []).append(task)
+            continue
+        primaries[group] = task
+        unique_tasks.append(task)
+    
+    for task in unique_tasks:
+        for duplicate in task.get("duplicates", []):
+            print(f"  🔗 {duplicate['video']['video_id']} ({duplicate['file_key']}) reutiliza a análise de {task['video']['video_id']} ({task['file_key']})")
+    metrics.increment("deduplicated_tasks", len(tasks) - len(unique_tasks))
+    return unique_tasks
+
+def fan_out_metadata(task, new_metadata):
+    """Copia os metadados gerados para as tarefas duplicadas do grupo"""
+    source = new_metadata.get(task["video"]["video_id"]) if new_metadata else None
+    if source is None:
+        return new_metadata
+    for duplicate in task.get("duplicates", []):
+        # Mantém o horário gerado e troca só a data pela da posição do vídeo no CSV
+        new_metadata[duplicate["video"]["video_id"]] = restamp_date(copy.deepcopy(source), duplicate["scheduled_date"])
+    return new_metadata
+
+def store_generated(cache, task, new_metadata):
+    """Grava no cache os metadados da tarefa e de suas duplicatas"""
+    duplicates = {duplicate["video"]["video_id"]: duplicate for duplicate in task.get("duplicates", [])}
+    cache.put(task["cache_key"], {key: value for key, value in new_metadata.items() if key not in duplicates})
+    cache.set_latest(latest_name(task["video"]["video_id"]), task["cache_key"])
+    for video_id, duplicate in duplicates.items():
+        if video_id in new_metadata:
+            cache.put(duplicate["cache_key"], {video_id: new_metadata[video_id]})
+            cache.set_latest(latest_name(video_id), duplicate["cache_key"])
+    cache.flush()
+
+def prepare_task_document(task, s3_client=None):
+    """Condensa o documento da tarefa se configurado; retorna (chave, tipo) a enviar"""
+    video = task["video"]
+    file_key, file_type = task["file_key"], task["file_type"]
+    
+    if CONDENSE_DOCUMENTS and s3_client is not None:
+        try:
+            with metrics.timer("stage_seconds", stage="prepare"):
+                file_key, file_type, report = prepare_document(s3_client, S3_BUCKET, file_key, file_type, DOCUMENT_TOKEN_BUDGET)
+        except Exception as e:
+            # Falha na preparação não impede a geração com o documento original
+            print(f"  ⚠️  [{video['video_id']}] Falha ao preparar documento, usando original: {e}")
+            report = {"original_tokens": None, "condensed": False}
+        task["preparation"] = report
+        if report["condensed"]:
+            print(f"  ✂️  [{video['video_id']}] Documento condensado: {report['original_tokens']} → {report['final_tokens']} tokens estimados ({report['saved_tokens']} economizados)")
+        elif report["original_tokens"] is not None:
+            print(f"  📏 [{video['video_id']}] Documento dentro do orçamento: {report['original_tokens']} tokens estimados")
+    return file_key, file_type
+
+def run_generation_task(bedrock_client, task, rate_limiter=None, s3_client=None):
+    """Prepara o documento (se configurado) e gera metadados para uma tarefa"""
+    video = task["video"]
+    file_key, file_type = prepare_task_document(task, s3_client)
+    
+    with metrics.timer("stage_seconds", stage="generate"):
         new_metadata = generate_metadata_with_bedrock(
-            bedrock_client, 
+            bedrock_client,
             file_key,
             file_type,
             video["video_title"],
-            video_id,
-            scheduled_date,
-            video.get("reference_link", "")
+            video["video_id"],
+            task["scheduled_date"],
+            video.get("reference_link", ""),
+            rate_limiter,
+            task.get("series")
         )
+    return fan_out_metadata(task, new_metadata)
+
+def generate_all_metadata(bedrock_client, tasks, max_workers=MAX_WORKERS, on_result=None, rate_limiter=None, s3_client=None):
+    """Executa as tarefas com no máximo max_workers chamadas simultâneas
+    
+    Retorna os resultados na mesma ordem das tarefas. on_result é chamado na
+    thread principal a cada conclusão, permitindo salvar o progresso.
+    """
+    results = [None] * len(tasks)
+    
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {
+            executor.submit(run_generation_task, bedrock_client, task, rate_limiter, s3_client): index
+            for index, task in enumerate(tasks)
+        }
         
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                results[index] = future.result()
+            except Exception as e:
+                print(f"  ❌ Erro na tarefa {tasks[index]['video']['video_id']}: {type(e).__name__}: {e}")
+            
+            if on_result:
+                on_result(tasks[index], results[index], results)
+    
+    return results
+
+def generate_all_metadata_batch(bedrock_client, s3_client, tasks, on_result=None, run_name=None, repair_client=None, rate_limiter=None):
+    """Gera metadados de todas as tarefas com um job de Batch Inference
+    
+    Cada tarefa vira um registro JSONL com o mesmo documento via S3 e o
+    prompt renderizado com as mesmas variáveis do converse (jobs em lote não
+    aceitam o ARN do Prompt Manager: texto, modelo e inferenceConfig vêm de
+    prompt_resource()). As respostas passam pelo mesmo parse
+    do modo on-demand, e campos inválidos são reparados com repair_client
+    (bedrock-runtime). Retorna os resultados na ordem das tarefas; on_result
+    é chamado para cada tarefa, como em generate_all_metadata.
+    """
+    resource = prompt_resource()
+    if STRUCTURED_OUTPUT:
+        template, model_id = structured_prompt_template(), structured_model_id()
+    else:
+        template, model_id = resource["template"] or batch_inference.load_prompt_template(), resource["model_id"]
+    run_name = run_name or f"ytmeta-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+    records = []
+    
+    for task in tasks:
+        video = task["video"]
+        file_key, file_type = prepare_task_document(task, s3_client)
+        variables = build_prompt_variables(video["video_id"], task["scheduled_date"], video.get("reference_link", ""))
+        records.append(batch_inference.build_record(
+            video["video_id"],
+            build_document_messages(file_key, file_type),
+            batch_inference.render_prompt(template, variables),
+            resource["inference_config"],
+            tool_config=metadata_schema.tool_config() if STRUCTURED_OUTPUT else None
+        ))
+    
+    print(f"\n📦 Enviando {len(records)} registros para Batch Inference ({model_id})")
+    outputs, statuses = batch_inference.run_batch(bedrock_client, s3_client, S3_BUCKET, records, run_name, model_id)
+    print(f"  📥 {len(outputs)} registros de saída | Jobs: {', '.join(statuses.values())}")
+    
+    results = []
+    for task in tasks:
+        video_id = task["video"]["video_id"]
+        record = outputs.get(video_id)
+        try:
+            content = batch_inference.output_content(record)
+            if content is None:
+                raise ValueError((record or {}).get("error", "registro ausente na saída do job"))
+            new_metadata = finalize_metadata(repair_client, metadata_from_content(content, video_id), task["scheduled_date"], rate_limiter)
+            new_metadata = fan_out_metadata(task, new_metadata)
+        except Exception as e:
+            metrics.increment("bedrock_failures", error=type(e).__name__)
+            print(f"  ❌ [{video_id}] Erro no registro do lote: {type(e).__name__}: {e}")
+            new_metadata = None
+        results.append(new_metadata)
+        if on_result:
+            on_result(task, new_metadata, results)
+    
+    return results
+
+def main():
+    print("=== Geração de Metadados com AWS Bedrock (Otimizado) ===\n")
+    
+    # Mostra configurações de agendamento
+    print(f"📅 Configurações de agendamento:")
+    print(f"   Data inicial: {START_DATE}")
+    print(f"   Intervalo: {INTERVAL_DAYS} dia(s)")
+    print(f"   Tipo: {'Diário' if INTERVAL_DAYS == 1 else 'Semanal' if INTERVAL_DAYS == 7 else f'A cada {INTERVAL_DAYS} dias'}")
+    print(f"   Chamadas simultâneas: {MAX_WORKERS}\n")
+    
+    # Setup clientes AWS
+    s3_client = clients.s3_client(REGION)
+    bedrock_client = clients.bedrock_runtime_client(REGION)
+    rate_limiter = AdaptiveRateLimiter(REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE)
+    if resolve_prompt_mode():
+        # Sem o ARN na chamada: modelo e parâmetros vêm do prompt antes de iniciar as threads
+        resource = prompt_resource()
+        model_id = structured_model_id() if STRUCTURED_OUTPUT else resource["model_id"]
+        print(f"🧩 Prompt {PROMPT_ARN}: {model_id} {resource['inference_config']}\n")
+    
+    # Carrega metadados e estados existentes (snapshot + diário de execuções anteriores)
+    state = PipelineState.load(METADATA_FILE)
+    existing_metadata = dict(state.metadata)
+    if existing_metadata:
+        print(f"📄 Carregados metadados existentes: {len(existing_metadata)} vídeos")
+    
+    # Vídeos pendentes e gerados com documento, prompt ou data alterados; títulos das séries à parte
+    with VideoCatalog.open() as catalog:
+        videos, inventory, series = select_videos(catalog, state, s3_client)
+    print(f"Vídeos para processar: {len(videos)}\n")
+    
+    if not videos:
+        print("✅ Nenhum vídeo pendente ou com documento, prompt ou data alterados.")
+        return
+    
+    print(f"📦 Índice S3: {len(inventory)} objetos em {inventory.list_requests} requisição(ões) de listagem")
+    
+    cache = ResponseCache(CACHE_DIR, CACHE_MAX_AGE_DAYS, CACHE_MAX_SIZE_MB)
+    tasks, cached_metadata = build_generation_tasks(inventory, videos, existing_metadata, cache, series)
+    cache.flush()
+    for video_id, metadata in cached_metadata.items():
+        state.record(video_id, GENERATED, metadata, source="cache")
+    for task in tasks:
+        state.record(task["video"]["video_id"], PENDING)
+    print(f"\n♻️  Vídeos servidos do cache: {len(cached_metadata)}")
+    print(f"🚀 Vídeos pendentes de geração: {len(tasks)}")
+    
+    # Um documento referenciado por vários vídeos é analisado uma única vez
+    unique_tasks = deduplicate_tasks(tasks, inventory, s3_client) if DEDUPLICATE_DOCUMENTS else tasks
+    if len(unique_tasks) < len(tasks):
+        print(f"🔗 Documentos únicos: {len(unique_tasks)} ({len(tasks) - len(unique_tasks)} vídeos reutilizam uma análise)")
+    
+    def save_progress(task, new_metadata, results):
+        video_id = task["video"]["video_id"]
+        if new_metadata:
+            print(f"  ✅ Metadados gerados com sucesso: {', '.join(new_metadata)}")
+            store_generated(cache, task, new_metadata)
+            # Registro append-only: uma linha por vídeo em vez de reescrever o JSON inteiro
+            for key, value in new_metadata.items():
+                state.record(key, GENERATED, value)
+        else:
+            for member in [task] + task.get("duplicates", []):
+                state.record(member["video"]["video_id"], FAILED, stage="generate")
+    
+    if GENERATION_MODE == "batch" and len(unique_tasks) >= batch_inference.BATCH_MIN_RECORDS:
+        results = generate_all_metadata_batch(
+            clients.bedrock_client(REGION), s3_client, unique_tasks, on_result=save_progress,
+            repair_client=bedrock_client, rate_limiter=rate_limiter
+        )
+    else:
+        if GENERATION_MODE == "batch" and unique_tasks:
+            print(f"ℹ️  {len(unique_tasks)} tarefas, abaixo do mínimo de {batch_inference.BATCH_MIN_RECORDS} por job em lote: usando converse")
+        results = generate_all_metadata(bedrock_client, unique_tasks, MAX_WORKERS, on_result=save_progress, rate_limiter=rate_limiter, s3_client=s3_client)
+    
+    # Combina resultados na ordem original do CSV
+    success_count = 0
+    for new_metadata in results:
         if new_metadata:
-            # Combina com metadados existentes
             existing_metadata = merge_metadata(existing_metadata, new_metadata)
-            success_count += 1
-            print(f"  ✅ Metadados gerados com sucesso")
-            
-            # Salva progresso a cada vídeo processado
-            os.makedirs("YouTube_Data", exist_ok=True)
-            with open(metadata_file, "w", encoding="utf-8") as f:
-                json.dump(existing_metadata, f, ensure_ascii=False, indent=2)
+            success_count += len(new_metadata)
+    
+    # Compacta diário e grava snapshot atomicamente
+    state.compact(order=list(existing_metadata))
     
     print(f"\n=== Processamento Concluído ===")
     print(f"Vídeos processados com sucesso: {success_count}/{len(videos)}")
-    print(f"Metadados salvos em: {metadata_file}")
-    print(f"Total de vídeos no arquivo: {len(existing_metadata)}")
+    print(f"Metadados salvos em: {METADATA_FILE}")
+    print(f"Total de vídeos no arquivo: {len(state.metadata)}")
+    print(f"Estados: {state.summary()}")
+    saved_tokens = sum(task.get("preparation", {}).get("saved_tokens", 0) for task in tasks)
+    condensed_count = sum(1 for task in tasks if task.get("preparation", {}).get("condensed"))
+    if CONDENSE_DOCUMENTS:
+        print(f"Documentos condensados: {condensed_count} ({saved_tokens} tokens estimados economizados)")
+    cache.evict()
+    print(f"Cache: {cache.summary()}")
+    if STRUCTURED_OUTPUT and PROMPT_CACHING:
+        print(f"Cache de prompt: {prompt_cache_summary()}")
+    print(f"Throttlings: {rate_limiter.throttle_count} | Taxa final: {rate_limiter.requests_per_minute:.1f} req/min | Espera no limitador: {rate_limiter.total_wait:.1f}s")
+    with VideoCatalog.open() as catalog:
+        catalog.sync_statuses(state)
+        record_generations(catalog, state, videos, inventory)
+    metrics.increment("cache_hits", cache.stats["hits"])
+    metrics.increment("cache_misses", cache.stats["misses"])
+    metrics.write_report("03_generate_metadata")
 
 if __name__ == "__main__":
     main()
@@ -1,46 +1,96 @@
-import os
-import json
 import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import timezone
-import google_auth_oauthlib.flow
-import googleapiclient.discovery
 import googleapiclient.errors
-from google.oauth2.credentials import Credentials
+import clients
+import metrics
+import pipeline_state
+from pipeline_state import PipelineState
+from video_catalog import VideoCatalog
 
 # Configurações
 SCOPES = ["https://www.googleapis.com/auth/youtube"]
 METADATA_FILE = "YouTube_Data/generated_metadata.json"
+UPDATE_ALL = False  # True reenvia todos os vídeos, inclusive os já enviados
 
-def setup_youtube_client():
-    """Configura cliente YouTube Data API"""
-    if os.path.exists("token.json"):
-        try:
-            # Tenta usar token existente
-            creds = Credentials.from_authorized_user_file("token.json", scopes=SCOPES)
-            return googleapiclient.discovery.build("youtube", "v3", credentials=creds)
-        except Exception as e:
-            print(f"🔄 Token inválido ({e}), gerando novo...")
-            os.remove("token.json")
+# Configurações de concorrência e quota
+MAX_WORKERS = 4  # Atualizações simultâneas (1 = sequencial)
+QUOTA_BUDGET = 10000  # Unidades de quota disponíveis para esta execução (padrão diário: 10.000)
+LIST_QUOTA_COST = 1  # Custo de videos.list
+LIST_BATCH_SIZE = 50  # Máximo de IDs aceitos por chamada videos.list
+UPDATE_QUOTA_COST = 50  # Custo de videos.update
+
+# Resultados de atualização
+UPDATED = "updated"
+UNCHANGED = "unchanged"
+FAILED = "failed"
+PENDING = "pending"
+
+class QuotaExhausted(Exception):
+    """Orçamento de quota insuficiente para a próxima chamada"""
+
+class QuotaTracker:
+    """Contabiliza unidades de quota consumidas, compartilhado entre threads"""
     
-    # Gera novo token apenas se necessário
-    flow = google_auth_oauthlib.flow.InstalledAppFlow.from_client_secrets_file(
-        "client_secret.json", SCOPES)
-    creds = flow.run_local_server(port=0)
+    def __init__(self, budget):
+        self.budget = budget
+        self.used = 0
+        self.calls = {"list": 0, "update": 0}
+        self._lock = threading.Lock()
     
-    with open("token.json", "w") as token:
-        token.write(creds.to_json())
+    def charge(self, operation, units, headroom=0):
+        """Reserva unidades antes da chamada; lança QuotaExhausted se não houver saldo
+        
+        headroom exige saldo extra para chamadas seguintes (ex.: o update após o list).
+        """
+        with self._lock:
+            if self.used + units + headroom > self.budget:
+                raise QuotaExhausted(f"{operation} requer {units} unidades, restam {self.remaining}")
+            self.used += units
+            self.calls[operation] += 1
+    
+    def exhaust(self):
+        """Marca o orçamento como esgotado (ex.: quotaExceeded retornado pela API)"""
+        with self._lock:
+            self.used = self.budget
     
-    return googleapiclient.discovery.build("youtube", "v3", credentials=creds)
+    @property
+    def remaining(self):
+        return self.budget - self.used
+
+def is_quota_error(error):
+    """Verifica se o HttpError indica quota diária excedida"""
+    return (isinstance(error, googleapiclient.errors.HttpError)
+            and error.resp.status == 403
+            and b"quotaExceeded" in (error.content or b""))
+
+def get_credentials():
+    """Obtém credenciais OAuth, reutilizando token válido"""
+    return clients.get_credentials(SCOPES)
+
+def setup_youtube_client(creds=None):
+    """Configura cliente YouTube Data API (documento de descoberta em cache)"""
+    return clients.build_youtube_client(creds, SCOPES)
 
 def load_generated_metadata():
-    """Carrega metadados gerados pelo script 03"""
-    if not os.path.exists(METADATA_FILE):
-        print(f"❌ Arquivo não encontrado: {METADATA_FILE}")
+    """Carrega metadados gerados pelo script 03 e o estado de cada vídeo
+    
+    Retorna (estado, metadados a enviar). Só entram vídeos gerados e ainda
+    não enviados ou cujo envio falhou, a menos que UPDATE_ALL esteja ativo.
+    """
+    state = PipelineState.load(METADATA_FILE)
+    if not state.metadata:
+        print(f"❌ Arquivo não encontrado ou vazio: {METADATA_FILE}")
         print("Execute 03_generate_metadata.py primeiro")
-        return {}
+        return state, {}
+    
+    if UPDATE_ALL:
+        return state, dict(state.metadata)
     
-    with open(METADATA_FILE, "r", encoding="utf-8") as file:
-        return json.load(file)
+    to_upload = set(state.video_ids(pipeline_state.GENERATED))
+    to_upload.update(state.video_ids(pipeline_state.FAILED, stage="upload"))
+    return state, {video_id: metadata for video_id, metadata in state.metadata.items() if video_id in to_upload}
 
 def is_future_date(date_str):
     """Verifica se a data é futura"""
@@ -53,22 +103,102 @@ def is_future_date(date_str):
         print(f"❌ Formato de data inválido: {date_str}")
         return False
 
-def update_video_metadata(youtube, video_id, metadata):
-    """Atualiza metadados de um vídeo no YouTube"""
+def same_instant(first, second):
+    """Compara duas datas ISO 8601 (ex.: '...Z' e '...+00:00') pelo instante"""
+    try:
+        return (datetime.datetime.fromisoformat(first.replace("Z", "+00:00"))
+                == datetime.datetime.fromisoformat(second.replace("Z", "+00:00")))
+    except (AttributeError, ValueError):
+        return first == second
+
+def changed_parts(current, body):
+    """Lista as partes do body que diferem do estado atual do vídeo"""
+    parts = []
+    
+    if "snippet" in body:
+        current_snippet = current.get("snippet", {})
+        if any(current_snippet.get(field, [] if field == "tags" else None) != value
+               for field, value in body["snippet"].items()):
+            parts.append("snippet")
+    
+    if "localizations" in body:
+        current_localizations = {
+            lang: {"title": value.get("title"), "description": value.get("description")}
+            for lang, value in current.get("localizations", {}).items()
+        }
+        if current_localizations != body["localizations"]:
+            parts.append("localizations")
+    
+    if "status" in body:
+        current_status = current.get("status", {})
+        desired = body["status"]
+        made_for_kids = current_status.get("selfDeclaredMadeForKids", current_status.get("madeForKids"))
+        if (current_status.get("privacyStatus") != desired["privacyStatus"]
+                or not same_instant(current_status.get("publishAt"), desired["publishAt"])
+                or made_for_kids != desired["selfDeclaredMadeForKids"]):
+            parts.append("status")
+    
+    return parts
+
+def chunked(items, size):
+    """Divide uma lista em blocos de tamanho máximo 'size'"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def prefetch_video_states(youtube, video_ids, quota=None):
+    """Busca o estado atual de todos os vídeos em lotes de LIST_BATCH_SIZE
+    
+    Retorna dicionário video_id -> item (snippet, localizations, status).
+    Vídeos ausentes do resultado não existem ou não pertencem ao canal.
+    """
+    states = {}
+    for batch in chunked(list(video_ids), LIST_BATCH_SIZE):
+        if quota:
+            quota.charge("list", LIST_QUOTA_COST)
+        try:
+            response = youtube.videos().list(
+                part="snippet,localizations,status",
+                id=",".join(batch)
+            ).execute()
+        except googleapiclient.errors.HttpError as e:
+            if is_quota_error(e):
+                if quota:
+                    quota.exhaust()
+                raise QuotaExhausted(str(e))
+            raise
+        for item in response.get("items", []):
+            states[item["id"]] = item
+    return states
+
+def update_video_metadata(youtube, video_id, metadata, quota=None, current=None):
+    """Atualiza metadados de um vídeo no YouTube
+    
+    Compara o estado atual com o desejado e envia apenas as partes que
+    mudaram; se nada mudou, o update (50 unidades) não é feito.
+    Com quota, cada chamada é contabilizada antes de ser feita e
+    QuotaExhausted é propagada quando o orçamento acaba.
+    Com current (estado obtido por prefetch_video_states) o videos.list
+    individual é evitado. Retorna UPDATED, UNCHANGED ou FAILED.
+    """
     
     print(f"🔄 Atualizando vídeo: {video_id}")
     
     try:
-        # Busca dados atuais do vídeo
-        video_request = youtube.videos().list(
-            part="snippet,localizations,status",
-            id=video_id
-        )
-        video_response = video_request.execute()
-        
-        if not video_response["items"]:
-            print(f"  ❌ Vídeo não encontrado: {video_id}")
-            return False
+        # Busca dados atuais do vídeo (se não foram obtidos em lote)
+        if current is None:
+            if quota:
+                quota.charge("list", LIST_QUOTA_COST, headroom=UPDATE_QUOTA_COST)
+            video_request = youtube.videos().list(
+                part="snippet,localizations,status",
+                id=video_id
+            )
+            video_response = video_request.execute()
+            
+            if not video_response["items"]:
+                print(f"  ❌ Vídeo não encontrado: {video_id}")
+                return FAILED
+            
+            current = video_response["items"][0]
         
         print(f"  ✅ Vídeo encontrado")
         
@@ -113,64 +243,151 @@ def update_video_metadata(youtube, video_id, metadata):
             else:
                 print(f"  ⚠️  Data de agendamento não é futura, ignorando")
         
-        # Aplica atualizações
-        parts = []
-        if "snippet" in body:
-            parts.append("snippet")
-        if "localizations" in body:
-            parts.append("localizations")
-        if "status" in body:
-            parts.append("status")
+        # Aplica apenas as partes que diferem do estado atual
+        parts = changed_parts(current, body)
         
         if parts:
+            if quota:
+                quota.charge("update", UPDATE_QUOTA_COST)
             youtube.videos().update(
                 part=",".join(parts),
-                body=body
+                body={"id": video_id, **{part: body[part] for part in parts}}
             ).execute()
-            print(f"  ✅ Vídeo atualizado com sucesso")
-            return True
+            print(f"  ✅ Vídeo atualizado com sucesso ({', '.join(parts)})")
+            return UPDATED
         else:
-            print(f"  ⚠️  Nenhuma atualização necessária")
-            return False
+            print(f"  ⏭️  Nenhuma alteração em relação ao YouTube, update ignorado")
+            return UNCHANGED
             
+    except QuotaExhausted:
+        raise
     except googleapiclient.errors.HttpError as e:
+        if is_quota_error(e):
+            if quota:
+                quota.exhaust()
+            raise QuotaExhausted(str(e))
         print(f"  ❌ Erro HTTP: {e}")
-        return False
+        return FAILED
     except Exception as e:
         print(f"  ❌ Erro inesperado: {e}")
-        return False
+        return FAILED
+
+def update_all_videos(client_factory, metadata_dict, quota, max_workers=MAX_WORKERS, states=None, on_result=None):
+    """Atualiza vídeos em paralelo respeitando o orçamento de quota
+    
+    client_factory cria um cliente por thread (o cliente HTTP da googleapiclient
+    não é thread-safe). states é o mapa de prefetch_video_states; sem ele
+    cada vídeo faz seu próprio videos.list. Retorna dicionário video_id ->
+    UPDATED, UNCHANGED, FAILED ou PENDING (não tentado por falta de quota).
+    on_result(video_id, resultado) é chamado na thread principal a cada conclusão.
+    """
+    local = threading.local()
+    stop_event = threading.Event()
+    
+    def worker(video_id, metadata):
+        if stop_event.is_set():
+            return PENDING
+        current = None
+        if states is not None:
+            current = states.get(video_id)
+            if current is None:
+                print(f"❌ Vídeo não encontrado: {video_id}")
+                return FAILED
+        if not hasattr(local, "youtube"):
+            local.youtube = client_factory()
+        try:
+            with metrics.timer("stage_seconds", stage="update"):
+                return update_video_metadata(local.youtube, video_id, metadata, quota, current)
+        except QuotaExhausted as e:
+            if not stop_event.is_set():
+                print(f"  ⛔ Quota esgotada: {e}")
+            stop_event.set()
+            return PENDING
+    
+    statuses = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {
+            executor.submit(worker, video_id, metadata): video_id
+            for video_id, metadata in metadata_dict.items()
+        }
+        for future in as_completed(futures):
+            video_id = futures[future]
+            statuses[video_id] = future.result()
+            metrics.increment("video_updates", result=statuses[video_id])
+            if on_result:
+                on_result(video_id, statuses[video_id])
+    
+    # Mantém a ordem original dos metadados
+    return {video_id: statuses[video_id] for video_id in metadata_dict}
+
+def record_upload_result(state, video_id, result):
+    """Registra o resultado do envio no estado compartilhado com o script 03"""
+    if result in (UPDATED, UNCHANGED):
+        state.record(video_id, pipeline_state.UPLOADED, result=result)
+    elif result == FAILED:
+        state.record(video_id, pipeline_state.FAILED, stage="upload")
+    # PENDING: mantém o estado atual para a próxima execução
 
 def main():
     print("=== Aplicação de Metadados no YouTube ===\n")
     
-    # Carrega metadados gerados
-    metadata_dict = load_generated_metadata()
+    # Carrega metadados gerados e estado dos envios anteriores
+    state, metadata_dict = load_generated_metadata()
     
-    if not metadata_dict:
+    if not state.metadata:
         return
     
-    print(f"📊 Metadados carregados: {len(metadata_dict)} vídeos\n")
+    print(f"📊 Metadados carregados: {len(state.metadata)} vídeos")
+    print(f"📤 Pendentes de envio: {len(metadata_dict)} vídeos\n")
+    
+    if not metadata_dict:
+        print("✅ Todos os vídeos já foram enviados (use UPDATE_ALL = True para reenviar)")
+        return
     
     # Setup cliente YouTube
     print("🔐 Configurando cliente YouTube...")
-    youtube = setup_youtube_client()
+    creds = get_credentials()
     print("✅ Cliente configurado\n")
     
-    # Processa cada vídeo
-    success_count = 0
+    # Processa vídeos em paralelo
+    quota = QuotaTracker(QUOTA_BUDGET)
     total_videos = len(metadata_dict)
+    print(f"🚀 {MAX_WORKERS} atualizações simultâneas, orçamento de {QUOTA_BUDGET} unidades de quota\n")
     
-    for i, (video_id, metadata) in enumerate(metadata_dict.items(), 1):
-        print(f"[{i}/{total_videos}] Processando vídeo: {video_id}")
-        
-        if update_video_metadata(youtube, video_id, metadata):
-            success_count += 1
-        
-        print()  # Linha em branco para separar
+    # Estado atual de todos os vídeos com videos.list em lotes de 50
+    print("📥 Buscando estado atual dos vídeos em lote...")
+    try:
+        states = prefetch_video_states(setup_youtube_client(creds), metadata_dict.keys(), quota)
+        print(f"✅ {len(states)} vídeos encontrados com {quota.calls['list']} chamada(s) videos.list\n")
+    except QuotaExhausted as e:
+        print(f"⛔ Quota esgotada durante a busca em lote: {e}")
+        print(f"⏸️  {len(metadata_dict)} vídeos continuam pendentes para a próxima execução")
+        return
+    
+    statuses = update_all_videos(
+        lambda: setup_youtube_client(creds),
+        metadata_dict,
+        quota,
+        states=states,
+        on_result=lambda video_id, result: record_upload_result(state, video_id, result)
+    )
+    state.compact()
+    with VideoCatalog.open() as catalog:
+        catalog.sync_statuses(state)
+    updated_count = sum(1 for status in statuses.values() if status == UPDATED)
+    unchanged_count = sum(1 for status in statuses.values() if status == UNCHANGED)
+    success_count = updated_count + unchanged_count
+    pending = [video_id for video_id, status in statuses.items() if status == PENDING]
     
     # Resultado final
-    print("=== Processamento Concluído ===")
-    print(f"Vídeos atualizados com sucesso: {success_count}/{total_videos}")
+    print("\n=== Processamento Concluído ===")
+    print(f"Vídeos atualizados com sucesso: {success_count}/{total_videos} ({updated_count} alterados, {unchanged_count} já estavam atualizados)")
+    print(f"Quota usada: {quota.used}/{quota.budget} unidades ({quota.calls['list']} list, {quota.calls['update']} update)")
+    metrics.increment("youtube_quota_units", quota.used)
+    
+    if pending:
+        print(f"⏸️  {len(pending)} vídeos pendentes por falta de quota")
+        print("   Execute novamente após a renovação da quota para continuar de onde parou")
     
     if success_count == total_videos:
         print("🎉 Todos os vídeos foram atualizados!")
@@ -178,6 +395,8 @@ def main():
         print("⚠️  Alguns vídeos foram atualizados com sucesso")
     else:
         print("❌ Nenhum vídeo foi atualizado")
+    
+    metrics.write_report("04_update_youtube")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,189 @@
+import json
+import re
+import time
+import metrics
+
+# Geração em lote com Bedrock Batch Inference (create_model_invocation_job)
+
+BATCH_ROLE_ARN = "arn:aws:iam::471112955224:role/BedrockBatchInferenceRole"  # Role com leitura/escrita no bucket
+BATCH_S3_PREFIX = "batch-inference"  # Prefixo no bucket para entrada e saída dos jobs
+PROMPT_TEMPLATE_FILE = "prompt/prompt_en.txt"  # Texto usado se a variante do prompt não for do tipo TEXT
+STRUCTURED_PROMPT_TEMPLATE_FILE = "prompt/prompt_en_structured.txt"  # Variante da saída estruturada: o formato vem do esquema da ferramenta
+INFERENCE_PARAMETERS = ("maxTokens", "temperature", "topP", "stopSequences")  # Campos do inferenceConfig do converse
+BATCH_MIN_RECORDS = 100  # Mínimo de registros aceito pelo Bedrock por job
+BATCH_MAX_RECORDS = 50000  # Máximo de registros por job (quota padrão); acima disso, vários jobs
+POLL_INTERVAL = 60  # Segundos entre consultas de status
+MAX_WAIT_HOURS = 72  # Tempo máximo aguardando os jobs
+
+# Estados finais de um job
+TERMINAL_STATUSES = {"Completed", "PartiallyCompleted", "Failed", "Stopped", "Expired"}
+
+def load_prompt_template(path=None):
+    with open(path or PROMPT_TEMPLATE_FILE, "r", encoding="utf-8") as file:
+        return file.read()
+
+def fetch_prompt_resource(agent_client, prompt_arn):
+    """Modelo, inferenceConfig e texto da variante padrão de um prompt do Prompt Manager
+
+    Jobs em lote não aceitam o ARN do prompt: o modelo e os parâmetros vêm
+    do próprio recurso (bedrock-agent get_prompt), então a saída é a mesma
+    do converse com o ARN. Um ARN terminado em ':<versão>' consulta essa
+    versão. template é None se a variante não for do tipo TEXT. Lança
+    ValueError se a variante não define o modelo.
+    """
+    identifier, _, version = prompt_arn.rsplit("/", 1)[-1].partition(":")
+    params = {"promptIdentifier": identifier}
+    if version:
+        params["promptVersion"] = version
+    prompt = agent_client.get_prompt(**params)
+    variants = prompt.get("variants") or []
+    variant = next((item for item in variants if item.get("name") == prompt.get("defaultVariant")), None)
+    variant = variant or (variants[0] if variants else {})
+    if not variant.get("modelId"):
+        raise ValueError(f"O prompt {prompt_arn} não define o modelo na variante padrão")
+    inference = variant.get("inferenceConfiguration", {}).get("text", {})
+    return {
+        "model_id": variant["modelId"],
+        "inference_config": {name: inference[name] for name in INFERENCE_PARAMETERS if name in inference},
+        "template": variant.get("templateConfiguration", {}).get("text", {}).get("text")
+    }
+
+def render_prompt(template, variables):
+    """Substitui {{nome}} pelo texto das variáveis no formato de promptVariables"""
+    return re.sub(
+        r"\{\{(\w+)\}\}",
+        lambda match: variables[match.group(1)]["text"] if match.group(1) in variables else match.group(0),
+        template
+    )
+
+def build_record(record_id, messages, system_prompt, inference_config, tool_config=None):
+    """Registro JSONL de entrada no formato nativo do modelo (messages-v1)
+
+    messages e tool_config usam a mesma estrutura do converse, com o
+    documento referenciado por s3Location; a resposta do modelo tem o mesmo
+    formato de saída.
+    """
+    model_input = {
+        "schemaVersion": "messages-v1",
+        "system": [{"text": system_prompt}],
+        "messages": messages,
+        "inferenceConfig": inference_config
+    }
+    if tool_config:
+        model_input["toolConfig"] = tool_config
+    return {"recordId": record_id, "modelInput": model_input}
+
+def write_input(s3_client, bucket, key, records):
+    """Grava os registros como JSONL no S3"""
+    body = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode("utf-8")
+    s3_client.put_object(Bucket=bucket, Key=key, Body=body, ContentType="application/jsonl")
+    return len(body)
+
+def submit_job(bedrock_client, job_name, input_uri, output_uri, model_id, role_arn=BATCH_ROLE_ARN):
+    """Cria o job de inferência em lote; retorna o ARN"""
+    response = bedrock_client.create_model_invocation_job(
+        jobName=job_name,
+        roleArn=role_arn,
+        modelId=model_id,
+        inputDataConfig={"s3InputDataConfig": {"s3Uri": input_uri, "s3InputFormat": "JSONL"}},
+        outputDataConfig={"s3OutputDataConfig": {"s3Uri": output_uri}}
+    )
+    return response["jobArn"]
+
+def wait_for_jobs(bedrock_client, job_arns, poll_interval=None, max_wait_hours=None, sleep=time.sleep):
+    """Consulta os jobs até todos chegarem a um estado final; retorna {ARN: status}
+
+    Jobs que não terminam dentro de max_wait_hours (padrão: MAX_WAIT_HOURS)
+    ficam com o último status observado (o job continua na AWS e a saída
+    pode ser lida depois).
+    """
+    poll_interval = POLL_INTERVAL if poll_interval is None else poll_interval
+    max_wait_hours = MAX_WAIT_HOURS if max_wait_hours is None else max_wait_hours
+    statuses = {job_arn: None for job_arn in job_arns}
+    deadline = time.monotonic() + max_wait_hours * 3600
+    while True:
+        for job_arn, previous in statuses.items():
+            if previous in TERMINAL_STATUSES:
+                continue
+            job = bedrock_client.get_model_invocation_job(jobIdentifier=job_arn)
+            if job["status"] != previous:
+                print(f"  ⏳ Job {job_arn.rsplit('/', 1)[-1]}: {job['status']}" + (f" ({job['message']})" if job.get("message") else ""))
+            statuses[job_arn] = job["status"]
+        if all(status in TERMINAL_STATUSES for status in statuses.values()) or time.monotonic() >= deadline:
+            return statuses
+        sleep(poll_interval)
+
+def read_output(s3_client, bucket, output_prefix):
+    """Lê os registros de saída (*.jsonl.out) sob output_prefix; retorna {recordId: registro}"""
+    records = {}
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=output_prefix):
+        for item in page.get("Contents", []):
+            if not item["Key"].endswith(".jsonl.out"):
+                continue
+            body = s3_client.get_object(Bucket=bucket, Key=item["Key"])["Body"].read()
+            for line in body.decode("utf-8").splitlines():
+                if line.strip():
+                    record = json.loads(line)
+                    records[record["recordId"]] = record
+    return records
+
+def output_content(record):
+    """Blocos de conteúdo da resposta do modelo (texto ou toolUse) ou None (registro com erro)"""
+    if record is None or record.get("error") or "modelOutput" not in record:
+        return None
+    output = record["modelOutput"]
+    usage = output.get("usage", {})
+    if usage:
+        metrics.observe("bedrock_input_tokens", usage.get("inputTokens", 0))
+        metrics.observe("bedrock_output_tokens", usage.get("outputTokens", 0))
+    return output["output"]["message"]["content"]
+
+def chunk_records(records, max_records=None):
+    """Divide os registros em jobs de tamanhos equilibrados
+
+    Usa ceil(total / max_records) jobs de tamanhos quase iguais: com mais de
+    um job cada um tem mais da metade de max_records, então nenhum fica
+    abaixo de BATCH_MIN_RECORDS como ficaria a sobra de cortes fixos.
+    """
+    max_records = max_records or BATCH_MAX_RECORDS
+    jobs = max(1, -(-len(records) // max_records))
+    size, extra = divmod(len(records), jobs)
+    chunks = []
+    start = 0
+    for index in range(jobs):
+        end = start + size + (1 if index < extra else 0)
+        chunks.append(records[start:end])
+        start = end
+    return chunks
+
+def run_batch(bedrock_client, s3_client, bucket, records, run_name, model_id, sleep=time.sleep):
+    """Envia os registros em um ou mais jobs para model_id e aguarda a conclusão
+
+    Entrada em s3://bucket/BATCH_S3_PREFIX/<run_name>/input-<n>.jsonl e saída
+    sob .../output/. Retorna ({recordId: registro de saída}, {ARN: status});
+    registros ausentes na saída (job com falha) não aparecem no resultado.
+    """
+    base_prefix = f"{BATCH_S3_PREFIX}/{run_name}"
+    output_prefix = f"{base_prefix}/output/"
+    job_arns = []
+
+    with metrics.timer("stage_seconds", stage="batch"):
+        for part, chunk in enumerate(chunk_records(records), 1):
+            input_key = f"{base_prefix}/input-{part}.jsonl"
+            size = write_input(s3_client, bucket, input_key, chunk)
+            job_arn = submit_job(
+                bedrock_client,
+                f"{run_name}-{part}",
+                f"s3://{bucket}/{input_key}",
+                f"s3://{bucket}/{output_prefix}",
+                model_id
+            )
+            print(f"  📤 Job {part}: {len(chunk)} registros ({size / 1024:.0f} KB) → {job_arn}")
+            job_arns.append(job_arn)
+
+        statuses = wait_for_jobs(bedrock_client, job_arns, sleep=sleep)
+
+    for status in statuses.values():
+        metrics.increment("batch_jobs", status=status)
+    return read_output(s3_client, bucket, output_prefix), statuses
@@ -0,0 +1,255 @@
+import asyncio
+import functools
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import boto3
+import google_auth_httplib2
+import google_auth_oauthlib.flow
+import googleapiclient.discovery
+import httplib2
+import metrics
+from botocore.config import Config
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from googleapiclient import discovery_cache
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest
+
+# Camada de clientes compartilhada pelos scripts (S3, Bedrock e YouTube)
+
+REGION = "us-east-1"
+MAX_POOL_CONNECTIONS = 50  # Conexões HTTP mantidas por cliente AWS (padrão do botocore: 10)
+TOKEN_FILE = "token.json"
+CLIENT_SECRET_FILE = "client_secret.json"
+YOUTUBE_READONLY_SCOPES = ["https://www.googleapis.com/auth/youtube.readonly"]
+YOUTUBE_SCOPES = ["https://www.googleapis.com/auth/youtube"]
+
+_lock = threading.Lock()
+_aws_clients = {}
+_credentials = {}
+_youtube_local = threading.local()
+
+def _body_size(body):
+    """Tamanho do corpo da requisição (bytes ou arquivo posicionável)"""
+    if body is None:
+        return 0
+    if isinstance(body, (bytes, bytearray, str)):
+        return len(body)
+    if hasattr(body, "seek") and hasattr(body, "tell"):
+        position = body.tell()
+        body.seek(0, os.SEEK_END)
+        size = body.tell() - position
+        body.seek(position)
+        return size
+    return 0
+
+def instrument_aws_client(client):
+    """Registra latência, retentativas, erros e bytes de cada chamada via eventos do botocore"""
+    service = client.meta.service_model.service_name
+
+    def before_call(model, params, context, **kwargs):
+        context["metrics_started_at"] = time.perf_counter()
+        context["metrics_operation"] = model.name
+        sent = _body_size(params.get("body"))
+        if sent:
+            metrics.increment("aws_bytes_sent", sent, service=service, operation=model.name)
+
+    def after_call(parsed, model, context, **kwargs):
+        started_at = context.get("metrics_started_at")
+        if started_at is not None:
+            metrics.observe("aws_call_seconds", time.perf_counter() - started_at, service=service, operation=model.name)
+        retries = parsed.get("ResponseMetadata", {}).get("RetryAttempts", 0)
+        if retries:
+            metrics.increment("aws_retries", retries, service=service, operation=model.name)
+        error = parsed.get("Error", {}).get("Code")
+        if error:
+            metrics.increment("aws_errors", service=service, operation=model.name, code=error)
+        if parsed.get("ContentLength"):
+            metrics.increment("aws_bytes_received", parsed["ContentLength"], service=service, operation=model.name)
+
+    def after_call_error(context, exception, **kwargs):
+        # Falha de rede (sem resposta HTTP)
+        operation = context.get("metrics_operation", "unknown")
+        metrics.increment("aws_errors", service=service, operation=operation, code=type(exception).__name__)
+
+    client.meta.events.register_first("before-call.*.*", before_call)
+    client.meta.events.register("after-call.*.*", after_call)
+    client.meta.events.register("after-call-error.*.*", after_call_error)
+    return client
+
+class InstrumentedHttpRequest(HttpRequest):
+    """HttpRequest da googleapiclient que registra latência, erros e bytes enviados"""
+
+    def execute(self, http=None, num_retries=0):
+        method = self.methodId or "unknown"
+        start = time.perf_counter()
+        try:
+            return super().execute(http=http, num_retries=num_retries)
+        except HttpError as e:
+            metrics.increment("youtube_errors", method=method, status=e.resp.status)
+            raise
+        finally:
+            metrics.observe("youtube_call_seconds", time.perf_counter() - start, method=method)
+            metrics.increment("youtube_calls", method=method)
+            if self.body:
+                metrics.increment("youtube_bytes_sent", len(self.body), method=method)
+
+def aws_client(service_name, region_name=REGION, max_pool_connections=MAX_POOL_CONNECTIONS, **config):
+    """Cliente boto3 compartilhado por serviço e região
+
+    Clientes boto3 são thread-safe: uma única instância com pool de
+    conexões dimensionado atende todas as threads, em vez de um cliente
+    (e um handshake TLS) por script ou por tarefa. config repassa opções
+    extras do botocore (ex.: retries).
+    """
+    key = (service_name, region_name, max_pool_connections, json.dumps(config, sort_keys=True))
+    with _lock:
+        if key not in _aws_clients:
+            _aws_clients[key] = instrument_aws_client(boto3.client(
+                service_name,
+                region_name=region_name,
+                config=Config(max_pool_connections=max_pool_connections, **config)
+            ))
+        return _aws_clients[key]
+
+def s3_client(region_name=REGION):
+    """Cliente S3 compartilhado"""
+    return aws_client("s3", region_name)
+
+def bedrock_runtime_client(region_name=REGION):
+    """Cliente bedrock-runtime compartilhado
+
+    Retentativas ficam a cargo do call_with_retry (rate_limiter.py), que conhece o limitador.
+    """
+    return aws_client("bedrock-runtime", region_name, retries={"total_max_attempts": 1})
+
+def bedrock_client(region_name=REGION):
+    """Cliente bedrock (plano de controle: jobs de Batch Inference) compartilhado"""
+    return aws_client("bedrock", region_name)
+
+def bedrock_agent_client(region_name=REGION):
+    """Cliente bedrock-agent (Prompt Manager: modelo e parâmetros do prompt) compartilhado"""
+    return aws_client("bedrock-agent", region_name)
+
+def get_credentials(scopes=YOUTUBE_SCOPES):
+    """Obtém credenciais OAuth, reutilizando o token salvo e as já carregadas no processo
+
+    Token expirado com refresh token é renovado sem abrir o navegador;
+    token inválido é removido e um novo é gerado.
+    """
+    key = tuple(scopes)
+    with _lock:
+        creds = _credentials.get(key)
+        if creds is not None and creds.valid:
+            return creds
+
+        creds = None
+        if os.path.exists(TOKEN_FILE):
+            try:
+                # Tenta usar token existente
+                creds = Credentials.from_authorized_user_file(TOKEN_FILE, scopes=scopes)
+                if not creds.valid and creds.expired and creds.refresh_token:
+                    creds.refresh(Request())
+            except Exception as e:
+                print(f"🔄 Token inválido ({e}), gerando novo...")
+                os.remove(TOKEN_FILE)
+                creds = None
+
+        if creds is None:
+            # Gera novo token apenas se necessário
+            flow = google_auth_oauthlib.flow.InstalledAppFlow.from_client_secrets_file(CLIENT_SECRET_FILE, scopes)
+            creds = flow.run_local_server(port=0)
+
+        with open(TOKEN_FILE, "w") as token:
+            token.write(creds.to_json())
+
+        _credentials[key] = creds
+        return creds
+
+@functools.lru_cache(maxsize=None)
+def discovery_document(service_name="youtube", version="v3"):
+    """Documento de descoberta da API, lido e interpretado uma única vez por processo"""
+    document = discovery_cache.get_static_doc(service_name, version)
+    return json.loads(document) if document else None
+
+def build_youtube_client(creds=None, scopes=YOUTUBE_SCOPES):
+    """Cria cliente YouTube Data API a partir do documento de descoberta em cache
+
+    O cliente HTTP (httplib2) não é thread-safe: use um cliente por thread
+    (youtube_client()) quando houver concorrência.
+    """
+    if creds is None:
+        creds = get_credentials(scopes)
+    http = google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http())
+    document = discovery_document("youtube", "v3")
+    if document is None:
+        # Biblioteca sem documento embutido: busca pela rede (com cache da própria biblioteca)
+        return googleapiclient.discovery.build("youtube", "v3", http=http, requestBuilder=InstrumentedHttpRequest)
+    return googleapiclient.discovery.build_from_document(document, http=http, requestBuilder=InstrumentedHttpRequest)
+
+def youtube_client(creds=None, scopes=YOUTUBE_SCOPES):
+    """Cliente YouTube da thread atual, criado na primeira chamada e reutilizado depois"""
+    clients = getattr(_youtube_local, "clients", None)
+    if clients is None:
+        clients = _youtube_local.clients = {}
+    key = tuple(scopes) if creds is None else id(creds)
+    if key not in clients:
+        clients[key] = build_youtube_client(creds, scopes)
+    return clients[key]
+
+class AsyncClient:
+    """Versão assíncrona de um cliente bloqueante (boto3 ou googleapiclient)
+
+    Cada método vira uma corrotina executada em um pool de threads
+    limitado ao tamanho do pool de conexões: milhares de corrotinas podem
+    aguardar sem criar uma thread por requisição. Para o YouTube, passe
+    factory (ex.: youtube_client) para que cada thread do pool use seu
+    próprio cliente; requisições googleapiclient são executadas com execute().
+    """
+
+    def __init__(self, client=None, factory=None, max_concurrency=MAX_POOL_CONNECTIONS):
+        self._factory = factory or (lambda: client)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+
+    async def run(self, operation):
+        """Executa operation(cliente) no pool e aguarda o resultado"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: operation(self._factory()))
+
+    async def execute(self, build_request):
+        """Executa uma requisição googleapiclient: build_request(cliente).execute()"""
+        return await self.run(lambda client: build_request(client).execute())
+
+    def __getattr__(self, name):
+        async def method(*args, **kwargs):
+            return await self.run(lambda client: getattr(client, name)(*args, **kwargs))
+        return method
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+def async_s3_client(region_name=REGION):
+    """Variante assíncrona do cliente S3 compartilhado"""
+    return AsyncClient(s3_client(region_name))
+
+def async_bedrock_runtime_client(region_name=REGION):
+    """Variante assíncrona do cliente bedrock-runtime compartilhado"""
+    return AsyncClient(bedrock_runtime_client(region_name))
+
+def async_youtube_client(creds=None, scopes=YOUTUBE_SCOPES, max_concurrency=MAX_POOL_CONNECTIONS):
+    """Variante assíncrona do cliente YouTube: um cliente por thread do pool
+
+    As credenciais são obtidas antes (na thread atual), para que um fluxo
+    OAuth nunca seja aberto dentro do pool.
+    """
+    creds = creds or get_credentials(scopes)
+    return AsyncClient(factory=lambda: youtube_client(creds, scopes), max_concurrency=max_concurrency)
@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import fitz  # PyMuPDF
+import metrics
+from pipeline_state import write_json_atomic
+
+# Impressões digitais de documentos para detectar arquivos idênticos e quase idênticos
+
+FINGERPRINT_FILE = "YouTube_Data/document_fingerprints.json"
+SHINGLE_SIZE = 3  # Palavras por shingle do SimHash
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 4  # Faixas de bits usadas para encontrar candidatos (deve ser > NEAR_DUPLICATE_DISTANCE)
+NEAR_DUPLICATE_DISTANCE = 3  # Bits diferentes tolerados entre SimHashes de quase duplicatas
+TEXT_TYPES = ["pdf", "md", "txt", "html"]  # Tipos com texto extraível para o SimHash
+WORD_PATTERN = re.compile(r"\w+")
+
+def document_text(content, file_type):
+    """Texto puro do documento (None para tipos binários sem extração)"""
+    if file_type == "pdf":
+        with fitz.open(stream=content, filetype="pdf") as doc:
+            return "\n".join(page.get_text() for page in doc)
+    if file_type in TEXT_TYPES:
+        return content.decode("utf-8", errors="replace")
+    return None
+
+def simhash(text, shingle_size=SHINGLE_SIZE):
+    """SimHash de 64 bits dos shingles de palavras do texto
+
+    Cada shingle vira um hash de 8 bytes; os hashes são concatenados e cada
+    posição de byte é contada de uma vez (Counter sobre a fatia), então o
+    custo por shingle é o do hash, não o de 64 somas por bit.
+    """
+    words = WORD_PATTERN.findall(text.lower())
+    if not words:
+        return 0
+    shingles = {" ".join(words[i:i + shingle_size]) for i in range(max(1, len(words) - shingle_size + 1))}
+    digests = b"".join(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest() for shingle in shingles)
+
+    value = 0
+    half = len(shingles) / 2
+    for position in range(8):
+        byte_counts = Counter(digests[position::8])
+        for bit in range(8):
+            ones = sum(count for byte, count in byte_counts.items() if byte >> bit & 1)
+            if ones > half:
+                value |= 1 << (position * 8 + bit)
+    return value
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+class FingerprintIndex:
+    """Índice persistente chave S3 -> impressões digitais do conteúdo
+
+    Cada entrada guarda ETag e tamanho (identidade exata sem download),
+    SHA-256 do conteúdo e SimHash do texto (quase duplicatas). Entradas são
+    reaproveitadas enquanto o ETag da chave não muda, então cada versão de
+    documento é baixada e analisada uma única vez.
+    """
+
+    def __init__(self, path=FINGERPRINT_FILE, max_distance=NEAR_DUPLICATE_DISTANCE):
+        self.path = path
+        self.max_distance = max_distance
+        self.entries = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path=FINGERPRINT_FILE, max_distance=NEAR_DUPLICATE_DISTANCE):
+        index = cls(path, max_distance)
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as file:
+                    index.entries = json.load(file)
+            except json.JSONDecodeError:
+                index.entries = {}
+        return index
+
+    def save(self):
+        with self._lock:
+            write_json_atomic(self.path, self.entries)
+
+    def lookup(self, key, etag):
+        """Entrada da chave se ainda corresponde ao ETag atual"""
+        with self._lock:
+            entry = self.entries.get(key)
+        if entry and entry.get("etag") == etag:
+            return entry
+        return None
+
+    def record(self, key, etag, size, content, file_type):
+        """Calcula SHA-256 e SimHash do conteúdo e registra a entrada"""
+        text = document_text(content, file_type)
+        entry = {
+            "etag": etag,
+            "size": size,
+            "sha256": hashlib.sha256(content).hexdigest(),
+            "simhash": format(simhash(text), "016x") if text else None
+        }
+        with self._lock:
+            self.entries[key] = entry
+        return entry
+
+    def fingerprint(self, s3_client, bucket, inventory, keys, file_types, workers=8):
+        """Baixa e analisa as chaves sem entrada válida; retorna quantas foram analisadas
+
+        Chaves com mesmo ETag e tamanho são o mesmo conteúdo: só uma de cada
+        grupo é baixada e as demais recebem a mesma entrada.
+        """
+        by_content = {}
+        for key in keys:
+            info = inventory.get(key)
+            if info is None or self.lookup(key, info.etag):
+                continue
+            by_content.setdefault((info.etag, info.size), []).append(key)
+
+        def analyze(group):
+            key = group[0]
+            info = inventory.get(key)
+            with metrics.timer("stage_seconds", stage="fingerprint"):
+                content = s3_client.get_object(Bucket=bucket, Key=key)["Body"].read()
+                entry = self.record(key, info.etag, info.size, content, file_types.get(key, ""))
+            with self._lock:
+                for other in group[1:]:
+                    self.entries[other] = dict(entry)
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            list(executor.map(analyze, by_content.values()))
+        return len(by_content)
+
+    def group(self, keys, inventory, near_duplicates=True):
+        """Agrupa chaves com o mesmo conteúdo; retorna {chave: representante}
+
+        Mesmo ETag e tamanho, mesmo SHA-256 ou (com near_duplicates) SimHash a
+        até max_distance bits unem chaves no mesmo grupo. O representante é a
+        primeira chave do grupo na ordem recebida. Candidatos a quase
+        duplicata vêm de faixas de bits idênticas: com distância menor que o
+        número de faixas, ao menos uma faixa coincide, evitando comparar todos
+        os pares.
+        """
+        keys = [key for key in dict.fromkeys(keys) if inventory.get(key) is not None]
+        parent = {key: key for key in keys}
+        order = {key: position for position, key in enumerate(keys)}
+
+        def find(key):
+            while parent[key] != key:
+                parent[key] = parent[parent[key]]
+                key = parent[key]
+            return key
+
+        def union(a, b):
+            root_a, root_b = find(a), find(b)
+            if root_a != root_b:
+                # O representante é sempre a chave que aparece primeiro
+                first, second = sorted((root_a, root_b), key=order.get)
+                parent[second] = first
+
+        buckets = {}
+        band_bits = SIMHASH_BITS // SIMHASH_BANDS
+        band_mask = (1 << band_bits) - 1
+        hashes = {}
+        for key in keys:
+            info = inventory.get(key)
+            # Objetos enviados sem ETag conhecido só se agrupam pelo conteúdo
+            identities = [("etag", info.etag, info.size)] if info.etag else []
+            entry = self.lookup(key, info.etag)
+            if entry:
+                identities.append(("sha256", entry["sha256"]))
+                if near_duplicates and entry.get("simhash"):
+                    hashes[key] = int(entry["simhash"], 16)
+                    identities.extend(("band", band, hashes[key] >> (band * band_bits) & band_mask) for band in range(SIMHASH_BANDS))
+            for identity in identities:
+                members = buckets.setdefault(identity, [])
+                if identity[0] == "band":
+                    for other in members:
+                        if find(other) != find(key) and hamming_distance(hashes[other], hashes[key]) <= self.max_distance:
+                            union(other, key)
+                elif members:
+                    union(members[0], key)
+                members.append(key)
+
+        return {key: find(key) for key in keys}
+
+def duplicate_groups(representatives):
+    """{representante: [chaves]} só para grupos com mais de uma chave"""
+    groups = {}
+    for key, representative in representatives.items():
+        groups.setdefault(representative, []).append(key)
+    return {representative: members for representative, members in groups.items() if len(members) > 1}
@@ -0,0 +1,144 @@
+import os
+import shutil
+import tempfile
+import fitz  # PyMuPDF
+from collections import Counter
+from extra_pdf_to_markdown import iter_markdown_lines
+
+# Preparação de documentos antes do envio ao Bedrock
+
+CHARS_PER_TOKEN = 4  # Estimativa média de caracteres por token
+INTRO_LINES = 3  # Linhas iniciais de cada seção priorizadas após os títulos
+REPEATED_LINE_LIMIT = 3  # Linhas repetidas mais vezes que isso (cabeçalhos/rodapés) são descartadas
+CONDENSABLE_TYPES = ["pdf", "md", "txt"]
+CONDENSED_PREFIX = "condensed/"  # Prefixo das versões condensadas, separado dos documentos originais
+STREAM_CHUNK_SIZE = 1024 * 1024  # Bloco de leitura do download (1 MB)
+
+def estimate_tokens(text):
+    """Estimativa de tokens pelo número de caracteres"""
+    return len(text) // CHARS_PER_TOKEN
+
+def extract_markdown(content, file_type):
+    """Converte o conteúdo do documento para Markdown"""
+    if file_type == "pdf":
+        with fitz.open(stream=content, filetype="pdf") as doc:
+            return "\n".join(iter_markdown_lines(doc))
+    return content.decode("utf-8", errors="replace")
+
+def extract_markdown_stream(body, file_type):
+    """Converte o documento lido de um corpo de resposta S3, em blocos
+
+    O corpo é copiado em blocos para um arquivo temporário, aberto pelo
+    PyMuPDF (PDF) ou lido como texto, sem manter os bytes do objeto inteiro
+    em memória.
+    """
+    suffix = ".pdf" if file_type == "pdf" else ".txt"
+    handle, path = tempfile.mkstemp(suffix=suffix, prefix="prepare_")
+    try:
+        with os.fdopen(handle, "wb") as file:
+            shutil.copyfileobj(body, file, STREAM_CHUNK_SIZE)
+        if file_type == "pdf":
+            with fitz.open(path) as doc:
+                return "\n".join(iter_markdown_lines(doc))
+        with open(path, "r", encoding="utf-8", errors="replace") as file:
+            return file.read()
+    finally:
+        os.remove(path)
+
+def split_sections(markdown):
+    """Divide o Markdown em seções pelos títulos '## '
+
+    Linhas repetidas em excesso (cabeçalhos e rodapés de página) e
+    separadores de página são descartados.
+    """
+    counts = Counter(line.strip() for line in markdown.split("\n"))
+    sections = []
+    current = {"heading": None, "lines": []}
+    seen_headings = set()
+
+    for line in markdown.split("\n"):
+        line = line.strip()
+        if not line or line == "---" or counts[line] > REPEATED_LINE_LIMIT:
+            continue
+        if line.startswith("## "):
+            if line in seen_headings:
+                continue
+            seen_headings.add(line)
+            if current["heading"] or current["lines"]:
+                sections.append(current)
+            current = {"heading": line, "lines": []}
+        else:
+            current["lines"].append(line)
+
+    if current["heading"] or current["lines"]:
+        sections.append(current)
+    return sections
+
+def condense_markdown(markdown, token_budget):
+    """Reduz o Markdown às partes mais informativas dentro de token_budget
+
+    As seções são preenchidas em três passadas, em ordem de documento:
+    títulos (estrutura completa), primeiras linhas de cada seção e, por fim,
+    o restante do texto enquanto houver orçamento.
+    Retorna (markdown, tokens originais, tokens finais).
+    """
+    original_tokens = estimate_tokens(markdown)
+    if original_tokens <= token_budget:
+        return markdown, original_tokens, original_tokens
+
+    budget_chars = token_budget * CHARS_PER_TOKEN
+    sections = split_sections(markdown)
+    selected = [[] for _ in sections]
+    used = 0
+
+    passes = [
+        lambda section: [section["heading"]] if section["heading"] else [],
+        lambda section: section["lines"][:INTRO_LINES],
+        lambda section: section["lines"][INTRO_LINES:]
+    ]
+    for select_lines in passes:
+        for index, section in enumerate(sections):
+            for line in select_lines(section):
+                if used + len(line) + 1 > budget_chars:
+                    break
+                selected[index].append(line)
+                used += len(line) + 1
+
+    condensed = "\n\n".join("\n".join(block) for block in selected if block)
+    return condensed, original_tokens, estimate_tokens(condensed)
+
+def condensed_key(file_key):
+    """Chave S3 da versão condensada sob CONDENSED_PREFIX (sem pontos extras, exigência do nome do documento)"""
+    return CONDENSED_PREFIX + file_key.rsplit(".", 1)[0] + "-condensed.md"
+
+def prepare_document(s3_client, bucket, file_key, file_type, token_budget):
+    """Condensa o documento se ele exceder token_budget
+
+    Retorna (chave, tipo, relatório) do documento a enviar ao Bedrock. Tipos
+    não suportados ou documentos dentro do orçamento são enviados sem mudança.
+    """
+    report = {"original_tokens": None, "final_tokens": None, "saved_tokens": 0, "condensed": False}
+    if file_type not in CONDENSABLE_TYPES:
+        return file_key, file_type, report
+
+    response = s3_client.get_object(Bucket=bucket, Key=file_key)
+    markdown = extract_markdown_stream(response["Body"], file_type)
+    condensed, original_tokens, final_tokens = condense_markdown(markdown, token_budget)
+    report.update({
+        "original_tokens": original_tokens,
+        "final_tokens": final_tokens,
+        "saved_tokens": original_tokens - final_tokens
+    })
+
+    if original_tokens <= token_budget:
+        return file_key, file_type, report
+
+    target_key = condensed_key(file_key)
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=target_key,
+        Body=condensed.encode("utf-8"),
+        ContentType="text/markdown"
+    )
+    report["condensed"] = True
+    return target_key, "md", report
@@ -0,0 +1,275 @@
+import contextlib
+import csv
+import importlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import batch_inference
+import metrics
+from local_fakes import (
+    FakeBedrockAgentClient,
+    FakeBedrockRuntimeClient,
+    FakeS3Client,
+    FakeYouTubeClient,
+    build_fake_metadata,
+    build_synthetic_pdf
+)
+from rate_limiter import AdaptiveRateLimiter
+
+try:
+    import resource  # Pico de RSS do processo e dos processos filhos (somente Unix)
+except ImportError:
+    resource = None
+
+# Módulos dos scripts (nomes iniciados por dígito não podem ser importados com 'import')
+validate = importlib.import_module("02_validate_files")
+generate = importlib.import_module("03_generate_metadata")
+update = importlib.import_module("04_update_youtube")
+converter = importlib.import_module("extra_pdf_to_markdown")
+
+# Tamanhos do catálogo sintético (linhas do CSV)
+ROW_COUNTS = [10, 1000, 10000]
+
+# Latência e falhas injetadas nos substitutos locais
+S3_LATENCY = 0.002  # Segundos por requisição S3
+YOUTUBE_LATENCY = 0.005  # Segundos por requisição YouTube
+YOUTUBE_ERROR_RATE = 0.01  # Proporção de videos.update com HTTP 500
+BEDROCK_LATENCY = 0.02  # Segundos por chamada converse
+BEDROCK_THROTTLE_RATE = 0.02  # Proporção de ThrottlingException
+BEDROCK_UNAVAILABLE_RATE = 0.01  # Proporção de ServiceUnavailableException
+RETRY_BASE_DELAY = 0.01  # Backoff base usado no benchmark (o real é 2s)
+SEED = 42  # Semente das falhas injetadas (resultados reproduzíveis)
+
+# Carga por etapa
+WORKERS = 16  # Threads para geração e atualização
+PDF_PAGES = 5  # Páginas de cada PDF sintético
+PDF_VARIANTS = 10  # PDFs distintos gerados e reutilizados entre as linhas
+MAX_PDF_ROWS = 1000  # Limite de conversões por tamanho (PDF é a etapa mais cara)
+TRACE_MEMORY = True  # Mede o pico do heap Python com tracemalloc (adiciona sobrecarga); o RSS é medido sempre
+RESULTS_FILE = "YouTube_Data/benchmarks/benchmark_results.json"
+
+def build_videos(rows):
+    """Catálogo sintético no formato de load_video_data"""
+    return [
+        {
+            "video_id": f"vid{index:05d}",
+            "video_title": f"Synthetic video {index:05d}",
+            "file_name": f"{index:05d}_guide.mp4",
+            "file_type": "pdf",
+            "reference_link": ""
+        }
+        for index in range(rows)
+    ]
+
+def write_csv(videos, csv_path):
+    """Grava o catálogo no mesmo formato de videos_table.csv"""
+    os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+    with open(csv_path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.DictWriter(file, fieldnames=["video_id", "video_title", "file_name", "file_type", "reference_link"])
+        writer.writeheader()
+        writer.writerows(videos)
+
+def peak_rss_mb(children=False):
+    """Pico de RSS em MB desde o início do processo (None fora do Unix)
+    
+    Com children, o maior pico entre os processos filhos já encerrados (ex.:
+    workers do ProcessPoolExecutor). Inclui memória nativa como a do MuPDF.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss é em KB no Linux e em bytes no macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def stage_stats(name, rows, items, elapsed, latencies, peak_bytes, errors=0, rss_mb=None, children_rss_mb=None):
+    """Resumo de uma etapa: vazão, percentis de latência por item e memória
+    
+    peak_bytes é o pico do heap Python (tracemalloc); rss_mb e
+    children_rss_mb são os picos de RSS acumulados do processo e dos filhos.
+    """
+    ordered = sorted(latencies)
+    return {
+        "stage": name,
+        "rows": rows,
+        "items": items,
+        "seconds": elapsed,
+        "throughput_per_second": items / elapsed if elapsed > 0 else None,
+        "p50_ms": metrics.percentile(ordered, 0.5) * 1000 if ordered else None,
+        "p95_ms": metrics.percentile(ordered, 0.95) * 1000 if ordered else None,
+        "p99_ms": metrics.percentile(ordered, 0.99) * 1000 if ordered else None,
+        "python_heap_peak_mb": peak_bytes / (1024 * 1024) if peak_bytes is not None else None,
+        "rss_peak_mb": rss_mb,
+        "children_rss_peak_mb": children_rss_mb,
+        "errors": errors
+    }
+
+def run_stage(name, rows, function):
+    """Executa function() medindo tempo e memória, sem a saída dos scripts
+
+    function retorna (itens processados, latências por item, erros). Sem
+    latências por item, a duração total da etapa é usada como única amostra.
+    O pico do heap Python é da etapa; os picos de RSS são marcas máximas
+    desde o início do processo, então só crescem de uma etapa para a outra.
+    """
+    metrics.REGISTRY.reset()
+    if TRACE_MEMORY:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            items, latencies, errors = function()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if TRACE_MEMORY else None
+    finally:
+        if TRACE_MEMORY:
+            tracemalloc.stop()
+    return stage_stats(name, rows, items, elapsed, latencies or [elapsed], peak, errors, peak_rss_mb(), peak_rss_mb(children=True))
+
+def bench_load_csv(videos):
+    write_csv(videos, "YouTube_Data/videos_table.csv")
+    loaded = generate.load_video_data()
+    return len(loaded), None, 0
+
+def bench_check_s3(videos):
+    s3 = FakeS3Client({validate.get_file_key(video): b"%PDF" for video in videos}, latency=S3_LATENCY)
+    found, missing = validate.check_pdfs_in_s3(videos, s3)
+    return len(found), None, len(missing)
+
+def bench_check_youtube(videos):
+    youtube = FakeYouTubeClient({video["video_id"]: {} for video in videos}, latency=YOUTUBE_LATENCY)
+    found, missing, _ = validate.check_videos_in_youtube(videos, youtube)
+    return len(found), None, len(missing)
+
+def bench_pdf_to_markdown(videos, pdfs):
+    latencies = []
+    for index in range(min(len(videos), MAX_PDF_ROWS)):
+        start = time.perf_counter()
+        converter.pdf_to_markdown(pdfs[index % len(pdfs)])
+        latencies.append(time.perf_counter() - start)
+    return len(latencies), latencies, 0
+
+def bench_convert_all(videos, pdfs, streaming):
+    """Conversão completa (download, pool de processos, upload) contra o FakeS3Client"""
+    count = min(len(videos), MAX_PDF_ROWS)
+    jobs = [(f"{index:05d}_guide.pdf", f"{index:05d}_guide.md") for index in range(count)]
+    s3 = FakeS3Client({pdf_key: pdfs[index % len(pdfs)] for index, (pdf_key, _) in enumerate(jobs)}, latency=S3_LATENCY)
+    results = converter.convert_all(s3, jobs, streaming=streaming)
+    errors = sum(1 for result in results if not result)
+    return len(jobs), metrics.REGISTRY.values("stage_seconds", stage="convert"), errors
+
+def bench_generate(videos):
+    bedrock = FakeBedrockRuntimeClient(
+        latency=BEDROCK_LATENCY,
+        throttle_rate=BEDROCK_THROTTLE_RATE,
+        unavailable_rate=BEDROCK_UNAVAILABLE_RATE,
+        seed=SEED
+    )
+    # Limites altos: mede o pipeline, não a quota configurada
+    rate_limiter = AdaptiveRateLimiter(requests_per_minute=10 ** 9, tokens_per_minute=10 ** 12)
+    tasks = [
+        {
+            "position": index + 1,
+            "video": video,
+            "file_key": generate.get_file_key(video),
+            "file_type": video["file_type"],
+            "scheduled_date": "2030-01-01"
+        }
+        for index, video in enumerate(videos)
+    ]
+    results = generate.generate_all_metadata(bedrock, tasks, WORKERS, rate_limiter=rate_limiter)
+    errors = sum(1 for result in results if not result)
+    return len(tasks), metrics.REGISTRY.values("stage_seconds", stage="generate"), errors
+
+def bench_update(videos):
+    youtube = FakeYouTubeClient(
+        {video["video_id"]: {"snippet": {}, "status": {}} for video in videos},
+        latency=YOUTUBE_LATENCY,
+        error_rate=YOUTUBE_ERROR_RATE,
+        seed=SEED
+    )
+    metadata = {}
+    for video in videos:
+        metadata.update(build_fake_metadata(video["video_id"], "2030-01-01"))
+    quota = update.QuotaTracker(10 ** 9)
+    states = update.prefetch_video_states(youtube, metadata.keys(), quota)
+    statuses = update.update_all_videos(lambda: youtube, metadata, quota, WORKERS, states=states)
+    errors = sum(1 for status in statuses.values() if status == update.FAILED)
+    return len(statuses), metrics.REGISTRY.values("stage_seconds", stage="update"), errors
+
+def run_benchmarks(row_counts=None):
+    """Executa todas as etapas para cada tamanho de catálogo; retorna a lista de resultados
+
+    Sem row_counts usa ROW_COUNTS (lido na chamada, então pode ser alterado
+    depois de importar o módulo).
+    """
+    row_counts = ROW_COUNTS if row_counts is None else row_counts
+    generate.RETRY_BASE_DELAY = RETRY_BASE_DELAY
+    generate.CONDENSE_DOCUMENTS = False
+    generate.TRANSLATION_LIMITER = AdaptiveRateLimiter(requests_per_minute=10 ** 9, tokens_per_minute=10 ** 12)
+    generate.prompt_resource(FakeBedrockAgentClient(batch_inference.PROMPT_TEMPLATE_FILE))
+    pdfs = [build_synthetic_pdf(PDF_PAGES, seed=seed) for seed in range(PDF_VARIANTS)]
+    results = []
+
+    for rows in row_counts:
+        videos = build_videos(rows)
+        print(f"\n📊 {rows} linhas")
+        stages = [
+            ("load_csv", lambda: bench_load_csv(videos)),
+            ("check_pdfs_in_s3", lambda: bench_check_s3(videos)),
+            ("check_videos_in_youtube", lambda: bench_check_youtube(videos)),
+            ("pdf_to_markdown", lambda: bench_pdf_to_markdown(videos, pdfs)),
+            ("convert_all_streaming", lambda: bench_convert_all(videos, pdfs, streaming=True)),
+            ("convert_all_memory", lambda: bench_convert_all(videos, pdfs, streaming=False)),
+            ("generate_metadata_with_bedrock", lambda: bench_generate(videos)),
+            ("update_video_metadata", lambda: bench_update(videos))
+        ]
+        for name, function in stages:
+            result = run_stage(name, rows, function)
+            results.append(result)
+            print_result(result)
+
+    return results
+
+def format_value(value, pattern):
+    return pattern.format(value) if value is not None else "-"
+
+def print_result(result):
+    print(
+        f"  {result['stage']:<32} {result['items']:>6} itens "
+        f"{result['seconds']:>8.2f}s {format_value(result['throughput_per_second'], '{:>10.1f}')}/s "
+        f"p50 {format_value(result['p50_ms'], '{:>8.2f}')}ms p95 {format_value(result['p95_ms'], '{:>8.2f}')}ms "
+        f"p99 {format_value(result['p99_ms'], '{:>8.2f}')}ms "
+        f"heap {format_value(result['python_heap_peak_mb'], '{:>7.1f}')}MB "
+        f"rss {format_value(result['rss_peak_mb'], '{:>7.1f}')}MB filhos {format_value(result['children_rss_peak_mb'], '{:>7.1f}')}MB "
+        f"erros {result['errors']}"
+    )
+
+def main():
+    print("=== Benchmark Offline (substitutos locais) ===")
+    print(f"Latência injetada: S3 {S3_LATENCY * 1000:.0f}ms, YouTube {YOUTUBE_LATENCY * 1000:.0f}ms, Bedrock {BEDROCK_LATENCY * 1000:.0f}ms")
+    print(f"Falhas injetadas: throttling {BEDROCK_THROTTLE_RATE:.0%}, indisponível {BEDROCK_UNAVAILABLE_RATE:.0%}, update {YOUTUBE_ERROR_RATE:.0%}")
+
+    results_path = os.path.abspath(RESULTS_FILE)
+    # O prompt renderizado localmente (saída estruturada) é lido do repositório
+    batch_inference.PROMPT_TEMPLATE_FILE = os.path.abspath(batch_inference.PROMPT_TEMPLATE_FILE)
+    batch_inference.STRUCTURED_PROMPT_TEMPLATE_FILE = os.path.abspath(batch_inference.STRUCTURED_PROMPT_TEMPLATE_FILE)
+    # Arquivos de trabalho (CSV, estado) ficam em diretório temporário
+    original_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.chdir(work_dir)
+        try:
+            results = run_benchmarks()
+        finally:
+            os.chdir(original_dir)
+
+    os.makedirs(os.path.dirname(results_path), exist_ok=True)
+    with open(results_path, "w", encoding="utf-8") as file:
+        json.dump({"created_at": time.time(), "results": results}, file, indent=2)
+    print(f"\n💾 Resultados salvos em: {RESULTS_FILE}")
+
+if __name__ == "__main__":
+    main()
@@ -1,61 +1,296 @@
-import csv
-import boto3
 import fitz  # PyMuPDF
 import io
 import os
-from botocore.exceptions import ClientError
+import shutil
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from itertools import compress, repeat
+from operator import contains
+import clients
+import metrics
+from document_fingerprint import FingerprintIndex, duplicate_groups
+from s3_inventory import S3Inventory
+from video_catalog import load_video_data
 
 # Configurações
 S3_BUCKET = "randon-bucket-name"
 
-def load_video_data():
-    """Carrega dados dos vídeos do CSV"""
-    videos = []
-    with open("YouTube_Data/videos_table.csv", "r", encoding="utf-8") as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            if row["file_name"] != "ADICIONAR_NOME_ARQUIVO_MANUALMENTE":
-                videos.append({
-                    "video_id": row["video_id"],
-                    "video_title": row["video_title"],
-                    "file_name": row["file_name"],
-                    "file_type": row.get("file_type", "pdf").lower()
-                })
-    return videos
+# Configurações de paralelismo
+IO_WORKERS = 8  # Threads para download/upload no S3
+CPU_WORKERS = os.cpu_count() or 1  # Processos para extração de texto com PyMuPDF
+LOCAL_S3_DIR = None  # Diretório local usado no lugar do S3 (execução offline), ex.: "local_s3"
 
-def pdf_to_markdown(pdf_content):
-    """Converte conteúdo PDF para Markdown"""
-    doc = fitz.open(stream=pdf_content, filetype="pdf")
-    markdown_content = []
+# Configurações de streaming (memória constante para PDFs grandes)
+STREAMING_MODE = True  # Usa arquivos temporários e upload multipart em vez de carregar tudo em memória
+STREAM_CHUNK_SIZE = 1024 * 1024  # Bloco de leitura do download (1 MB)
+MULTIPART_PART_SIZE = 8 * 1024 * 1024  # Tamanho de cada parte do upload (mínimo S3: 5 MB)
+
+# Configurações de deduplicação
+DEDUPLICATE_DOCUMENTS = True  # PDFs idênticos (ETag/SHA-256) são convertidos uma vez; os demais .md são cópias no S3
+
+# Configurações de detecção de títulos
+LAYOUT_AWARE = False  # True: títulos pelo tamanho/estilo da fonte (get_text("dict"), ~1,5x mais lento); False: texto simples
+HEADING_SIZE_RATIO = 1.15  # Fonte ao menos 15% maior que a do corpo do texto é título
+MAX_HEADING_LEVELS = 3  # Níveis de título gerados (##, ###, ####)
+MAX_HEADING_LENGTH = 120  # Linhas mais longas nunca são títulos
+HISTOGRAM_SAMPLE_PAGES = 100  # Páginas amostradas para o histograma de tamanhos de fonte
+BOLD_FLAG = 16  # Bit de negrito em span["flags"] do PyMuPDF
+HEADING_KEYWORDS = ("chapter", "section", "overview")  # Modo texto simples
+
+def iter_markdown_lines(doc):
+    """Gera as linhas Markdown do documento página a página"""
+    if LAYOUT_AWARE:
+        return iter_layout_markdown_lines(doc)
+    return iter_text_markdown_lines(doc)
+
+def classify_text_page(text):
+    """Texto de uma página em Markdown, com títulos por maiúsculas ou palavras-chave
+    
+    As linhas são limpas e testadas em bloco (map/compress percorrem a página
+    em C); o Python só visita as linhas que são títulos.
+    """
+    lines = list(filter(None, map(str.strip, text.split("\n"))))
+    positions = range(len(lines))
+    headings = set(compress(positions, map(str.isupper, lines)))
+    
+    # Palavras-chave só são procuradas nas linhas se aparecem na página
+    lowered = text.lower()
+    keywords = [keyword for keyword in HEADING_KEYWORDS if keyword in lowered]
+    if keywords:
+        lowered_lines = list(map(str.lower, lines))
+        for keyword in keywords:
+            headings.update(compress(positions, map(contains, lowered_lines, repeat(keyword))))
     
+    for position in headings:
+        if len(lines[position]) > 5:
+            lines[position] = f"## {lines[position]}"
+    return "\n".join(lines)
+
+def iter_text_markdown_lines(doc):
+    """Modo texto simples: uma página classificada por vez"""
     for page_num in range(len(doc)):
         page = doc.load_page(page_num)
-        text = page.get_text()
         
         # Adiciona quebra de página
         if page_num > 0:
-            markdown_content.append("\n---\n")
+            yield "\n---\n"
+        
+        markdown = classify_text_page(page.get_text())
+        if markdown:
+            yield markdown
         
-        # Processa o texto linha por linha
-        lines = text.split('\n')
-        for line in lines:
-            line = line.strip()
-            if not line:
+        yield ""  # Linha em branco após cada página
+
+def extract_page_lines(page):
+    """Linhas da página como (texto, tamanho da fonte, negrito, bloco)"""
+    lines = []
+    for block_number, block in enumerate(page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)["blocks"]):
+        for line in block.get("lines", ()):
+            spans = [span for span in line["spans"] if span["text"].strip()]
+            if not spans:
                 continue
-                
-            # Detecta títulos (linhas em maiúscula ou com palavras-chave)
-            if (line.isupper() and len(line) > 5) or any(keyword in line.lower() for keyword in ['chapter', 'section', 'overview']):
-                markdown_content.append(f"## {line}")
-            else:
-                markdown_content.append(line)
+            text = "".join(span["text"] for span in line["spans"]).strip()
+            size = round(max(span["size"] for span in spans), 1)
+            bold = all(span["flags"] & BOLD_FLAG for span in spans)
+            lines.append((text, size, bold, block_number))
+    return lines
+
+def heading_prefixes(size_histogram):
+    """Mapeia tamanho de fonte -> prefixo Markdown a partir do histograma do documento
+    
+    O tamanho com mais caracteres é o corpo do texto; tamanhos ao menos
+    HEADING_SIZE_RATIO maiores viram títulos, do maior (##) ao menor. Retorna
+    (prefixos por tamanho, tamanho do corpo, prefixo para linhas em negrito).
+    """
+    if not size_histogram:
+        return {}, None, None
+    body_size = size_histogram.most_common(1)[0][0]
+    heading_sizes = sorted((size for size in size_histogram if size >= body_size * HEADING_SIZE_RATIO), reverse=True)
+    prefixes = {
+        size: "#" * (min(level, MAX_HEADING_LEVELS - 1) + 2) + " "
+        for level, size in enumerate(heading_sizes)
+    }
+    # Linhas curtas em negrito no tamanho do corpo ficam no nível seguinte aos títulos por tamanho
+    bold_prefix = "#" * (min(len(set(prefixes.values())), MAX_HEADING_LEVELS - 1) + 2) + " "
+    return prefixes, body_size, bold_prefix
+
+def iter_layout_markdown_lines(doc):
+    """Modo layout: níveis de título pelo histograma de tamanhos de fonte do documento
+    
+    O histograma é calculado uma vez a partir de até HISTOGRAM_SAMPLE_PAGES
+    páginas distribuídas pelo documento; as páginas amostradas são
+    reaproveitadas na geração, então nenhuma página é extraída duas vezes
+    e a memória não cresce com o tamanho do documento.
+    """
+    page_count = len(doc)
+    step = max(1, page_count // HISTOGRAM_SAMPLE_PAGES)
+    sampled = {page_num: extract_page_lines(doc.load_page(page_num)) for page_num in range(0, page_count, step)}
+    
+    size_histogram = Counter()
+    for lines in sampled.values():
+        for text, size, _, _ in lines:
+            size_histogram[size] += len(text)
+    prefixes, body_size, bold_prefix = heading_prefixes(size_histogram)
+    
+    for page_num in range(page_count):
+        lines = sampled.pop(page_num, None)
+        if lines is None:
+            lines = extract_page_lines(doc.load_page(page_num))
+        
+        # Adiciona quebra de página
+        if page_num > 0:
+            yield "\n---\n"
+        
+        # Prefixo de cada linha por consulta ao mapa de tamanhos (sem heurística por linha)
+        classified = [
+            (prefixes.get(size, "") if len(text) <= MAX_HEADING_LENGTH else "", text, block)
+            if not bold or size != body_size or len(text) > MAX_HEADING_LENGTH or text[-1] in ".,;:"
+            else (bold_prefix, text, block)
+            for text, size, bold, block in lines
+        ]
+        
+        # Título quebrado em várias linhas do mesmo bloco vira uma linha só
+        pending = None
+        for prefix, text, block in classified:
+            if pending and prefix and prefix == pending[0] and block == pending[2]:
+                pending = (prefix, f"{pending[1]} {text}", block)
+                continue
+            if pending:
+                yield pending[0] + pending[1]
+            pending = (prefix, text, block)
+        if pending:
+            yield pending[0] + pending[1]
+        
+        yield ""  # Linha em branco após cada página
+
+def pdf_to_markdown(pdf_content):
+    """Converte conteúdo PDF para Markdown"""
+    doc = fitz.open(stream=pdf_content, filetype="pdf")
+    try:
+        return "\n".join(iter_markdown_lines(doc))
+    finally:
+        doc.close()
+
+def pdf_to_markdown_bytes(pdf_content):
+    """Executada no pool de processos: retorna (markdown UTF-8, número de páginas)"""
+    with fitz.open(stream=pdf_content, filetype="pdf") as doc:
+        return "\n".join(iter_markdown_lines(doc)).encode('utf-8'), len(doc)
+
+def pdf_file_to_markdown_file(pdf_path, md_path):
+    """Executada no pool de processos: converte arquivo local para arquivo local
+    
+    O MuPDF lê as páginas do arquivo sob demanda e as linhas são gravadas
+    conforme geradas, então a memória não cresce com o tamanho do documento.
+    """
+    with fitz.open(pdf_path) as doc, open(md_path, "w", encoding="utf-8") as output:
+        first = True
+        for line in iter_markdown_lines(doc):
+            if not first:
+                output.write("\n")
+            output.write(line)
+            first = False
+        return len(doc)
+
+def spool_download(s3_client, key, path):
+    """Baixa objeto do S3 para arquivo local em blocos"""
+    response = s3_client.get_object(Bucket=S3_BUCKET, Key=key)
+    with open(path, "wb") as file:
+        shutil.copyfileobj(response['Body'], file, STREAM_CHUNK_SIZE)
+    return os.path.getsize(path)
+
+def upload_file_multipart(s3_client, key, path, content_type):
+    """Envia arquivo local ao S3 em partes de MULTIPART_PART_SIZE
+    
+    Arquivos menores que uma parte usam put_object. Retorna (ETag, tamanho).
+    """
+    size = os.path.getsize(path)
+    
+    if size <= MULTIPART_PART_SIZE:
+        with open(path, "rb") as file:
+            response = s3_client.put_object(Bucket=S3_BUCKET, Key=key, Body=file, ContentType=content_type)
+        return response.get("ETag", ""), size
+    
+    upload = s3_client.create_multipart_upload(Bucket=S3_BUCKET, Key=key, ContentType=content_type)
+    upload_id = upload["UploadId"]
+    parts = []
+    
+    try:
+        with open(path, "rb") as file:
+            part_number = 1
+            while True:
+                chunk = file.read(MULTIPART_PART_SIZE)
+                if not chunk:
+                    break
+                response = s3_client.upload_part(
+                    Bucket=S3_BUCKET,
+                    Key=key,
+                    PartNumber=part_number,
+                    UploadId=upload_id,
+                    Body=chunk
+                )
+                parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+                part_number += 1
+        
+        response = s3_client.complete_multipart_upload(
+            Bucket=S3_BUCKET,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": parts}
+        )
+    except Exception:
+        # Evita partes órfãs cobradas no bucket
+        s3_client.abort_multipart_upload(Bucket=S3_BUCKET, Key=key, UploadId=upload_id)
+        raise
+    
+    return response.get("ETag", ""), size
+
+def convert_pdf_to_markdown_streaming(s3_client, pdf_key, md_key, inventory=None, process_pool=None):
+    """Converte PDF do S3 para Markdown com memória constante
+    
+    O PDF é gravado em arquivo temporário, convertido para outro arquivo
+    temporário e enviado ao S3 via multipart. Retorna estatísticas ou None.
+    """
+    temp_dir = tempfile.mkdtemp(prefix="pdf_to_md_")
+    pdf_path = os.path.join(temp_dir, "input.pdf")
+    md_path = os.path.join(temp_dir, "output.md")
+    
+    try:
+        # Baixa PDF do S3 para disco
+        print(f"  📥 Baixando PDF: {pdf_key}")
+        bytes_in = spool_download(s3_client, pdf_key, pdf_path)
+        
+        # Converte para Markdown
+        print(f"  🔄 Convertendo para Markdown: {pdf_key}")
+        if process_pool is not None:
+            page_count = process_pool.submit(pdf_file_to_markdown_file, pdf_path, md_path).result()
+        else:
+            page_count = pdf_file_to_markdown_file(pdf_path, md_path)
+        
+        # Upload Markdown para S3
+        print(f"  📤 Salvando Markdown: {md_key}")
+        etag, bytes_out = upload_file_multipart(s3_client, md_key, md_path, 'text/markdown')
         
-        markdown_content.append("")  # Linha em branco após cada página
+        # Mantém o índice coerente com o novo objeto
+        if inventory is not None:
+            inventory.add(md_key, bytes_out, etag)
+        
+        return {"pages": page_count, "bytes_in": bytes_in, "bytes_out": bytes_out}
+        
+    except Exception as e:
+        print(f"  ❌ Erro na conversão de {pdf_key}: {e}")
+        return None
     
-    doc.close()
-    return "\n".join(markdown_content)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
 
-def convert_pdf_to_markdown(s3_client, pdf_key, md_key):
-    """Converte PDF do S3 para Markdown e salva de volta no S3"""
+def convert_pdf_to_markdown(s3_client, pdf_key, md_key, inventory=None, process_pool=None):
+    """Converte PDF do S3 para Markdown e salva de volta no S3
+    
+    Com process_pool a extração roda em outro processo, liberando a thread
+    para outras transferências. Retorna estatísticas da conversão ou None.
+    """
     try:
         # Baixa PDF do S3
         print(f"  📥 Baixando PDF: {pdf_key}")
@@ -63,47 +298,153 @@ def convert_pdf_to_markdown(s3_client, pdf_key, md_key):
         pdf_content = response['Body'].read()
         
         # Converte para Markdown
-        print(f"  🔄 Convertendo para Markdown...")
-        markdown_content = pdf_to_markdown(pdf_content)
+        print(f"  🔄 Convertendo para Markdown: {pdf_key}")
+        if process_pool is not None:
+            body, page_count = process_pool.submit(pdf_to_markdown_bytes, pdf_content).result()
+        else:
+            body, page_count = pdf_to_markdown_bytes(pdf_content)
         
         # Upload Markdown para S3
         print(f"  📤 Salvando Markdown: {md_key}")
-        s3_client.put_object(
+        response = s3_client.put_object(
             Bucket=S3_BUCKET,
             Key=md_key,
-            Body=markdown_content.encode('utf-8'),
+            Body=body,
             ContentType='text/markdown'
         )
         
-        return True
+        # Mantém o índice coerente com o novo objeto
+        if inventory is not None:
+            inventory.add(md_key, len(body), response.get("ETag", ""))
+        
+        return {"pages": page_count, "bytes_in": len(pdf_content), "bytes_out": len(body)}
         
     except Exception as e:
-        print(f"  ❌ Erro na conversão: {e}")
-        return False
+        print(f"  ❌ Erro na conversão de {pdf_key}: {e}")
+        return None
+
+def convert_all(s3_client, jobs, inventory=None, io_workers=IO_WORKERS, cpu_workers=CPU_WORKERS, streaming=STREAMING_MODE):
+    """Converte uma lista de (pdf_key, md_key) em pipeline
+    
+    Threads fazem download/upload e aguardam a extração no pool de processos,
+    então transferências e extração de documentos diferentes se sobrepõem.
+    Retorna a lista de estatísticas na ordem dos jobs (None para falhas).
+    """
+    results = [None] * len(jobs)
+    convert = convert_pdf_to_markdown_streaming if streaming else convert_pdf_to_markdown
+    
+    def converter(*args):
+        with metrics.timer("stage_seconds", stage="convert"):
+            return convert(*args)
+    
+    with ProcessPoolExecutor(max_workers=max(1, cpu_workers)) as process_pool:
+        with ThreadPoolExecutor(max_workers=max(1, io_workers)) as io_pool:
+            futures = {
+                io_pool.submit(converter, s3_client, pdf_key, md_key, inventory, process_pool): index
+                for index, (pdf_key, md_key) in enumerate(jobs)
+            }
+            for future in as_completed(futures):
+                index = futures[future]
+                results[index] = future.result()
+                if results[index]:
+                    print(f"  ✅ Conversão concluída com sucesso: {jobs[index][0]}")
+                    metrics.observe("pdf_pages", results[index]["pages"])
+                    metrics.increment("pdf_bytes_read", results[index]["bytes_in"])
+                    metrics.increment("markdown_bytes_written", results[index]["bytes_out"])
+                else:
+                    metrics.increment("conversion_failures")
+    
+    return results
 
-def check_file_exists(s3_client, file_key):
-    """Verifica se arquivo existe no S3"""
+def deduplicate_jobs(jobs, available, inventory, index=None):
+    """Separa os jobs em conversões únicas e cópias de Markdown
+    
+    available são os pares (pdf_key, md_key) de todos os PDFs existentes.
+    PDFs com o mesmo conteúdo (ETag e tamanho, ou SHA-256 registrado por
+    document_fingerprint) geram o mesmo Markdown: só o primeiro do grupo é
+    convertido e os demais recebem uma cópia feita no próprio S3, ou o .md já
+    existente de outro PDF do grupo. Quase duplicatas são convertidas
+    normalmente, pois o Markdown depende do conteúdo exato.
+    Retorna (jobs únicos, lista de (md de origem, md de destino)).
+    """
+    if index is None:
+        index = FingerprintIndex.load()
+    representatives = index.group([pdf_key for pdf_key, _ in available], inventory, near_duplicates=False)
+    
+    # Markdown já existente de cada grupo serve de origem para os demais
+    sources = {}
+    for pdf_key, md_key in available:
+        group = representatives.get(pdf_key, pdf_key)
+        if group not in sources and inventory.exists(md_key):
+            sources[group] = md_key
+    
+    unique_jobs, copies = [], []
+    for pdf_key, md_key in jobs:
+        group = representatives.get(pdf_key, pdf_key)
+        if group in sources:
+            copies.append((sources[group], md_key))
+            continue
+        sources[group] = md_key
+        unique_jobs.append((pdf_key, md_key))
+    
+    for group, members in duplicate_groups(representatives).items():
+        print(f"  🔗 PDFs idênticos: {', '.join(members)}")
+    return unique_jobs, copies
+
+def copy_markdown(s3_client, source_key, target_key, inventory=None):
+    """Copia um Markdown já convertido para outra chave (cópia no servidor, sem download)"""
     try:
-        s3_client.head_object(Bucket=S3_BUCKET, Key=file_key)
-        return True
-    except ClientError:
+        response = s3_client.copy_object(
+            Bucket=S3_BUCKET,
+            Key=target_key,
+            CopySource={"Bucket": S3_BUCKET, "Key": source_key}
+        )
+    except Exception as e:
+        print(f"  ❌ Erro ao copiar {source_key} para {target_key}: {e}")
         return False
+    
+    if inventory is not None:
+        source = inventory.get(source_key)
+        inventory.add(target_key, source.size if source else 0, response["CopyObjectResult"]["ETag"])
+    print(f"  📋 Markdown copiado: {source_key} → {target_key}")
+    metrics.increment("markdown_copies")
+    return True
+
+def print_throughput(results, elapsed):
+    """Mostra resumo de vazão da conversão"""
+    converted = [result for result in results if result]
+    pages = sum(result["pages"] for result in converted)
+    megabytes = sum(result["bytes_in"] for result in converted) / (1024 * 1024)
+    elapsed = max(elapsed, 1e-9)
+    
+    print("\n=== Vazão ===")
+    print(f"Tempo total: {elapsed:.2f}s")
+    print(f"Páginas: {pages} ({pages / elapsed:.1f} páginas/s)")
+    print(f"PDF lido: {megabytes:.2f} MB ({megabytes / elapsed:.2f} MB/s)")
+
+def create_s3_client():
+    """Cria cliente S3 real ou substituto local baseado em diretório"""
+    if LOCAL_S3_DIR:
+        from local_fakes import FakeS3Client
+        print(f"📁 Usando diretório local como S3: {LOCAL_S3_DIR}")
+        return FakeS3Client.from_directory(LOCAL_S3_DIR)
+    # Cliente compartilhado com pool de conexões dimensionado para as threads de I/O
+    return clients.aws_client("s3", max_pool_connections=max(clients.MAX_POOL_CONNECTIONS, IO_WORKERS))
 
 def main():
     print("=== Conversão PDF para Markdown ===\n")
     
     # Setup cliente S3
     try:
-        s3_client = boto3.client("s3")
+        s3_client = create_s3_client()
     except Exception as e:
         print("❌ Erro ao configurar cliente S3:")
         print("   Verifique se as credenciais AWS estão configuradas no arquivo .env")
         print(f"   Erro: {e}")
         return
     
-    # Carrega dados dos vídeos
-    videos = load_video_data()
-    pdf_videos = [v for v in videos if v["file_type"] == "pdf"]
+    # Carrega apenas os vídeos com PDF (consulta indexada no catálogo)
+    pdf_videos = load_video_data(file_type="pdf")
     
     print(f"Vídeos com PDFs encontrados: {len(pdf_videos)}\n")
     
@@ -111,37 +452,67 @@ def main():
         print("❌ Nenhum vídeo com tipo 'pdf' encontrado no CSV.")
         return
     
-    success_count = 0
+    # Índice do bucket: uma listagem paginada substitui dois head_object por vídeo
+    keys = []
+    for video in pdf_videos:
+        keys.append(video["file_name"].replace(".mp4", ".pdf"))
+        keys.append(video["file_name"].replace(".mp4", ".md"))
+    inventory = S3Inventory.for_keys(s3_client, S3_BUCKET, keys)
+    print(f"📦 Índice S3: {len(inventory)} objetos em {inventory.list_requests} requisição(ões) de listagem\n")
+    
+    jobs = []
+    available = []
     
     for i, video in enumerate(pdf_videos, 1):
-        print(f"[{i}/{len(pdf_videos)}] Processando: {video['file_name']}")
+        print(f"[{i}/{len(pdf_videos)}] Verificando: {video['file_name']}")
         
         # Gera nomes dos arquivos
         pdf_key = video["file_name"].replace(".mp4", ".pdf")
         md_key = video["file_name"].replace(".mp4", ".md")
         
         # Verifica se PDF existe
-        if not check_file_exists(s3_client, pdf_key):
+        if not inventory.exists(pdf_key):
             print(f"  ❌ PDF não encontrado: {pdf_key}")
             continue
+        available.append((pdf_key, md_key))
         
         # Verifica se Markdown já existe
-        if check_file_exists(s3_client, md_key):
+        if inventory.exists(md_key):
             print(f"  ⏭️  Markdown já existe: {md_key}")
             continue
         
-        # Converte PDF para Markdown
-        if convert_pdf_to_markdown(s3_client, pdf_key, md_key):
-            success_count += 1
-            print(f"  ✅ Conversão concluída com sucesso")
-        
-        print()  # Linha em branco
+        jobs.append((pdf_key, md_key))
+    
+    # PDFs repetidos são convertidos uma única vez
+    copies = []
+    if DEDUPLICATE_DOCUMENTS:
+        jobs, copies = deduplicate_jobs(jobs, available, inventory)
+    
+    # Converte PDFs para Markdown em paralelo
+    print(f"\n🚀 Convertendo {len(jobs)} PDFs ({IO_WORKERS} threads de I/O, {CPU_WORKERS} processos)\n")
+    start_time = time.time()
+    results = convert_all(s3_client, jobs, inventory)
+    elapsed = time.time() - start_time
+    success_count = sum(1 for result in results if result)
+    
+    # Cópias só depois da conversão do Markdown de origem
+    if copies:
+        print(f"\n📋 Copiando Markdown para {len(copies)} PDF(s) duplicado(s)")
+        success_count += sum(
+            1 for source_key, target_key in copies
+            if inventory.exists(source_key) and copy_markdown(s3_client, source_key, target_key, inventory)
+        )
+    
+    print_throughput(results, elapsed)
+    print()
     
     print("=== Conversão Concluída ===")
     print(f"PDFs convertidos com sucesso: {success_count}/{len(pdf_videos)}")
     
     if success_count > 0:
         print("\n💡 Dica: Agora você pode alterar file_type de 'pdf' para 'md' no CSV para usar os arquivos Markdown.")
+    
+    metrics.write_report("extra_pdf_to_markdown")
 
 if __name__ == "__main__":
     main()
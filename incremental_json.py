@@ -0,0 +1,219 @@
+import json
+import re
+
+# Validação incremental de JSON para respostas recebidas em streaming
+
+MAX_PREAMBLE_CHARS = 200  # Texto tolerado antes do JSON (ex.: "Here is the JSON:" ou a cerca ```json)
+WHITESPACE = " \t\r\n"
+LITERAL_START = "-0123456789tfn"
+LITERAL_CHARS = set("0123456789+-.eEtruefalsn")
+LITERAL_PATTERN = re.compile(r"-?(0|[1-9]\d*)(\.\d+)?([eE][+-]?\d+)?|true|false|null")
+ESCAPE_CHARS = set('"\\/bfnrtu')
+HEX_DIGITS = set("0123456789abcdefABCDEF")
+STRING_STOP = re.compile(r'["\\\x00-\x1f]')  # Fim da string, escape ou caractere de controle (inválido no JSON)
+
+class StreamValidationError(ValueError):
+    """Saída estruturalmente inválida detectada antes do fim da resposta
+
+    kind resume o motivo ('preamble', 'syntax', 'unexpected_key',
+    'incomplete') para métricas; position é o caractere da saída em que o
+    problema foi encontrado.
+    """
+
+    def __init__(self, message, kind, position):
+        super().__init__(f"{message} (caractere {position})")
+        self.kind = kind
+        self.position = position
+
+class IncrementalJsonValidator:
+    """Autômato de pilha que valida um objeto JSON trecho a trecho
+
+    feed() recebe cada trecho de texto assim que chega e lança
+    StreamValidationError no primeiro caractere que torna o documento
+    inválido, sem esperar o restante. Texto antes do objeto raiz (cerca
+    markdown, frase curta) é tolerado até max_preamble caracteres; o que vem
+    depois do objeto raiz é ignorado.
+
+    allowed_keys restringe as chaves de cada objeto pelo caminho das chaves
+    ancestrais, com "*" como curinga: {(): {"abc"}, ("*",): {"default"}}
+    aceita só "abc" na raiz e só "default" dentro dela. Caminhos sem regra
+    aceitam qualquer chave.
+    """
+
+    def __init__(self, allowed_keys=None, max_preamble=MAX_PREAMBLE_CHARS):
+        self.allowed_keys = allowed_keys or {}
+        self.max_preamble = max_preamble
+        self.state = "preamble"
+        self.stack = []  # [tipo, chave atual] de cada objeto/array aberto
+        self.position = 0  # Caracteres já processados
+        self.parts = []
+        self.start = None  # Posição do '{' raiz
+        self.end = None  # Posição logo após o '}' raiz
+        self.is_key = False
+        self.token = []  # Texto da chave ou literal em andamento
+        self.hex_left = 0  # Dígitos restantes de um escape \uXXXX
+
+    @property
+    def done(self):
+        return self.state == "done"
+
+    def _fail(self, message, kind, offset):
+        raise StreamValidationError(message, kind, self.position + offset)
+
+    def _path(self):
+        return tuple("[]" if kind == "array" else key for kind, key in self.stack[:-1])
+
+    def _check_key(self, key, offset):
+        path = self._path()
+        for pattern, allowed in self.allowed_keys.items():
+            if len(pattern) == len(path) and all(part in ("*", actual) for part, actual in zip(pattern, path)):
+                if key not in allowed:
+                    self._fail(f"Chave inesperada {key!r} em {'/'.join(path) or 'raiz'}", "unexpected_key", offset)
+                return
+
+    def _close(self, char, offset):
+        expected = "}" if self.stack[-1][0] == "object" else "]"
+        if char != expected:
+            self._fail(f"Esperava '{expected}', recebeu {char!r}", "syntax", offset)
+        self.stack.pop()
+        if not self.stack:
+            self.state = "done"
+            self.end = self.position + offset + 1
+        else:
+            self.state = "after_value"
+
+    def _open(self, char, offset):
+        if char == "{":
+            self.stack.append(["object", None])
+            self.state = "key_or_end"
+        elif char == "[":
+            self.stack.append(["array", None])
+            self.state = "value_or_end"
+        elif char == '"':
+            self.is_key = False
+            self.state = "string"
+        elif char in LITERAL_START:
+            self.token = [char]
+            self.state = "literal"
+        else:
+            self._fail(f"Esperava um valor, recebeu {char!r}", "syntax", offset)
+
+    def feed(self, text):
+        """Processa o próximo trecho da saída"""
+        self.parts.append(text)
+        index = 0
+        length = len(text)
+        while index < length and self.state != "done":
+            state = self.state
+            char = text[index]
+
+            if state == "string":
+                # Avança direto até o próximo caractere relevante da string
+                match = STRING_STOP.search(text, index)
+                stop = match.start() if match else length
+                if self.is_key:
+                    self.token.append(text[index:stop])
+                if not match:
+                    index = length
+                    continue
+                char = text[stop]
+                if char == "\\":
+                    if self.is_key:
+                        self.token.append(char)
+                    self.state = "escape"
+                elif char == '"':
+                    if self.is_key:
+                        key = json.loads('"' + "".join(self.token) + '"')
+                        self._check_key(key, stop)
+                        self.stack[-1][1] = key
+                        self.state = "colon"
+                    else:
+                        self.state = "after_value"
+                else:
+                    self._fail("Caractere de controle dentro de string", "syntax", stop)
+                index = stop + 1
+                continue
+
+            if state == "escape":
+                if char not in ESCAPE_CHARS:
+                    self._fail(f"Escape inválido \\{char}", "syntax", index)
+                if self.is_key:
+                    self.token.append(char)
+                self.state = "unicode" if char == "u" else "string"
+                self.hex_left = 4
+                index += 1
+                continue
+
+            if state == "unicode":
+                if char not in HEX_DIGITS:
+                    self._fail(f"Escape \\u com dígito inválido {char!r}", "syntax", index)
+                if self.is_key:
+                    self.token.append(char)
+                self.hex_left -= 1
+                if not self.hex_left:
+                    self.state = "string"
+                index += 1
+                continue
+
+            if state == "literal":
+                if char in LITERAL_CHARS:
+                    self.token.append(char)
+                    index += 1
+                    continue
+                literal = "".join(self.token)
+                if not LITERAL_PATTERN.fullmatch(literal):
+                    self._fail(f"Literal inválido {literal!r}", "syntax", index)
+                self.state = "after_value"
+                continue  # Reprocessa o caractere que encerrou o literal
+
+            if state == "preamble":
+                brace = text.find("{", index)
+                skipped = (brace if brace != -1 else length) - index
+                if self.position + index + skipped > self.max_preamble:
+                    self._fail("Texto demais antes do JSON", "preamble", index + skipped)
+                if brace == -1:
+                    index = length
+                    continue
+                self.start = self.position + brace
+                self._open("{", brace)
+                index = brace + 1
+                continue
+
+            if char in WHITESPACE:
+                index += 1
+                continue
+
+            if state == "value":
+                self._open(char, index)
+            elif state == "value_or_end":
+                if char == "]":
+                    self._close(char, index)
+                else:
+                    self._open(char, index)
+            elif state in ("key_or_end", "key"):
+                if char == "}" and state == "key_or_end":
+                    self._close(char, index)
+                elif char == '"':
+                    self.is_key = True
+                    self.token = []
+                    self.state = "string"
+                else:
+                    self._fail(f"Esperava uma chave, recebeu {char!r}", "syntax", index)
+            elif state == "colon":
+                if char != ":":
+                    self._fail(f"Esperava ':', recebeu {char!r}", "syntax", index)
+                self.state = "value"
+            elif state == "after_value":
+                if char == ",":
+                    self.state = "key" if self.stack[-1][0] == "object" else "value"
+                else:
+                    self._close(char, index)
+            index += 1
+
+        self.position += length
+
+    def finish(self):
+        """Confirma que o objeto raiz foi fechado; retorna o texto JSON"""
+        if self.state != "done":
+            self._fail("Resposta terminou antes do fim do JSON", "incomplete", 0)
+        return "".join(self.parts)[self.start:self.end]
@@ -0,0 +1,660 @@
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from collections.abc import MutableMapping
+from datetime import datetime, timezone
+import httplib2
+from botocore.exceptions import ClientError
+from googleapiclient.errors import HttpError
+
+# Substitutos locais dos clientes AWS para testes sem acesso à nuvem
+
+FAKE_LANGUAGES = ["zh", "nl", "fr", "de", "it", "ja", "pt", "es"]  # Mesmos idiomas do prompt
+
+def build_fake_metadata(video_id, scheduled_date):
+    """Gera metadados sintéticos no mesmo formato produzido pelo prompt"""
+    return {
+        video_id: {
+            "scheduledPublishTime": f"{scheduled_date}T16:30:00Z",
+            "default": {
+                "title": f"Fake title for {video_id}",
+                "description": f"Fake description for {video_id}",
+                "tags": ["AWS", "Fake", "Tutorial", "Cloud", "Synthetic", video_id]
+            },
+            "localizations": {
+                language: {
+                    "title": f"Fake title ({language}) for {video_id}",
+                    "description": f"Fake description ({language}) for {video_id}"
+                }
+                for language in FAKE_LANGUAGES
+            }
+        }
+    }
+
+def build_synthetic_pdf(pages=5, seed=0, paragraphs_per_page=4):
+    """Gera um PDF sintético com cabeçalho repetido, títulos em fonte maior e parágrafos"""
+    import fitz  # PyMuPDF (importado aqui para não exigir a dependência nos demais fakes)
+
+    generator = random.Random(seed)
+    words = ["aws", "bedrock", "model", "prompt", "token", "bucket", "video", "metadata",
+             "latency", "service", "region", "policy", "access", "stream", "batch", "cache"]
+    doc = fitz.open()
+    try:
+        for page_number in range(pages):
+            page = doc.new_page()
+            page.insert_text((72, 40), "Synthetic Developer Guide", fontsize=8)
+            y = 90
+            page.insert_text((72, y), f"{page_number + 1}. {generator.choice(words).title()} {generator.choice(words).title()}", fontsize=16)
+            y += 30
+            for _ in range(paragraphs_per_page):
+                for _ in range(4):
+                    line = " ".join(generator.choice(words) for _ in range(12)).capitalize()
+                    page.insert_text((72, y), line, fontsize=10)
+                    y += 14
+                y += 10
+            page.insert_text((72, 800), f"Page {page_number + 1}", fontsize=8)
+        return doc.tobytes()
+    finally:
+        doc.close()
+
+def prompt_video(prompt, default_video_id="unknown"):
+    """Vídeo e data de um prompt renderizado (prompt_en.txt, prompt_en_structured.txt ou valores após o cache de prompt)"""
+    match = (
+        re.search(r"<VIDEO_ID> = (\S+)\n<SCHEDULED_DATE> = (\d{4}-\d{2}-\d{2})", prompt)
+        or re.search(r'"([^"]+)": \{\s*"scheduledPublishTime": "(\d{4}-\d{2}-\d{2})', prompt)
+        or re.search(r'Video ID: (\S+)\n.*?scheduledPublishTime: "(\d{4}-\d{2}-\d{2})', prompt, re.DOTALL)
+    )
+    return match.groups() if match else (default_video_id, "2025-01-01")
+
+def prompt_blocks(system=None, messages=None, toolConfig=None):
+    """Blocos na ordem do prefixo do cache de prompt: ferramentas, system e mensagens"""
+    blocks = [{"text": json.dumps(toolConfig, sort_keys=True)}] if toolConfig else []
+    blocks += system or []
+    for message in messages or []:
+        blocks += message["content"]
+    return blocks
+
+def fake_tool_input(schema, video_id, scheduled_date):
+    """Entrada de ferramenta válida para o esquema
+
+    Metadados completos (sem localizations se o esquema não as pede) ou só
+    os campos pedidos (reparo, tradução).
+    """
+    if "default" in schema["properties"]:
+        metadata = build_fake_metadata(video_id, scheduled_date)[video_id]
+        if "localizations" not in schema["properties"]:
+            del metadata["localizations"]
+        return metadata
+    values = {}
+    for field, field_schema in schema["properties"].items():
+        if field_schema["type"] == "array":
+            values[field] = ["AWS", "Fake", "Tutorial", "Cloud", video_id]
+        elif field_schema["type"] == "object":
+            values[field] = {name: f"Fake {name} for {video_id}" for name in field_schema["properties"]}
+        else:
+            values[field] = f"Fake {field} for {video_id}"
+    return values
+
+class FakeBedrockRuntimeClient:
+    """Simula o cliente bedrock-runtime com latência e falhas configuráveis
+
+    throttle_rate e unavailable_rate definem a probabilidade de cada chamada
+    falhar com ThrottlingException ou ServiceUnavailableException.
+    converse_stream entrega a resposta em trechos de stream_chunk_size
+    caracteres (first_token_fraction da latência até o primeiro trecho, o
+    restante dividido entre os demais); malformed_rate é a proporção de
+    respostas fora do formato (chave raiz diferente do video_id) e
+    invalid_rate a de respostas bem formadas com título longo demais.
+    Com toolConfig a resposta vem como toolUse com entrada conforme o esquema.
+    output_token_latency soma segundos por token de saída à latência, como
+    nos modelos reais (respostas longas demoram mais).
+    """
+
+    def __init__(self, latency=0.5, throttle_rate=0.0, unavailable_rate=0.0, seed=None,
+                 malformed_rate=0.0, stream_chunk_size=16, first_token_fraction=0.1, invalid_rate=0.0,
+                 output_token_latency=0.0):
+        self.latency = latency
+        self.output_token_latency = output_token_latency
+        self.throttle_rate = throttle_rate
+        self.unavailable_rate = unavailable_rate
+        self.malformed_rate = malformed_rate
+        self.invalid_rate = invalid_rate
+        self.stream_chunk_size = stream_chunk_size
+        self.first_token_fraction = first_token_fraction
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.throttled = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._responses = 0
+        self._prompt_cache = set()  # Prefixos já gravados antes de um cachePoint
+        self._lock = threading.Lock()
+
+    def _maybe_fail(self, operation):
+        with self._lock:
+            roll = self.random.random()
+            if roll < self.throttle_rate:
+                self.throttled += 1
+                code, status = "ThrottlingException", 429
+            elif roll < self.throttle_rate + self.unavailable_rate:
+                code, status = "ServiceUnavailableException", 503
+            else:
+                return
+        raise ClientError(
+            {"Error": {"Code": code, "Message": "Injected by fake"}, "ResponseMetadata": {"HTTPStatusCode": status}},
+            operation
+        )
+
+    def _response(self, promptVariables, system=None, toolConfig=None, messages=None):
+        """Conteúdo da resposta: ("text", texto) ou ("toolUse", {toolUseId, name, input})"""
+        if promptVariables:
+            video_id = promptVariables.get("video_id", {}).get("text", "unknown")
+            scheduled_date = promptVariables.get("scheduled_date", {}).get("text", "2025-01-01")
+        else:
+            prompt = " ".join(block.get("text", "") for block in prompt_blocks(system, messages))
+            video_id, scheduled_date = prompt_video(prompt)
+        with self._lock:
+            malformed = self.random.random() < self.malformed_rate
+            invalid = self.random.random() < self.invalid_rate
+            self._responses += 1
+            tool_use_id = f"tooluse{self._responses:06d}"
+
+        if toolConfig:
+            tool = toolConfig["tools"][0]["toolSpec"]
+            value = fake_tool_input(tool["inputSchema"]["json"], video_id, scheduled_date)
+            if "default" in value and invalid:
+                value["default"]["title"] = "Overly long title " * 10
+            if "default" in value and malformed:
+                value = {"metadata": value}
+            return "toolUse", {"toolUseId": tool_use_id, "name": tool["name"], "input": value}
+
+        metadata = build_fake_metadata(video_id, scheduled_date)
+        if invalid:
+            metadata[video_id]["default"]["title"] = "Overly long title " * 10
+        if malformed:
+            metadata = {"metadata": metadata[video_id]}
+        return "text", "```json\n" + json.dumps(metadata, indent=2) + "\n```"
+
+    def _usage(self, output_tokens, system=None, messages=None, toolConfig=None):
+        """usage com tokens de cache: prefixo até cada cachePoint gravado na primeira vez e lido depois
+
+        Texto conta len // 4 tokens e documentos 1000; sem cachePoint a
+        entrada é sempre 1000 tokens, como antes.
+        """
+        usage = {"inputTokens": 1000, "outputTokens": output_tokens, "totalTokens": 1000 + output_tokens}
+        blocks = prompt_blocks(system, messages, toolConfig)
+        if not any("cachePoint" in block for block in blocks):
+            return usage
+        digest = hashlib.sha256()
+        tokens = 0
+        checkpoints = []
+        for block in blocks:
+            if "cachePoint" in block:
+                checkpoints.append((digest.copy().hexdigest(), tokens))
+                continue
+            digest.update(json.dumps(block, sort_keys=True).encode("utf-8"))
+            tokens += len(block["text"]) // 4 if "text" in block else 1000
+        with self._lock:
+            cached = [count for key, count in checkpoints if key in self._prompt_cache]
+            self._prompt_cache.update(key for key, _ in checkpoints)
+        read = max(cached, default=0)
+        written = checkpoints[-1][1] - read
+        usage.update(
+            inputTokens=tokens - read - written,
+            totalTokens=tokens + output_tokens,
+            cacheReadInputTokens=read,
+            cacheWriteInputTokens=written
+        )
+        return usage
+
+    def _start_call(self):
+        with self._lock:
+            self.calls += 1
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+
+    def _end_call(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def converse(self, modelId, messages, promptVariables=None, system=None, toolConfig=None, **kwargs):
+        self._maybe_fail("Converse")
+        self._start_call()
+        try:
+            start_time = time.time()
+            kind, payload = self._response(promptVariables, system, toolConfig, messages)
+            length = len(payload) if kind == "text" else len(json.dumps(payload["input"]))
+            time.sleep(self.latency + length // 4 * self.output_token_latency)
+            return {
+                "output": {"message": {"role": "assistant", "content": [{kind: payload}]}},
+                "stopReason": "end_turn" if kind == "text" else "tool_use",
+                "usage": self._usage(length // 4, system, messages, toolConfig),
+                "metrics": {"latencyMs": int((time.time() - start_time) * 1000)}
+            }
+        finally:
+            self._end_call()
+
+    def converse_stream(self, modelId, messages, promptVariables=None, system=None, toolConfig=None, **kwargs):
+        self._maybe_fail("ConverseStream")
+        kind, payload = self._response(promptVariables, system, toolConfig, messages)
+        text = payload if kind == "text" else json.dumps(payload["input"], indent=2)
+        chunks = [text[i:i + self.stream_chunk_size] for i in range(0, len(text), self.stream_chunk_size)]
+        tool_use = None if kind == "text" else {"toolUseId": payload["toolUseId"], "name": payload["name"]}
+        usage = self._usage(len(text) // 4, system, messages, toolConfig)
+        return {"stream": FakeEventStream(self._stream_events(chunks, len(text), tool_use, usage))}
+
+    def _stream_events(self, chunks, length, tool_use=None, usage=None):
+        """Eventos no formato do converse_stream, gerados sob demanda (abortar economiza a latência restante)"""
+        self._start_call()
+        try:
+            start_time = time.time()
+            yield {"messageStart": {"role": "assistant"}}
+            if tool_use:
+                yield {"contentBlockStart": {"start": {"toolUse": tool_use}, "contentBlockIndex": 0}}
+            time.sleep(self.latency * self.first_token_fraction)
+            generation = self.latency * (1 - self.first_token_fraction) + length // 4 * self.output_token_latency
+            chunk_delay = generation / max(1, len(chunks) - 1)
+            for index, chunk in enumerate(chunks):
+                if index:
+                    time.sleep(chunk_delay)
+                delta = {"toolUse": {"input": chunk}} if tool_use else {"text": chunk}
+                yield {"contentBlockDelta": {"delta": delta, "contentBlockIndex": 0}}
+            yield {"contentBlockStop": {"contentBlockIndex": 0}}
+            yield {"messageStop": {"stopReason": "tool_use" if tool_use else "end_turn"}}
+            yield {"metadata": {
+                "usage": usage or {"inputTokens": 1000, "outputTokens": length // 4, "totalTokens": 1000 + length // 4},
+                "metrics": {"latencyMs": int((time.time() - start_time) * 1000)}
+            }}
+        finally:
+            self._end_call()
+
+class FakeEventStream:
+    """Iterável de eventos com close(), como o EventStream do botocore"""
+
+    def __init__(self, events):
+        self._events = events
+
+    def __iter__(self):
+        return iter(self._events)
+
+    def close(self):
+        self._events.close()
+
+class FakeBedrockBatchClient:
+    """Simula os jobs de Batch Inference do cliente bedrock sobre um FakeS3Client
+
+    O job fica InProgress por polls_until_complete consultas e então grava a
+    saída (<saída>/<job id>/<entrada>.out) com metadados sintéticos. O vídeo
+    e a data vêm do prompt renderizado; error_rate define a proporção de
+    registros com erro.
+    """
+
+    def __init__(self, s3_client, polls_until_complete=1, error_rate=0.0, seed=None):
+        self.s3_client = s3_client
+        self.polls_until_complete = polls_until_complete
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.jobs = {}
+
+    def create_model_invocation_job(self, jobName, roleArn, modelId, inputDataConfig, outputDataConfig, **kwargs):
+        job_id = f"job{len(self.jobs) + 1:04d}"
+        job_arn = f"arn:aws:bedrock:us-east-1:000000000000:model-invocation-job/{job_id}"
+        self.jobs[job_arn] = {
+            "jobId": job_id,
+            "jobName": jobName,
+            "modelId": modelId,
+            "input": inputDataConfig["s3InputDataConfig"]["s3Uri"],
+            "output": outputDataConfig["s3OutputDataConfig"]["s3Uri"],
+            "polls": 0,
+            "status": "Submitted"
+        }
+        return {"jobArn": job_arn}
+
+    def get_model_invocation_job(self, jobIdentifier):
+        job = self.jobs[jobIdentifier]
+        job["polls"] += 1
+        if job["status"] != "Completed":
+            if job["polls"] > self.polls_until_complete:
+                self._complete(job)
+                job["status"] = "Completed"
+            else:
+                job["status"] = "InProgress"
+        return {"jobArn": jobIdentifier, "jobName": job["jobName"], "status": job["status"]}
+
+    def _complete(self, job):
+        input_key = job["input"].split("/", 3)[3]
+        output_prefix = job["output"].split("/", 3)[3]
+        lines = []
+        for line in self.s3_client.objects[input_key].decode("utf-8").splitlines():
+            record = json.loads(line)
+            output = {"recordId": record["recordId"], "modelInput": record["modelInput"]}
+            if self.random.random() < self.error_rate:
+                output["error"] = {"errorCode": 400, "errorMessage": "Injected by fake"}
+            else:
+                video_id, scheduled_date = prompt_video(record["modelInput"]["system"][0]["text"], record["recordId"])
+                tool_config = record["modelInput"].get("toolConfig")
+                if tool_config:
+                    tool = tool_config["tools"][0]["toolSpec"]
+                    value = fake_tool_input(tool["inputSchema"]["json"], video_id, scheduled_date)
+                    content = [{"toolUse": {"toolUseId": f"tooluse-{record['recordId']}", "name": tool["name"], "input": value}}]
+                    text = json.dumps(value)
+                else:
+                    text = "```json\n" + json.dumps(build_fake_metadata(video_id, scheduled_date)) + "\n```"
+                    content = [{"text": text}]
+                output["modelOutput"] = {
+                    "output": {"message": {"role": "assistant", "content": content}},
+                    "stopReason": "tool_use" if tool_config else "end_turn",
+                    "usage": {"inputTokens": 1000, "outputTokens": len(text) // 4, "totalTokens": 1000 + len(text) // 4}
+                }
+            lines.append(json.dumps(output))
+        output_key = f"{output_prefix}{job['jobId']}/{input_key.rsplit('/', 1)[-1]}.out"
+        self.s3_client.put_object(Bucket="", Key=output_key, Body=("\n".join(lines) + "\n").encode("utf-8"))
+        self.s3_client.put_object(Bucket="", Key=f"{output_prefix}{job['jobId']}/manifest.json.out", Body=b"{}")
+
+class FakeBedrockAgentClient:
+    """Simula o get_prompt do cliente bedrock-agent com uma variante de texto
+
+    O texto vem do arquivo local do prompt; modelo e inferenceConfiguration
+    seguem a configuração documentada em prompt/README.md. denied simula a
+    falta da permissão bedrock:GetPrompt.
+    """
+
+    def __init__(self, template_file="prompt/prompt_en.txt", model_id="amazon.nova-pro-v1:0",
+                 inference_config=None, denied=False):
+        self.template_file = template_file
+        self.denied = denied
+        self.model_id = model_id
+        self.inference_config = inference_config or {"maxTokens": 5120, "temperature": 0.9, "topP": 0.9}
+        self.calls = []
+
+    def get_prompt(self, promptIdentifier, promptVersion=None, **kwargs):
+        self.calls.append((promptIdentifier, promptVersion))
+        if self.denied:
+            raise ClientError({"Error": {"Code": "AccessDeniedException", "Message": "Injected by fake"}}, "GetPrompt")
+        with open(self.template_file, "r", encoding="utf-8") as file:
+            text = file.read()
+        return {
+            "id": promptIdentifier,
+            "version": promptVersion or "DRAFT",
+            "defaultVariant": "default",
+            "variants": [{
+                "name": "default",
+                "modelId": self.model_id,
+                "templateType": "TEXT",
+                "templateConfiguration": {"text": {"text": text}},
+                "inferenceConfiguration": {"text": dict(self.inference_config)}
+            }]
+        }
+
+class DirectoryStore(MutableMapping):
+    """Mapeia chaves S3 para arquivos dentro de um diretório local"""
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.root, *key.split("/"))
+
+    def __getitem__(self, key):
+        try:
+            with open(self._path(key), "rb") as file:
+                return file.read()
+        except FileNotFoundError:
+            raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as file:
+            file.write(value)
+
+    def __delitem__(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return os.path.isfile(self._path(key))
+
+    def __iter__(self):
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                yield os.path.relpath(os.path.join(directory, name), self.root).replace(os.sep, "/")
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+class FakeS3Client:
+    """Simula um bucket S3 em memória (objetos como bytes)
+
+    latency é o atraso simulado (segundos) de cada requisição.
+    """
+
+    def __init__(self, objects=None, latency=0.0):
+        self.objects = dict(objects or {})
+        self.modified = {key: datetime.now(timezone.utc) for key in self.objects}
+        self.request_counts = Counter()
+        self.uploads = {}
+        self.latency = latency
+        self._lock = threading.Lock()
+
+    def _record(self, operation):
+        with self._lock:
+            self.request_counts[operation] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    @classmethod
+    def from_directory(cls, root):
+        """Cria um bucket local persistido em arquivos dentro de 'root'"""
+        client = cls()
+        client.objects = DirectoryStore(root)
+        client.modified = {
+            key: datetime.fromtimestamp(os.path.getmtime(client.objects._path(key)), timezone.utc)
+            for key in client.objects
+        }
+        return client
+
+    def head_object(self, Bucket, Key):
+        self._record("HeadObject")
+        if Key not in self.objects:
+            raise ClientError({"Error": {"Code": "404", "Message": "Not Found"}}, "HeadObject")
+        return {"ContentLength": len(self.objects[Key]), "ETag": self._etag(Key)}
+
+    def get_object(self, Bucket, Key, **kwargs):
+        self._record("GetObject")
+        if Key not in self.objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey", "Message": "Not Found"}}, "GetObject")
+        data = self.objects[Key]
+        return {"Body": io.BytesIO(data), "ContentLength": len(data), "ETag": self._etag(Key)}
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self._record("PutObject")
+        self.objects[Key] = Body if isinstance(Body, bytes) else Body.read()
+        self.modified[Key] = datetime.now(timezone.utc)
+        return {"ETag": self._etag(Key)}
+
+    def copy_object(self, Bucket, Key, CopySource, **kwargs):
+        self._record("CopyObject")
+        if CopySource["Key"] not in self.objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey", "Message": "Not Found"}}, "CopyObject")
+        self.objects[Key] = self.objects[CopySource["Key"]]
+        self.modified[Key] = datetime.now(timezone.utc)
+        return {"CopyObjectResult": {"ETag": self._etag(Key), "LastModified": self.modified[Key]}}
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        self._record("CreateMultipartUpload")
+        upload_id = str(len(self.uploads) + 1)
+        self.uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, PartNumber, UploadId, Body, **kwargs):
+        self._record("UploadPart")
+        data = Body if isinstance(Body, bytes) else Body.read()
+        self.uploads[UploadId][PartNumber] = data
+        return {"ETag": '"' + hashlib.md5(data).hexdigest() + '"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload, **kwargs):
+        self._record("CompleteMultipartUpload")
+        parts = self.uploads.pop(UploadId)
+        self.objects[Key] = b"".join(parts[part["PartNumber"]] for part in MultipartUpload["Parts"])
+        self.modified[Key] = datetime.now(timezone.utc)
+        return {"ETag": self._etag(Key)}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId, **kwargs):
+        self._record("AbortMultipartUpload")
+        self.uploads.pop(UploadId, None)
+        return {}
+
+    def list_objects_v2(self, Bucket, Prefix="", MaxKeys=1000, ContinuationToken=None, **kwargs):
+        self._record("ListObjectsV2")
+        keys = sorted(key for key in self.objects if key.startswith(Prefix))
+        start = int(ContinuationToken or 0)
+        page_keys = keys[start:start + MaxKeys]
+        response = {
+            "KeyCount": len(page_keys),
+            "IsTruncated": start + MaxKeys < len(keys),
+            "Contents": [
+                {"Key": key, "Size": len(self.objects[key]), "ETag": self._etag(key), "LastModified": self.modified[key]}
+                for key in page_keys
+            ]
+        }
+        if response["IsTruncated"]:
+            response["NextContinuationToken"] = str(start + MaxKeys)
+        return response
+
+    def get_paginator(self, operation_name):
+        if operation_name != "list_objects_v2":
+            raise NotImplementedError(operation_name)
+        return FakeListObjectsPaginator(self)
+
+    def _etag(self, key):
+        return '"' + hashlib.md5(self.objects[key]).hexdigest() + '"'
+
+class FakeListObjectsPaginator:
+    """Simula o paginator de list_objects_v2"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def paginate(self, Bucket, Prefix="", **kwargs):
+        token = None
+        while True:
+            page = self.client.list_objects_v2(Bucket=Bucket, Prefix=Prefix, ContinuationToken=token)
+            yield page
+            if not page["IsTruncated"]:
+                return
+            token = page["NextContinuationToken"]
+
+class FakeRequest:
+    """Simula uma requisição da googleapiclient (executada via execute())"""
+
+    def __init__(self, handler):
+        self.handler = handler
+
+    def execute(self):
+        return self.handler()
+
+class FakeVideosResource:
+    """Simula youtube.videos()"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def list(self, part, id, **kwargs):
+        def handler():
+            self.client.record_call("list")
+            ids = id.split(",")
+            items = []
+            for video_id in ids:
+                if video_id in self.client.video_store:
+                    video = {"id": video_id}
+                    for name in part.split(","):
+                        if name in self.client.video_store[video_id]:
+                            video[name] = self.client.video_store[video_id][name]
+                    items.append(video)
+            return {"items": items}
+        return FakeRequest(handler)
+
+    def update(self, part, body, **kwargs):
+        def handler():
+            self.client.record_call("update")
+            video_id = body["id"]
+            if video_id not in self.client.video_store:
+                raise ValueError(f"Video not found: {video_id}")
+            for name in part.split(","):
+                self.client.video_store[video_id][name] = body[name]
+            return body
+        return FakeRequest(handler)
+
+class FakePlaylistItemsResource:
+    """Simula youtube.playlistItems() com paginação por pageToken"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def list(self, part, playlistId, maxResults=5, pageToken=None, **kwargs):
+        def handler():
+            self.client.playlist_calls += 1
+            start = int(pageToken or 0)
+            page = self.client.playlist[start:start + maxResults]
+            response = {
+                "items": [
+                    {"snippet": {"title": title, "resourceId": {"videoId": video_id}}}
+                    for video_id, title in page
+                ]
+            }
+            if start + maxResults < len(self.client.playlist):
+                response["nextPageToken"] = str(start + maxResults)
+            return response
+        return FakeRequest(handler)
+
+class FakeYouTubeClient:
+    """Simula o cliente da YouTube Data API com vídeos em memória
+
+    playlist é a lista (video_id, título) da playlist de uploads, do mais
+    recente para o mais antigo.
+    """
+
+    def __init__(self, videos=None, playlist=None, latency=0.0, error_rate=0.0, seed=None):
+        self.video_store = dict(videos or {})
+        self.playlist = list(playlist or [])
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.failed_updates = 0
+        self.list_calls = 0
+        self.update_calls = 0
+        self.playlist_calls = 0
+        self._lock = threading.Lock()
+
+    def record_call(self, operation):
+        """Contabiliza a chamada e simula a latência da API
+
+        Updates falham com HTTP 500 na proporção error_rate.
+        """
+        with self._lock:
+            if operation == "list":
+                self.list_calls += 1
+            else:
+                self.update_calls += 1
+            fail = operation == "update" and self.random.random() < self.error_rate
+            if fail:
+                self.failed_updates += 1
+        time.sleep(self.latency)
+        if fail:
+            raise HttpError(httplib2.Response({"status": 500, "reason": "Backend Error"}), b'{"error": {"message": "Injected by fake"}}')
+
+    def videos(self):
+        return FakeVideosResource(self)
+
+    def playlistItems(self):
+        return FakePlaylistItemsResource(self)
@@ -0,0 +1,264 @@
+import copy
+import re
+
+# Esquema dos metadados consumidos por 04_update_youtube.py, validação local e reparos determinísticos
+
+TOOL_NAME = "publish_youtube_metadata"
+# Traduções pedidas no prompt (código do YouTube: nome usado nas chamadas de tradução)
+LANGUAGE_NAMES = {
+    "zh": "Chinese (Simplified)",
+    "nl": "Dutch",
+    "fr": "French",
+    "de": "German",
+    "it": "Italian",
+    "ja": "Japanese",
+    "pt": "Portuguese (Brazil)",
+    "es": "Spanish (International)"
+}
+LANGUAGES = list(LANGUAGE_NAMES)
+TITLE_MAX_CHARS = 100  # Limite do YouTube
+DESCRIPTION_MAX_BYTES = 5000  # Limite do YouTube (bytes UTF-8)
+TAGS_MAX_CHARS = 500  # Soma das tags com vírgulas; tags com espaço contam as aspas
+MIN_TAGS = 5
+FORBIDDEN_CHARS = "<>"  # Rejeitados pelo YouTube em títulos, descrições e tags
+PUBLISH_TIME = "T16:30:00Z"  # Horário pedido no prompt (usado quando o modelo devolve um valor inválido)
+SCHEDULED_TIME_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d+)?Z")
+
+TITLE_SCHEMA = {"type": "string", "minLength": 1, "maxLength": TITLE_MAX_CHARS}
+DESCRIPTION_SCHEMA = {"type": "string", "minLength": 1, "description": f"No máximo {DESCRIPTION_MAX_BYTES} bytes"}
+TAGS_SCHEMA = {
+    "type": "array",
+    "items": {"type": "string", "minLength": 1},
+    "minItems": MIN_TAGS,
+    "description": f"Soma das tags com no máximo {TAGS_MAX_CHARS} caracteres"
+}
+LOCALIZATION_SCHEMA = {
+    "type": "object",
+    "properties": {"title": TITLE_SCHEMA, "description": DESCRIPTION_SCHEMA},
+    "required": ["title", "description"]
+}
+DEFAULT_SCHEMA = {
+    "type": "object",
+    "properties": {"title": TITLE_SCHEMA, "description": DESCRIPTION_SCHEMA, "tags": TAGS_SCHEMA},
+    "required": ["title", "description", "tags"]
+}
+# Só a parte em inglês (primeira fase da geração com traduções em paralelo)
+BASE_METADATA_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "scheduledPublishTime": {"type": "string", "description": "Data e hora de publicação em UTC (AAAA-MM-DDTHH:MM:SSZ)"},
+        "default": DEFAULT_SCHEMA
+    },
+    "required": ["scheduledPublishTime", "default"]
+}
+METADATA_SCHEMA = {
+    "type": "object",
+    "properties": dict(BASE_METADATA_SCHEMA["properties"], localizations={
+        "type": "object",
+        "properties": {language: LOCALIZATION_SCHEMA for language in LANGUAGES},
+        "required": LANGUAGES
+    }),
+    "required": BASE_METADATA_SCHEMA["required"] + ["localizations"]
+}
+
+def tool_config(schema=METADATA_SCHEMA, name=TOOL_NAME, description="Publica os metadados do vídeo no YouTube"):
+    """toolConfig do converse com uma única ferramenta obrigatória"""
+    return {
+        "tools": [{"toolSpec": {"name": name, "description": description, "inputSchema": {"json": schema}}}],
+        "toolChoice": {"tool": {"name": name}}
+    }
+
+def field_schema(field):
+    """Esquema JSON de um campo ('default.title', 'localizations.ja', ...)"""
+    parts = field.split(".")
+    if parts[0] == "default":
+        return DEFAULT_SCHEMA["properties"][parts[1]] if len(parts) > 1 else DEFAULT_SCHEMA
+    if parts[0] == "localizations":
+        return LOCALIZATION_SCHEMA["properties"][parts[2]] if len(parts) > 2 else LOCALIZATION_SCHEMA
+    return METADATA_SCHEMA["properties"][field]
+
+def get_field(metadata, field):
+    value = metadata
+    for part in field.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+def set_field(metadata, field, value):
+    parts = field.split(".")
+    target = metadata
+    for part in parts[:-1]:
+        if not isinstance(target.get(part), dict):
+            target[part] = {}
+        target = target[part]
+    target[parts[-1]] = value
+
+def tags_length(tags):
+    return sum(len(tag) + (2 if " " in tag else 0) for tag in tags) + max(0, len(tags) - 1)
+
+def _text_issue(value, max_chars=None, max_bytes=None):
+    if not isinstance(value, str) or not value.strip():
+        return "ausente ou vazio"
+    if max_chars and len(value) > max_chars:
+        return f"{len(value)} caracteres (máximo {max_chars})"
+    if max_bytes and len(value.encode("utf-8")) > max_bytes:
+        return f"{len(value.encode('utf-8'))} bytes (máximo {max_bytes})"
+    if any(char in value for char in FORBIDDEN_CHARS):
+        return "contém '<' ou '>'"
+    return None
+
+def validate_video_metadata(metadata, scheduled_date=None, languages=None):
+    """Problemas dos metadados de um vídeo: lista de (campo, motivo)
+
+    Campos usam caminho com pontos ('default.title', 'localizations.ja').
+    scheduled_date, se informado, é a data esperada em scheduledPublishTime;
+    languages são os idiomas obrigatórios (padrão: LANGUAGES).
+    """
+    if not isinstance(metadata, dict):
+        return [("default", "metadados não são um objeto")]
+    issues = []
+
+    value = metadata.get("scheduledPublishTime")
+    if not isinstance(value, str) or not SCHEDULED_TIME_PATTERN.fullmatch(value):
+        issues.append(("scheduledPublishTime", "formato inválido"))
+    elif scheduled_date and not value.startswith(scheduled_date):
+        issues.append(("scheduledPublishTime", f"data diferente de {scheduled_date}"))
+
+    default = metadata.get("default")
+    if not isinstance(default, dict):
+        issues.append(("default", "ausente"))
+    else:
+        for field, issue in (
+            ("title", _text_issue(default.get("title"), max_chars=TITLE_MAX_CHARS)),
+            ("description", _text_issue(default.get("description"), max_bytes=DESCRIPTION_MAX_BYTES))
+        ):
+            if issue:
+                issues.append((f"default.{field}", issue))
+        tags = default.get("tags")
+        if not isinstance(tags, list) or not all(isinstance(tag, str) and tag.strip() for tag in tags):
+            issues.append(("default.tags", "não é uma lista de textos"))
+        elif len(tags) < MIN_TAGS:
+            issues.append(("default.tags", f"{len(tags)} tags (mínimo {MIN_TAGS})"))
+        elif tags_length(tags) > TAGS_MAX_CHARS:
+            issues.append(("default.tags", f"{tags_length(tags)} caracteres (máximo {TAGS_MAX_CHARS})"))
+        elif any(char in tag for tag in tags for char in FORBIDDEN_CHARS) or len({tag.lower() for tag in tags}) < len(tags):
+            issues.append(("default.tags", "tags repetidas ou com '<'/'>'"))
+
+    localizations = metadata.get("localizations")
+    if not isinstance(localizations, dict):
+        localizations = {}
+    languages = LANGUAGES if languages is None else languages
+    for language in dict.fromkeys(list(languages) + list(localizations)):
+        localization = localizations.get(language)
+        if not isinstance(localization, dict):
+            issues.append((f"localizations.{language}", "tradução ausente"))
+            continue
+        for field, issue in (
+            ("title", _text_issue(localization.get("title"), max_chars=TITLE_MAX_CHARS)),
+            ("description", _text_issue(localization.get("description"), max_bytes=DESCRIPTION_MAX_BYTES))
+        ):
+            if issue:
+                issues.append((f"localizations.{language}.{field}", issue))
+    return issues
+
+def _strip_forbidden(value):
+    return value.translate({ord(char): None for char in FORBIDDEN_CHARS}).strip()
+
+def apply_local_fixes(metadata, scheduled_date=None):
+    """Corrige sem chamar o modelo o que tem solução determinística; retorna os campos alterados
+
+    Desfaz uma chave extra em volta dos metadados, ajusta a data de
+    scheduledPublishTime (mantendo o horário gerado, se válido), remove
+    espaços e '<'/'>' dos textos e normaliza as tags (lista, sem vazias ou
+    repetidas, cortando as últimas até caber no limite do YouTube).
+    """
+    fixed = []
+    if "default" not in metadata and len(metadata) == 1:
+        # Metadados embrulhados em uma chave extra ({"metadata": {...}})
+        inner = next(iter(metadata.values()))
+        if isinstance(inner, dict) and "default" in inner:
+            metadata.clear()
+            metadata.update(inner)
+            fixed.append("default")
+
+    value = metadata.get("scheduledPublishTime")
+    valid = isinstance(value, str) and SCHEDULED_TIME_PATTERN.fullmatch(value)
+    if scheduled_date and not (valid and value.startswith(scheduled_date)):
+        metadata["scheduledPublishTime"] = scheduled_date + (value[10:] if valid else PUBLISH_TIME)
+        fixed.append("scheduledPublishTime")
+
+    texts = [("default", "title"), ("default", "description")]
+    localizations = metadata.get("localizations")
+    if isinstance(localizations, dict):
+        texts += [(f"localizations.{language}", field) for language, value in localizations.items()
+                  if isinstance(value, dict) for field in ("title", "description")]
+    for parent, field in texts:
+        value = get_field(metadata, f"{parent}.{field}")
+        if isinstance(value, str) and _strip_forbidden(value) != value:
+            set_field(metadata, f"{parent}.{field}", _strip_forbidden(value))
+            fixed.append(f"{parent}.{field}")
+
+    default = metadata.get("default")
+    if isinstance(default, dict) and default.get("tags") is not None:
+        tags = default["tags"]
+        if isinstance(tags, str):
+            tags = tags.split(",")
+        if isinstance(tags, list):
+            normalized = {}
+            for tag in tags:
+                if isinstance(tag, str) and _strip_forbidden(tag):
+                    normalized.setdefault(_strip_forbidden(tag).lower(), _strip_forbidden(tag))
+            normalized = list(normalized.values())
+            while tags_length(normalized) > TAGS_MAX_CHARS:
+                normalized.pop()
+            if normalized != default["tags"]:
+                default["tags"] = normalized
+                fixed.append("default.tags")
+    return fixed
+
+def _truncate(value, fits):
+    """Corta value no último espaço que respeita fits(texto)"""
+    if fits(value):
+        return value
+    cut = value
+    while cut and not fits(cut + "…"):
+        cut = cut[:max(cut.rfind(" "), int(len(cut) * 0.9))].rstrip()
+    return cut + "…" if cut else value[:1]
+
+def apply_fallback_fixes(metadata, issues):
+    """Último recurso após o reparo: corta textos longos e remove traduções inválidas
+
+    Retorna os campos alterados; o que continua inválido (título ou
+    descrição padrão ausentes) permanece nos problemas.
+    """
+    fixed = []
+    for field, _ in issues:
+        value = get_field(metadata, field)
+        if field.endswith(".title") and isinstance(value, str) and value.strip():
+            set_field(metadata, field, _truncate(value, lambda text: len(text) <= TITLE_MAX_CHARS))
+            fixed.append(field)
+        elif field.endswith(".description") and isinstance(value, str) and value.strip():
+            set_field(metadata, field, _truncate(value, lambda text: len(text.encode("utf-8")) <= DESCRIPTION_MAX_BYTES))
+            fixed.append(field)
+    localizations = metadata.get("localizations")
+    if isinstance(localizations, dict):
+        for field, _ in validate_video_metadata(metadata):
+            parts = field.split(".")
+            if parts[0] == "localizations" and parts[1] in localizations:
+                # O YouTube mantém o título/descrição padrão para idiomas sem tradução
+                del localizations[parts[1]]
+                fixed.append(f"localizations.{parts[1]}")
+    return fixed
+
+def blocking_issues(issues):
+    """Problemas que impedem o uso dos metadados (traduções são opcionais para o YouTube)"""
+    return [(field, reason) for field, reason in issues if not field.startswith("localizations.")]
+
+def repair_schema(fields):
+    """Esquema da ferramenta de reparo: um campo do resultado por campo inválido"""
+    return {
+        "type": "object",
+        "properties": {field: copy.deepcopy(field_schema(field)) for field in fields},
+        "required": list(fields)
+    }
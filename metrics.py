@@ -0,0 +1,179 @@
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Métricas de execução (latência, tokens, retentativas, bytes) com relatório JSON e Prometheus
+
+METRICS_DIR = "YouTube_Data/metrics"
+METRIC_PREFIX = "ytmeta_"
+QUANTILES = [0.5, 0.95, 0.99]
+
+def percentile(sorted_values, quantile):
+    """Percentil por posição mais próxima (valores já ordenados)"""
+    if not sorted_values:
+        return None
+    index = max(0, math.ceil(quantile * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+def _format_labels(label_key, extra=()):
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (f'{key}="{value}"'.replace("\n", " ") for key, value in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+def _format_summary_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f"{key}={value}" for key, value in labels.items()) + "}"
+
+class Metrics:
+    """Registro de contadores e distribuições, compartilhado entre threads
+
+    Distribuições guardam os valores observados (uma execução tem no máximo
+    alguns milhares de chamadas), permitindo percentis exatos no relatório.
+    """
+
+    def __init__(self):
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def increment(self, name, amount=1, **labels):
+        """Soma 'amount' ao contador name{labels}"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        """Registra um valor na distribuição name{labels}"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._histograms.setdefault(key, []).append(value)
+
+    def values(self, name, **labels):
+        """Valores observados na distribuição name{labels}"""
+        with self._lock:
+            return list(self._histograms.get((name, _label_key(labels)), []))
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Mede a duração do bloco em segundos (registrada mesmo se houver exceção)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def snapshot(self):
+        """Estado atual em estrutura serializável"""
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            histograms = []
+            for (name, labels), values in sorted(self._histograms.items()):
+                ordered = sorted(values)
+                entry = {
+                    "name": name,
+                    "labels": dict(labels),
+                    "count": len(ordered),
+                    "sum": sum(ordered),
+                    "min": ordered[0],
+                    "max": ordered[-1]
+                }
+                for quantile in QUANTILES:
+                    entry[f"p{int(quantile * 100)}"] = percentile(ordered, quantile)
+                histograms.append(entry)
+        return {
+            "started_at": self.started_at,
+            "elapsed_seconds": time.time() - self.started_at,
+            "counters": counters,
+            "histograms": histograms
+        }
+
+    def to_prometheus(self, snapshot=None):
+        """Formato de exposição em texto do Prometheus (distribuições como summary)"""
+        snapshot = snapshot or self.snapshot()
+        lines = []
+        typed = set()
+
+        for counter in snapshot["counters"]:
+            name = f"{METRIC_PREFIX}{counter['name']}_total"
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{_format_labels(_label_key(counter['labels']))} {counter['value']}")
+
+        for histogram in snapshot["histograms"]:
+            name = f"{METRIC_PREFIX}{histogram['name']}"
+            label_key = _label_key(histogram["labels"])
+            if name not in typed:
+                lines.append(f"# TYPE {name} summary")
+                typed.add(name)
+            for quantile in QUANTILES:
+                value = histogram[f"p{int(quantile * 100)}"]
+                lines.append(f"{name}{_format_labels(label_key, [('quantile', str(quantile))])} {value}")
+            lines.append(f"{name}_sum{_format_labels(label_key)} {histogram['sum']}")
+            lines.append(f"{name}_count{_format_labels(label_key)} {histogram['count']}")
+
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, run_name, directory=METRICS_DIR):
+        """Grava <run_name>.json e <run_name>.prom em directory; retorna os caminhos"""
+        os.makedirs(directory, exist_ok=True)
+        snapshot = self.snapshot()
+        snapshot["run"] = run_name
+        json_path = os.path.join(directory, f"{run_name}.json")
+        prom_path = os.path.join(directory, f"{run_name}.prom")
+        with open(json_path, "w", encoding="utf-8") as file:
+            json.dump(snapshot, file, ensure_ascii=False, indent=2)
+        with open(prom_path, "w", encoding="utf-8") as file:
+            file.write(self.to_prometheus(snapshot))
+        return json_path, prom_path
+
+    def summary_lines(self, prefix=""):
+        """Resumo legível: percentis das distribuições e total dos contadores"""
+        snapshot = self.snapshot()
+        lines = []
+        for histogram in snapshot["histograms"]:
+            if not histogram["name"].startswith(prefix):
+                continue
+            lines.append(
+                f"{histogram['name']}{_format_summary_labels(histogram['labels'])}: n={histogram['count']} "
+                f"p50={histogram['p50']:.3g} p95={histogram['p95']:.3g} max={histogram['max']:.3g}"
+            )
+        for counter in snapshot["counters"]:
+            if not counter["name"].startswith(prefix):
+                continue
+            lines.append(f"{counter['name']}{_format_summary_labels(counter['labels'])}: {counter['value']}")
+        return lines
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self.started_at = time.time()
+
+# Registro global usado pelos scripts
+REGISTRY = Metrics()
+increment = REGISTRY.increment
+observe = REGISTRY.observe
+timer = REGISTRY.timer
+
+def write_report(run_name, directory=METRICS_DIR):
+    """Grava o relatório do registro global e exibe o resumo"""
+    json_path, prom_path = REGISTRY.write_report(run_name, directory)
+    print("\n=== Métricas ===")
+    for line in REGISTRY.summary_lines():
+        print(f"  {line}")
+    print(f"📈 Relatório: {json_path} | {prom_path}")
+    return json_path, prom_path
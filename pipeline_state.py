@@ -0,0 +1,172 @@
+import json
+import os
+import threading
+import time
+
+# Estado por vídeo compartilhado entre 03_generate_metadata.py e 04_update_youtube.py
+
+METADATA_FILE = "YouTube_Data/generated_metadata.json"
+JOURNAL_FILE = "YouTube_Data/pipeline_journal.jsonl"
+COMPACT_THRESHOLD = 500  # Registros no diário que disparam compactação automática
+
+# Estados possíveis de cada vídeo
+PENDING = "pending"
+GENERATED = "generated"
+UPLOADED = "uploaded"
+FAILED = "failed"
+
+# Transições permitidas (None = vídeo ainda sem estado)
+TRANSITIONS = {
+    None: {PENDING, GENERATED, FAILED},
+    PENDING: {PENDING, GENERATED, FAILED},
+    GENERATED: {PENDING, GENERATED, UPLOADED, FAILED},
+    UPLOADED: {PENDING, GENERATED, UPLOADED, FAILED},
+    FAILED: {PENDING, GENERATED, UPLOADED, FAILED}
+}
+
+def write_json_atomic(path, data, indent=None):
+    """Grava JSON em arquivo temporário e substitui o destino atomicamente"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump(data, file, ensure_ascii=False, indent=indent)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+class PipelineState:
+    """Metadados e estado de cada vídeo com diário append-only
+
+    generated_metadata.json é o snapshot compactado; o diário JSONL guarda
+    cada mudança desde a última compactação. Ao carregar, o snapshot é lido
+    e o diário reaplicado, então uma execução interrompida retoma do último
+    registro gravado. Uma linha truncada por falha no meio da escrita é
+    ignorada.
+    """
+
+    def __init__(self, metadata_file=METADATA_FILE, journal_file=JOURNAL_FILE, compact_threshold=COMPACT_THRESHOLD):
+        self.metadata_file = metadata_file
+        self.journal_file = journal_file
+        self.compact_threshold = compact_threshold
+        self.metadata = {}
+        self.states = {}
+        self.appended = 0
+        self._lock = threading.RLock()
+
+    @classmethod
+    def load(cls, metadata_file=METADATA_FILE, journal_file=JOURNAL_FILE, compact_threshold=COMPACT_THRESHOLD):
+        """Carrega snapshot e reaplica o diário"""
+        state = cls(metadata_file, journal_file, compact_threshold)
+
+        if os.path.exists(metadata_file):
+            with open(metadata_file, "r", encoding="utf-8") as file:
+                state.metadata = json.load(file)
+
+        if os.path.exists(journal_file):
+            with open(journal_file, "rb+") as file:
+                valid_size = 0
+                for line in file:
+                    if not line.endswith(b"\n"):
+                        break
+                    valid_size += len(line)
+                    try:
+                        state._apply(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+                # Remove linha truncada para que o próximo registro comece em linha nova
+                file.truncate(valid_size)
+
+        return state
+
+    def _apply(self, entry):
+        video_id = entry["video_id"]
+        self.states[video_id] = {key: value for key, value in entry.items() if key not in ("video_id", "metadata")}
+        if "metadata" in entry:
+            self.metadata[video_id] = entry["metadata"]
+
+    def state_of(self, video_id):
+        """Estado atual do vídeo
+
+        Vídeos com metadados mas sem registro no diário (gerados antes do
+        diário existir) são considerados GENERATED.
+        """
+        with self._lock:
+            if video_id in self.states:
+                return self.states[video_id]["state"]
+            if video_id in self.metadata:
+                return GENERATED
+            return None
+
+    def entry(self, video_id):
+        """Último registro do vídeo (estado, etapa, erro, horário)"""
+        with self._lock:
+            return dict(self.states.get(video_id, {}))
+
+    def record(self, video_id, state, metadata=None, **details):
+        """Registra uma transição de estado no diário (fsync antes de retornar)"""
+        with self._lock:
+            current = self.state_of(video_id)
+            if state not in TRANSITIONS[current]:
+                raise ValueError(f"Transição inválida para {video_id}: {current} -> {state}")
+
+            entry = {"video_id": video_id, "state": state, "ts": time.time(), **details}
+            if metadata is not None:
+                entry["metadata"] = metadata
+
+            os.makedirs(os.path.dirname(self.journal_file) or ".", exist_ok=True)
+            with open(self.journal_file, "a", encoding="utf-8") as file:
+                file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                file.flush()
+                os.fsync(file.fileno())
+
+            self._apply(entry)
+            self.appended += 1
+            if self.compact_threshold and self.appended >= self.compact_threshold:
+                self.compact()
+
+    def video_ids(self, *states, stage=None):
+        """IDs com estado em 'states' (e, se informado, falha na etapa 'stage')"""
+        with self._lock:
+            ids = list(dict.fromkeys(list(self.metadata) + list(self.states)))
+            return [
+                video_id for video_id in ids
+                if self.state_of(video_id) in states
+                and (stage is None or self.states.get(video_id, {}).get("stage") == stage)
+            ]
+
+    def compact(self, order=None):
+        """Grava o snapshot de metadados e reescreve o diário só com os estados atuais
+
+        order define a ordem dos vídeos no snapshot (os demais vêm depois).
+        O snapshot é substituído antes do diário; se o processo parar entre
+        as duas etapas, reaplicar o diário antigo produz o mesmo resultado.
+        """
+        with self._lock:
+            if order:
+                ordered = {video_id: self.metadata[video_id] for video_id in order if video_id in self.metadata}
+                ordered.update(self.metadata)
+                self.metadata = ordered
+            write_json_atomic(self.metadata_file, self.metadata, indent=2)
+
+            temp_path = f"{self.journal_file}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as file:
+                for video_id, entry in self.states.items():
+                    file.write(json.dumps({"video_id": video_id, **entry}, ensure_ascii=False) + "\n")
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, self.journal_file)
+            self.appended = 0
+
+    def statuses(self):
+        """Estado atual de cada vídeo ({video_id: estado})"""
+        with self._lock:
+            return {video_id: self.state_of(video_id) for video_id in dict.fromkeys(list(self.metadata) + list(self.states))}
+
+    def summary(self):
+        """Contagem de vídeos por estado"""
+        with self._lock:
+            counts = {}
+            for video_id in dict.fromkeys(list(self.metadata) + list(self.states)):
+                state = self.state_of(video_id)
+                counts[state] = counts.get(state, 0) + 1
+            return counts
@@ -0,0 +1,161 @@
+import random
+import threading
+import time
+from botocore.exceptions import ClientError
+
+# Limitador de taxa compartilhado e retentativas para chamadas ao Bedrock
+
+# Erros que indicam excesso de requisições (reduzem a taxa do limitador)
+THROTTLING_ERROR_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceQuotaExceededException"
+}
+
+# Erros transitórios que podem ser repetidos sem alterar a taxa
+TRANSIENT_ERROR_CODES = {
+    "ServiceUnavailableException",
+    "InternalServerException",
+    "ModelNotReadyException",
+    "ModelTimeoutException"
+}
+
+def classify_error(error):
+    """Classifica um erro como 'throttle', 'transient' ou 'fatal'"""
+    if isinstance(error, ClientError):
+        code = error.response.get("Error", {}).get("Code", "")
+        if code in THROTTLING_ERROR_CODES:
+            return "throttle"
+        if code in TRANSIENT_ERROR_CODES:
+            return "transient"
+        status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0)
+        if status == 429:
+            return "throttle"
+        if status >= 500:
+            return "transient"
+        return "fatal"
+
+    # Erros de rede do botocore (timeout, conexão) são transitórios
+    if type(error).__module__.startswith(("botocore", "urllib3")) and "Timeout" in type(error).__name__:
+        return "transient"
+    if type(error).__name__ in ("EndpointConnectionError", "ConnectionClosedError"):
+        return "transient"
+    return "fatal"
+
+class TokenBucket:
+    """Balde de tokens com reposição contínua e taxa ajustável"""
+
+    def __init__(self, rate_per_minute):
+        self.capacity = float(rate_per_minute)
+        self.rate_per_second = rate_per_minute / 60.0
+        self.available = float(rate_per_minute)
+        self.updated_at = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated_at) * self.rate_per_second)
+        self.updated_at = now
+
+    def wait_time(self, amount):
+        """Segundos até haver 'amount' disponível (0 se já houver)"""
+        self.refill()
+        # Pedidos maiores que a capacidade são limitados à capacidade para não travar
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.rate_per_second
+
+    def consume(self, amount):
+        self.refill()
+        self.available -= amount
+
+class AdaptiveRateLimiter:
+    """Limitador compartilhado entre threads para requisições/min e tokens/min
+
+    A taxa efetiva começa no máximo configurado, é reduzida pela metade a cada
+    throttling e volta a crescer gradualmente após chamadas bem-sucedidas.
+    """
+
+    def __init__(self, requests_per_minute, tokens_per_minute, min_fraction=0.1, recovery_step=0.05):
+        self.max_requests_per_minute = requests_per_minute
+        self.max_tokens_per_minute = tokens_per_minute
+        self.min_fraction = min_fraction
+        self.recovery_step = recovery_step
+        self.fraction = 1.0
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.throttle_count = 0
+        self.total_wait = 0.0
+        self._lock = threading.Lock()
+
+    def _apply_fraction(self):
+        for bucket, maximum in ((self.requests, self.max_requests_per_minute), (self.tokens, self.max_tokens_per_minute)):
+            bucket.refill()
+            bucket.rate_per_second = maximum * self.fraction / 60.0
+
+    def acquire(self, estimated_tokens=0):
+        """Bloqueia até haver capacidade para uma requisição com 'estimated_tokens'"""
+        while True:
+            with self._lock:
+                wait = max(self.requests.wait_time(1), self.tokens.wait_time(estimated_tokens))
+                if wait <= 0:
+                    self.requests.consume(1)
+                    self.tokens.consume(estimated_tokens)
+                    return
+                self.total_wait += wait
+            time.sleep(wait)
+
+    def record_usage(self, estimated_tokens, actual_tokens):
+        """Corrige o saldo de tokens com o consumo real informado pela resposta"""
+        with self._lock:
+            self.tokens.consume(actual_tokens - estimated_tokens)
+
+    def on_throttle(self):
+        """Reduz a taxa efetiva após um throttling"""
+        with self._lock:
+            self.throttle_count += 1
+            self.fraction = max(self.min_fraction, self.fraction / 2)
+            self._apply_fraction()
+
+    def on_success(self):
+        """Recupera a taxa efetiva gradualmente após sucesso"""
+        with self._lock:
+            if self.fraction < 1.0:
+                self.fraction = min(1.0, self.fraction + self.recovery_step)
+                self._apply_fraction()
+
+    @property
+    def requests_per_minute(self):
+        return self.max_requests_per_minute * self.fraction
+
+def backoff_delay(attempt, base_delay=2.0, max_delay=60.0):
+    """Backoff exponencial com full jitter"""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+def call_with_retry(call, rate_limiter=None, estimated_tokens=0, max_retries=6, base_delay=2.0, max_delay=60.0, on_retry=None):
+    """Executa 'call' respeitando o limitador e repetindo erros recuperáveis
+
+    Erros fatais (validação, acesso negado etc.) são propagados imediatamente.
+    """
+    attempt = 0
+    while True:
+        if rate_limiter:
+            rate_limiter.acquire(estimated_tokens)
+        try:
+            response = call()
+        except Exception as e:
+            kind = classify_error(e)
+            if kind == "fatal" or attempt >= max_retries:
+                raise
+            if kind == "throttle" and rate_limiter:
+                rate_limiter.on_throttle()
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            if on_retry:
+                on_retry(attempt + 1, kind, e, delay)
+            time.sleep(delay)
+            attempt += 1
+            continue
+
+        if rate_limiter:
+            rate_limiter.on_success()
+        return response
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+import time
+
+# Cache persistente de respostas do Bedrock indexado pelo conteúdo da entrada
+
+class ResponseCache:
+    """Cache em disco com um arquivo JSON por entrada
+
+    A chave é o hash SHA-256 dos campos que determinam a resposta (ETag do
+    documento, tipo, prompt e variáveis). Entradas antigas ou excedentes são
+    removidas por idade e tamanho total, das menos usadas para as mais usadas.
+    Também guarda, por nome (ex.: video_id), a última chave gerada.
+    """
+
+    def __init__(self, cache_dir, max_age_days=None, max_size_mb=None):
+        self.cache_dir = cache_dir
+        self.max_age_seconds = max_age_days * 86400 if max_age_days else None
+        self.max_size_bytes = max_size_mb * 1024 * 1024 if max_size_mb else None
+        self.latest_path = os.path.join(cache_dir, "latest.json")
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        os.makedirs(cache_dir, exist_ok=True)
+        self.latest_keys = self._read_json(self.latest_path) or {}
+
+    @staticmethod
+    def make_key(**fields):
+        """Gera chave determinística a partir dos campos informados"""
+        payload = json.dumps(fields, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _read_json(self, path):
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _write_json(self, path, data):
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(data, file, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+    def get(self, key):
+        """Retorna valor em cache ou None (respeitando a idade máxima)"""
+        path = self._entry_path(key)
+        entry = self._read_json(path)
+        if entry is None or self._expired(entry):
+            self.stats["misses"] += 1
+            return None
+
+        # Atualiza mtime para a remoção por tamanho considerar o último uso
+        os.utime(path)
+        self.stats["hits"] += 1
+        return entry["value"]
+
+    def put(self, key, value):
+        """Grava valor no cache"""
+        self._write_json(self._entry_path(key), {"created_at": time.time(), "value": value})
+        self.stats["writes"] += 1
+
+    def latest(self, name):
+        """Última chave registrada para 'name' ou None"""
+        return self.latest_keys.get(name)
+
+    def set_latest(self, name, key):
+        """Registra a chave atual de 'name' (persistida em flush)"""
+        self.latest_keys[name] = key
+
+    def flush(self):
+        """Grava em disco o registro de últimas chaves"""
+        self._write_json(self.latest_path, self.latest_keys)
+
+    def _expired(self, entry):
+        return self.max_age_seconds is not None and time.time() - entry.get("created_at", 0) > self.max_age_seconds
+
+    def evict(self):
+        """Remove entradas expiradas e, se necessário, as menos usadas até caber no limite"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if not name.endswith(".json") or path == self.latest_path:
+                continue
+            entry = self._read_json(path)
+            if entry is None or self._expired(entry):
+                os.remove(path)
+                self.stats["evictions"] += 1
+                continue
+            info = os.stat(path)
+            entries.append((info.st_mtime, info.st_size, path))
+
+        if self.max_size_bytes is not None:
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_size_bytes:
+                    break
+                os.remove(path)
+                total -= size
+                self.stats["evictions"] += 1
+
+        return self.stats["evictions"]
+
+    def summary(self):
+        """Resumo textual das estatísticas"""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        hit_rate = self.stats["hits"] / lookups * 100 if lookups else 0.0
+        return (f"{self.stats['hits']} hits, {self.stats['misses']} misses ({hit_rate:.0f}% hit rate), "
+                f"{self.stats['writes']} gravações, {self.stats['evictions']} removidas")
@@ -0,0 +1,293 @@
+import importlib
+import queue
+import threading
+import time
+import clients
+import metrics
+from pipeline_state import FAILED, GENERATED, PENDING, PipelineState
+from rate_limiter import AdaptiveRateLimiter
+from response_cache import ResponseCache
+from video_catalog import VideoCatalog
+
+# Módulos das etapas (nomes iniciados por dígito não podem ser importados com 'import')
+generate = importlib.import_module("03_generate_metadata")
+update = importlib.import_module("04_update_youtube")
+
+# Configurações do pipeline: validação → geração → atualização em fluxo contínuo
+PIPELINE_STATUSES = generate.GENERATION_STATUSES + [GENERATED]  # Também os gerados ainda não enviados ao YouTube
+GENERATE_WORKERS = generate.MAX_WORKERS  # Chamadas simultâneas ao Bedrock
+UPDATE_WORKERS = update.MAX_WORKERS  # Atualizações simultâneas no YouTube
+GENERATE_QUEUE_SIZE = 8  # Vídeos validados aguardando geração
+UPDATE_QUEUE_SIZE = 8  # Vídeos gerados aguardando envio ao YouTube
+
+def validate_stage(videos, tasks, state, youtube, quota, generate_queue, update_queue, abort_event, stats):
+    """Valida vídeos em lotes de videos.list e encaminha cada um para a próxima etapa
+
+    O mesmo videos.list confirma que o vídeo existe no canal e traz o estado
+    atual usado na detecção de alterações. Vídeos que precisam de geração
+    vão para generate_queue; vídeos já gerados e ainda não enviados vão
+    direto para update_queue. Duplicatas de um documento (task["duplicates"])
+    só têm o estado atual registrado: seguem para update_queue quando a
+    tarefa do grupo é gerada. As filas são limitadas: a validação espera
+    quando as etapas seguintes estão ocupadas, e para após um erro fatal
+    (abort_event).
+    """
+    tasks_by_id = {task["video"]["video_id"]: task for task in tasks}
+    duplicate_ids = {duplicate["video"]["video_id"] for task in tasks for duplicate in task.get("duplicates", [])}
+    to_upload = set(state.video_ids(GENERATED)) | set(state.video_ids(FAILED, stage="upload"))
+    candidates = [video["video_id"] for video in videos
+                  if video["video_id"] in tasks_by_id or video["video_id"] in duplicate_ids or video["video_id"] in to_upload]
+    candidates = list(dict.fromkeys(candidates))
+
+    for batch in update.chunked(candidates, update.LIST_BATCH_SIZE):
+        if abort_event.is_set():
+            return
+        try:
+            current_states = update.prefetch_video_states(youtube, batch, quota)
+        except update.QuotaExhausted as e:
+            print(f"⛔ Quota esgotada na validação: {e}")
+            return
+
+        for video_id in batch:
+            if video_id not in current_states:
+                stats["missing"] += 1
+                stats["missing_ids"].add(video_id)
+                if video_id in tasks_by_id or video_id in duplicate_ids:
+                    state.record(video_id, FAILED, stage="validate")
+                if tasks_by_id.get(video_id, {}).get("duplicates"):
+                    # O documento ainda é analisado para as duplicatas do grupo
+                    print(f"❌ [{video_id}] Vídeo não encontrado no YouTube, gerando apenas para as duplicatas")
+                    generate_queue.put(tasks_by_id[video_id])
+                    continue
+                print(f"❌ [{video_id}] Vídeo não encontrado no YouTube, ignorando")
+                continue
+            stats["current"][video_id] = current_states[video_id]
+            if video_id in duplicate_ids:
+                continue
+            if video_id in tasks_by_id:
+                generate_queue.put(tasks_by_id[video_id])
+            else:
+                update_queue.put(video_id)
+
+def fail_item(state, video_ids, stage, error, abort_event):
+    """Registra FAILED na etapa para os vídeos de um item que lançou um erro inesperado
+
+    Se nem o registro da falha funcionar (diário ilegível ou disco cheio), o
+    erro é fatal: abort_event encerra as etapas, que passam só a esvaziar
+    suas filas para que nenhuma thread fique bloqueada em put().
+    """
+    print(f"  ❌ Erro inesperado na etapa {stage} ({', '.join(video_ids)}): {type(error).__name__}: {error}")
+    metrics.increment("pipeline_errors", stage=stage, error=type(error).__name__)
+    try:
+        for video_id in video_ids:
+            state.record(video_id, FAILED, stage=stage)
+    except Exception as e:
+        if not abort_event.is_set():
+            print(f"⛔ Falha ao registrar o estado ({type(e).__name__}: {e}), encerrando o pipeline")
+        abort_event.set()
+
+def generate_stage(bedrock_client, s3_client, rate_limiter, state, cache, cache_lock, generate_queue, update_queue, abort_event, stats):
+    """Consome tarefas de generate_queue e envia cada vídeo gerado para update_queue"""
+    while True:
+        task = generate_queue.get()
+        if task is None:
+            return
+        if abort_event.is_set():
+            # Erro fatal: só esvazia a fila para não bloquear a validação
+            continue
+
+        video_id = task["video"]["video_id"]
+        members = [member["video"]["video_id"] for member in [task] + task.get("duplicates", [])]
+        try:
+            try:
+                new_metadata = generate.run_generation_task(bedrock_client, task, rate_limiter, s3_client)
+            except Exception as e:
+                print(f"  ❌ Erro na tarefa {video_id}: {type(e).__name__}: {e}")
+                new_metadata = None
+
+            if not new_metadata:
+                for member in members:
+                    state.record(member, FAILED, stage="generate")
+                with cache_lock:
+                    stats["generate_failed"] += 1
+                continue
+
+            with cache_lock:
+                generate.store_generated(cache, task, new_metadata)
+                stats["generated"] += 1
+            # Metadados do grupo inteiro (tarefa e duplicatas); vídeos ausentes do canal não são enviados
+            ready = [key for key in new_metadata if key not in stats["missing_ids"]]
+            for key in ready:
+                state.record(key, GENERATED, new_metadata[key])
+        except Exception as e:
+            with cache_lock:
+                stats["generate_failed"] += 1
+            fail_item(state, members, "generate", e, abort_event)
+            continue
+        print(f"  ✅ Metadados gerados com sucesso: {', '.join(new_metadata)}")
+        for key in ready:
+            update_queue.put(key)
+
+def update_stage(client_factory, state, quota, update_queue, stop_event, abort_event, stats):
+    """Consome vídeos gerados de update_queue e aplica os metadados no YouTube
+
+    Após a quota acabar (ou um erro fatal) a fila continua sendo consumida
+    sem chamadas para não bloquear a geração; esses vídeos ficam como
+    gerados para a próxima execução.
+    """
+    youtube = None
+    while True:
+        video_id = update_queue.get()
+        if video_id is None:
+            return
+        if stop_event.is_set() or abort_event.is_set():
+            stats["results"][video_id] = update.PENDING
+            continue
+
+        try:
+            if youtube is None:
+                youtube = client_factory()
+            if stats["first_update_at"] is None:
+                stats["first_update_at"] = time.monotonic()
+            try:
+                with metrics.timer("stage_seconds", stage="update"):
+                    result = update.update_video_metadata(
+                        youtube, video_id, state.metadata[video_id], quota, stats["current"].get(video_id)
+                    )
+            except update.QuotaExhausted as e:
+                if not stop_event.is_set():
+                    print(f"  ⛔ Quota esgotada: {e}")
+                stop_event.set()
+                result = update.PENDING
+            stats["results"][video_id] = result
+            metrics.increment("video_updates", result=result)
+            update.record_upload_result(state, video_id, result)
+        except Exception as e:
+            stats["results"][video_id] = update.FAILED
+            fail_item(state, [video_id], "upload", e, abort_event)
+
+def run_pipeline(videos, tasks, state, s3_client, bedrock_client, youtube_factory, quota, cache,
+                 rate_limiter=None, generate_workers=GENERATE_WORKERS, update_workers=UPDATE_WORKERS):
+    """Executa validação, geração e atualização como etapas encadeadas por filas limitadas
+
+    Cada etapa roda em suas próprias threads: o YouTube começa a receber
+    atualizações enquanto o Bedrock ainda gera os vídeos seguintes, e o
+    tempo total tende ao da etapa mais lenta em vez da soma das etapas.
+    youtube_factory cria um cliente YouTube por thread. Retorna as estatísticas.
+    """
+    generate_queue = queue.Queue(maxsize=GENERATE_QUEUE_SIZE)
+    update_queue = queue.Queue(maxsize=UPDATE_QUEUE_SIZE)
+    stop_event = threading.Event()
+    abort_event = threading.Event()
+    cache_lock = threading.Lock()
+    stats = {
+        "current": {},
+        "results": {},
+        "missing": 0,
+        "missing_ids": set(),
+        "generated": 0,
+        "generate_failed": 0,
+        "started_at": time.monotonic(),
+        "first_update_at": None
+    }
+
+    generators = [
+        threading.Thread(
+            target=generate_stage,
+            args=(bedrock_client, s3_client, rate_limiter, state, cache, cache_lock, generate_queue, update_queue, abort_event, stats)
+        )
+        for _ in range(max(1, generate_workers))
+    ]
+    updaters = [
+        threading.Thread(target=update_stage, args=(youtube_factory, state, quota, update_queue, stop_event, abort_event, stats))
+        for _ in range(max(1, update_workers))
+    ]
+    for thread in generators + updaters:
+        thread.start()
+
+    try:
+        validate_stage(videos, tasks, state, youtube_factory(), quota, generate_queue, update_queue, abort_event, stats)
+    finally:
+        # Encerra as etapas em ordem: cada uma termina após esvaziar sua fila
+        for _ in generators:
+            generate_queue.put(None)
+        for thread in generators:
+            thread.join()
+        for _ in updaters:
+            update_queue.put(None)
+        for thread in updaters:
+            thread.join()
+
+    stats["elapsed"] = time.monotonic() - stats["started_at"]
+    return stats
+
+def main():
+    print("=== Pipeline Completo: Validação → Geração → YouTube ===\n")
+
+    # Clientes criados uma única vez e compartilhados pelas etapas
+    s3_client = clients.s3_client(generate.REGION)
+    bedrock_client = clients.bedrock_runtime_client(generate.REGION)
+    print("🔐 Configurando cliente YouTube...")
+    creds = update.get_credentials()
+    rate_limiter = AdaptiveRateLimiter(generate.REQUESTS_PER_MINUTE, generate.TOKENS_PER_MINUTE)
+    if generate.resolve_prompt_mode():
+        # Modelo e parâmetros do prompt consultados antes de iniciar as threads de geração
+        print(f"🧩 Prompt {generate.PROMPT_ARN}: {generate.structured_model_id()}")
+    quota = update.QuotaTracker(update.QUOTA_BUDGET)
+
+    state = PipelineState.load(generate.METADATA_FILE)
+    # Mesma seleção de 03 (pendentes e gerados com documento, prompt ou data alterados), mais os gerados a enviar;
+    # vídeos já enviados e sem alterações não são validados de novo
+    with VideoCatalog.open() as catalog:
+        videos, inventory, series = generate.select_videos(catalog, state, s3_client, PIPELINE_STATUSES)
+    print(f"Vídeos para processar: {len(videos)}")
+    if not videos:
+        print("✅ Nenhum vídeo pendente, a enviar ou com documento, prompt ou data alterados.")
+        return
+    print(f"📦 Índice S3: {len(inventory)} objetos em {inventory.list_requests} requisição(ões) de listagem")
+
+    cache = ResponseCache(generate.CACHE_DIR, generate.CACHE_MAX_AGE_DAYS, generate.CACHE_MAX_SIZE_MB)
+    tasks, cached_metadata = generate.build_generation_tasks(inventory, videos, dict(state.metadata), cache, series)
+    cache.flush()
+    for video_id, metadata in cached_metadata.items():
+        state.record(video_id, GENERATED, metadata, source="cache")
+    for task in tasks:
+        state.record(task["video"]["video_id"], PENDING)
+    print(f"\n♻️  Vídeos servidos do cache: {len(cached_metadata)}")
+    print(f"🚀 Vídeos pendentes de geração: {len(tasks)}")
+    if generate.DEDUPLICATE_DOCUMENTS:
+        unique_tasks = generate.deduplicate_tasks(tasks, inventory, s3_client)
+        print(f"🔗 Documentos únicos: {len(unique_tasks)} ({len(tasks) - len(unique_tasks)} vídeos reutilizam uma análise)")
+        tasks = unique_tasks
+    print(f"   {GENERATE_WORKERS} gerações e {UPDATE_WORKERS} atualizações simultâneas, filas de {GENERATE_QUEUE_SIZE}/{UPDATE_QUEUE_SIZE}\n")
+
+    stats = run_pipeline(
+        videos, tasks, state, s3_client, bedrock_client,
+        lambda: clients.youtube_client(creds, update.SCOPES), quota, cache, rate_limiter
+    )
+    with VideoCatalog.open() as catalog:
+        state.compact(order=[video["video_id"] for video in catalog.iter_videos()])
+        catalog.sync_statuses(state)
+        generate.record_generations(catalog, state, videos, inventory)
+
+    results = stats["results"]
+    updated_count = sum(1 for result in results.values() if result == update.UPDATED)
+    unchanged_count = sum(1 for result in results.values() if result == update.UNCHANGED)
+    pending_count = sum(1 for result in results.values() if result == update.PENDING)
+
+    print("\n=== Pipeline Concluído ===")
+    print(f"Gerados: {stats['generated']} ({stats['generate_failed']} falhas) | Não encontrados no YouTube: {stats['missing']}")
+    print(f"YouTube: {updated_count} alterados, {unchanged_count} já atualizados, {pending_count} pendentes por falta de quota")
+    print(f"Quota usada: {quota.used}/{quota.budget} unidades ({quota.calls['list']} list, {quota.calls['update']} update)")
+    if stats["first_update_at"] is not None:
+        print(f"Primeira atualização no YouTube após {stats['first_update_at'] - stats['started_at']:.1f}s")
+    print(f"Tempo total: {stats['elapsed']:.1f}s")
+    print(f"Estados: {state.summary()}")
+    cache.evict()
+    print(f"Cache: {cache.summary()}")
+    print(f"Throttlings: {rate_limiter.throttle_count} | Taxa final: {rate_limiter.requests_per_minute:.1f} req/min")
+    metrics.increment("youtube_quota_units", quota.used)
+    metrics.write_report("run_pipeline")
+
+if __name__ == "__main__":
+    main()
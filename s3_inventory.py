@@ -0,0 +1,61 @@
+import os
+from collections import namedtuple
+import metrics
+
+# Índice em memória do conteúdo de um bucket S3
+
+S3ObjectInfo = namedtuple("S3ObjectInfo", ["size", "etag", "last_modified"])
+
+class S3Inventory:
+    """Lista um prefixo do bucket uma única vez e responde consultas de existência
+
+    Substitui um head_object por arquivo por uma listagem paginada
+    (até 1000 chaves por requisição list_objects_v2).
+    """
+
+    def __init__(self, s3_client, bucket, prefix=""):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.objects = {}
+        self.list_requests = 0
+        self.loaded = False
+
+    @classmethod
+    def for_keys(cls, s3_client, bucket, keys):
+        """Cria inventário limitado ao maior prefixo comum das chaves desejadas"""
+        keys = list(keys)
+        prefix = os.path.commonprefix(keys) if keys else ""
+        return cls(s3_client, bucket, prefix).load()
+
+    def load(self):
+        """Carrega o índice com list_objects_v2 paginado"""
+        self.objects = {}
+        self.list_requests = 0
+        with metrics.timer("stage_seconds", stage="s3_inventory"):
+            paginator = self.s3_client.get_paginator("list_objects_v2")
+            for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+                self.list_requests += 1
+                for item in page.get("Contents", []):
+                    self.objects[item["Key"]] = S3ObjectInfo(
+                        item["Size"],
+                        item["ETag"].strip('"'),
+                        item["LastModified"]
+                    )
+        self.loaded = True
+        return self
+
+    def exists(self, key):
+        """Verifica se a chave existe no índice"""
+        return key in self.objects
+
+    def get(self, key):
+        """Retorna S3ObjectInfo da chave ou None"""
+        return self.objects.get(key)
+
+    def add(self, key, size, etag, last_modified=None):
+        """Registra um objeto enviado após a listagem"""
+        self.objects[key] = S3ObjectInfo(size, etag.strip('"'), last_modified)
+
+    def __len__(self):
+        return len(self.objects)
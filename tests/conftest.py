@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Os scripts ficam na raiz do repositório (nomes com dígito: importlib.import_module);
+# os testes usam os fakes de local_fakes.py
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
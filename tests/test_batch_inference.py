@@ -0,0 +1,34 @@
+import pytest
+import batch_inference
+
+@pytest.mark.parametrize("total, max_records, sizes", [
+    (250, 100, [84, 83, 83]),
+    (200, 100, [100, 100]),
+    (120, 100, [60, 60]),
+    (99, 100, [99]),
+    (0, 100, [0])
+])
+def test_chunk_records_balances_jobs(total, max_records, sizes):
+    records = list(range(total))
+    chunks = batch_inference.chunk_records(records, max_records)
+
+    assert [len(chunk) for chunk in chunks] == sizes
+    assert [record for chunk in chunks for record in chunk] == records
+
+def test_chunks_never_fall_below_minimum_when_split():
+    # Cortes fixos de 50.000 deixariam uma sobra de 1 registro
+    chunks = batch_inference.chunk_records(list(range(batch_inference.BATCH_MAX_RECORDS + 1)))
+    assert len(chunks) == 2
+    assert min(len(chunk) for chunk in chunks) >= batch_inference.BATCH_MIN_RECORDS
+    assert max(len(chunk) for chunk in chunks) <= batch_inference.BATCH_MAX_RECORDS
+
+def test_build_record_includes_tool_config_only_when_given():
+    messages = [{"role": "user", "content": [{"text": "Hi"}]}]
+    record = batch_inference.build_record("r1", messages, "system", {"maxTokens": 10})
+    assert record["recordId"] == "r1"
+    assert record["modelInput"]["inferenceConfig"] == {"maxTokens": 10}
+    assert "toolConfig" not in record["modelInput"]
+
+    tool_config = {"tools": [], "toolChoice": {"any": {}}}
+    record = batch_inference.build_record("r1", messages, "system", {"maxTokens": 10}, tool_config)
+    assert record["modelInput"]["toolConfig"] == tool_config
@@ -0,0 +1,55 @@
+import importlib
+import pytest
+from document_fingerprint import FingerprintIndex
+from local_fakes import FakeS3Client
+from s3_inventory import S3Inventory
+
+generate = importlib.import_module("03_generate_metadata")
+
+def task(video_id, file_key, scheduled_date, reference_link="https://example.com"):
+    return {
+        "video": {"video_id": video_id, "reference_link": reference_link},
+        "file_key": file_key,
+        "file_type": "pdf",
+        "scheduled_date": scheduled_date
+    }
+
+@pytest.fixture
+def inventory():
+    s3 = FakeS3Client({
+        "docs/a.pdf": b"same document",
+        "docs/a-copy.pdf": b"same document",
+        "docs/b.pdf": b"other document",
+        "docs/a-again.pdf": b"same document"
+    })
+    return S3Inventory(s3, generate.S3_BUCKET).load()
+
+def test_identical_documents_are_analyzed_once(inventory, tmp_path):
+    tasks = [
+        task("v1", "docs/a.pdf", "2025-01-01"),
+        task("v2", "docs/b.pdf", "2025-01-02"),
+        task("v3", "docs/a-copy.pdf", "2025-01-03"),
+        task("v4", "docs/a-again.pdf", "2025-01-04", reference_link="https://other.example.com")
+    ]
+    unique = generate.deduplicate_tasks(tasks, inventory, index=FingerprintIndex(str(tmp_path / "fingerprints.json")))
+
+    # Mesmo conteúdo com outro link de referência gera um prompt diferente
+    assert [item["video"]["video_id"] for item in unique] == ["v1", "v2", "v4"]
+    assert [item["video"]["video_id"] for item in unique[0]["duplicates"]] == ["v3"]
+    assert "duplicates" not in unique[1]
+
+def test_fan_out_copies_metadata_with_each_video_date(inventory, tmp_path):
+    tasks = [task("v1", "docs/a.pdf", "2025-01-01"), task("v3", "docs/a-copy.pdf", "2025-01-03")]
+    primary, = generate.deduplicate_tasks(tasks, inventory, index=FingerprintIndex(str(tmp_path / "fingerprints.json")))
+    new_metadata = {"v1": {"scheduledPublishTime": "2025-01-01T16:30:00Z", "default": {"title": "T", "tags": ["AWS"]}}}
+
+    result = generate.fan_out_metadata(primary, new_metadata)
+
+    assert result["v3"]["scheduledPublishTime"] == "2025-01-03T16:30:00Z"
+    assert result["v3"]["default"] == result["v1"]["default"]
+    # Cópia independente: alterar a duplicata não altera o original
+    result["v3"]["default"]["tags"].append("Copy")
+    assert result["v1"]["default"]["tags"] == ["AWS"]
+
+def test_fan_out_without_generated_metadata_is_noop():
+    assert generate.fan_out_metadata(task("v1", "docs/a.pdf", "2025-01-01"), None) is None
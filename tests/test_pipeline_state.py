@@ -0,0 +1,65 @@
+import json
+import pytest
+from pipeline_state import FAILED, GENERATED, PENDING, UPLOADED, PipelineState
+
+@pytest.fixture
+def paths(tmp_path):
+    return str(tmp_path / "generated_metadata.json"), str(tmp_path / "pipeline_journal.jsonl")
+
+def test_journal_replay_restores_states_and_metadata(paths):
+    state = PipelineState.load(*paths)
+    state.record("v1", PENDING)
+    state.record("v1", GENERATED, metadata={"default": {"title": "T1"}})
+    state.record("v2", FAILED, stage="generate", error="timeout")
+    state.record("v1", UPLOADED, result="updated")
+
+    reloaded = PipelineState.load(*paths)
+    assert reloaded.statuses() == {"v1": UPLOADED, "v2": FAILED}
+    assert reloaded.metadata == {"v1": {"default": {"title": "T1"}}}
+    assert reloaded.entry("v2")["stage"] == "generate"
+    assert reloaded.video_ids(FAILED, stage="generate") == ["v2"]
+
+def test_torn_last_line_is_ignored_and_truncated(paths):
+    metadata_file, journal_file = paths
+    state = PipelineState.load(*paths)
+    state.record("v1", GENERATED, metadata={"default": {"title": "T1"}})
+    with open(journal_file, "rb") as file:
+        valid = file.read()
+
+    # Processo interrompido no meio da escrita do registro seguinte
+    with open(journal_file, "ab") as file:
+        file.write(b'{"video_id": "v1", "state": "uploa')
+
+    reloaded = PipelineState.load(*paths)
+    assert reloaded.state_of("v1") == GENERATED
+    with open(journal_file, "rb") as file:
+        assert file.read() == valid
+
+    # O próximo registro começa em linha nova e é reaplicado normalmente
+    reloaded.record("v1", UPLOADED)
+    assert PipelineState.load(*paths).state_of("v1") == UPLOADED
+
+def test_invalid_transition_is_rejected(paths):
+    state = PipelineState.load(*paths)
+    with pytest.raises(ValueError):
+        state.record("v1", UPLOADED)
+
+def test_metadata_without_journal_counts_as_generated(paths):
+    metadata_file, _ = paths
+    with open(metadata_file, "w", encoding="utf-8") as file:
+        json.dump({"v1": {"default": {"title": "T1"}}}, file)
+    assert PipelineState.load(*paths).state_of("v1") == GENERATED
+
+def test_compact_keeps_one_line_per_video(paths):
+    metadata_file, journal_file = paths
+    state = PipelineState.load(*paths)
+    for video_id in ("v2", "v1"):
+        state.record(video_id, PENDING)
+        state.record(video_id, GENERATED, metadata={"id": video_id})
+    state.compact(order=["v1", "v2"])
+
+    with open(journal_file, "r", encoding="utf-8") as file:
+        assert [json.loads(line)["video_id"] for line in file] == ["v2", "v1"]
+    with open(metadata_file, "r", encoding="utf-8") as file:
+        assert list(json.load(file)) == ["v1", "v2"]
+    assert PipelineState.load(*paths).statuses() == {"v1": GENERATED, "v2": GENERATED}
@@ -0,0 +1,89 @@
+import importlib
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+from local_fakes import FakeYouTubeClient
+
+update = importlib.import_module("04_update_youtube")
+
+PUBLISH_AT = "2099-01-01T16:30:00Z"
+
+def generated_metadata(title="Title"):
+    return {
+        "scheduledPublishTime": PUBLISH_AT,
+        "default": {"title": title, "description": "Description", "tags": ["AWS", "Tutorial"]},
+        "localizations": {"pt": {"title": "Título", "description": "Descrição"}}
+    }
+
+def channel_video(metadata):
+    """Vídeo no canal já com os metadados enviados (publishAt em outro formato ISO)"""
+    return {
+        "snippet": {
+            "title": metadata["default"]["title"],
+            "description": metadata["default"]["description"],
+            "tags": metadata["default"]["tags"],
+            "defaultLanguage": "en",
+            "categoryId": "27",
+            "channelTitle": "Canal"
+        },
+        "localizations": dict(metadata["localizations"]),
+        "status": {"privacyStatus": "private", "publishAt": "2099-01-01T16:30:00+00:00", "selfDeclaredMadeForKids": False}
+    }
+
+def test_quota_tracker_charges_and_respects_headroom():
+    quota = update.QuotaTracker(100)
+    quota.charge("list", 1, headroom=50)
+    quota.charge("update", 50)
+    assert (quota.used, quota.remaining, quota.calls) == (51, 49, {"list": 1, "update": 1})
+
+    with pytest.raises(update.QuotaExhausted):
+        quota.charge("list", 1, headroom=50)
+    assert quota.used == 51
+
+    quota.exhaust()
+    assert quota.remaining == 0
+
+def test_unchanged_video_skips_update():
+    metadata = generated_metadata()
+    youtube = FakeYouTubeClient(videos={"v1": channel_video(metadata)})
+    quota = update.QuotaTracker(1000)
+
+    assert update.update_video_metadata(youtube, "v1", metadata, quota) == update.UNCHANGED
+    assert youtube.update_calls == 0
+    assert quota.used == update.LIST_QUOTA_COST
+
+def test_only_changed_parts_are_sent():
+    youtube = FakeYouTubeClient(videos={"v1": channel_video(generated_metadata())})
+    quota = update.QuotaTracker(1000)
+
+    result = update.update_video_metadata(youtube, "v1", generated_metadata(title="New title"), quota)
+    assert result == update.UPDATED
+    assert youtube.update_calls == 1
+    assert quota.used == update.LIST_QUOTA_COST + update.UPDATE_QUOTA_COST
+    assert youtube.video_store["v1"]["snippet"]["title"] == "New title"
+    # status e localizations não mudaram e não foram enviados
+    assert youtube.video_store["v1"]["status"]["publishAt"] == "2099-01-01T16:30:00+00:00"
+
+def test_batch_prefetch_and_budget_leave_remaining_videos_pending():
+    metadata = {f"v{index}": generated_metadata(title=f"New {index}") for index in range(4)}
+    youtube = FakeYouTubeClient(videos={video_id: channel_video(generated_metadata()) for video_id in metadata})
+    quota = update.QuotaTracker(update.LIST_QUOTA_COST + 2 * update.UPDATE_QUOTA_COST)
+
+    states = update.prefetch_video_states(youtube, list(metadata), quota)
+    results = update.update_all_videos(lambda: youtube, metadata, quota, max_workers=1, states=states)
+
+    assert youtube.list_calls == 1
+    assert list(results.values()) == [update.UPDATED, update.UPDATED, update.PENDING, update.PENDING]
+    assert quota.remaining == 0
+
+def test_quota_exceeded_error_exhausts_budget():
+    youtube = FakeYouTubeClient(videos={"v1": channel_video(generated_metadata())})
+
+    def quota_exceeded(operation):
+        raise HttpError(httplib2.Response({"status": 403}), b'{"error": {"errors": [{"reason": "quotaExceeded"}]}}')
+    youtube.record_call = quota_exceeded
+    quota = update.QuotaTracker(1000)
+
+    with pytest.raises(update.QuotaExhausted):
+        update.update_video_metadata(youtube, "v1", generated_metadata(), quota)
+    assert quota.remaining == 0
@@ -0,0 +1,49 @@
+import importlib
+from local_fakes import FakeYouTubeClient
+from video_catalog import PLACEHOLDER_FILE_NAME
+
+videos_table = importlib.import_module("01_videos_table")
+
+def existing_rows(count):
+    return {
+        f"old{index:03d}": {
+            "video_id": f"old{index:03d}",
+            "video_title": f"Old {index}",
+            "file_name": f"old{index:03d}.mp4",
+            "file_type": "pdf",
+            "reference_link": "https://example.com"
+        }
+        for index in range(count)
+    }
+
+def channel_playlist(new_count, old_count):
+    """Playlist de uploads do mais recente para o mais antigo"""
+    new = [(f"new{index}", f"New {index}") for index in range(new_count)]
+    old = [(f"old{index:03d}", f"Old {index} (renamed)") for index in range(old_count)]
+    return new + old
+
+def test_incremental_sync_stops_on_first_known_page():
+    youtube = FakeYouTubeClient(playlist=channel_playlist(5, 120))
+    rows, new_count, pages, complete = videos_table.sync_videos(youtube, "UU123", existing_rows(120), full_sync=False)
+
+    assert (new_count, pages, complete) == (5, 1, False)
+    assert youtube.playlist_calls == 1
+    assert len(rows) == 125
+    assert rows["new0"]["file_name"] == PLACEHOLDER_FILE_NAME
+    # Títulos dos vídeos conhecidos da página lida são atualizados; colunas manuais preservadas
+    assert rows["old000"]["video_title"] == "Old 0 (renamed)"
+    assert rows["old000"]["file_name"] == "old000.mp4"
+    assert rows["old119"]["video_title"] == "Old 119"
+
+def test_full_sync_reads_every_page():
+    youtube = FakeYouTubeClient(playlist=channel_playlist(5, 120))
+    rows, new_count, pages, complete = videos_table.sync_videos(youtube, "UU123", existing_rows(120), full_sync=True)
+
+    assert (new_count, pages, complete) == (5, 3, True)
+    assert youtube.playlist_calls == 3
+    assert rows["old119"]["video_title"] == "Old 119 (renamed)"
+
+def test_missing_sync_mark_forces_full_sync():
+    assert videos_table.needs_full_sync({}, "UU123")
+    assert videos_table.needs_full_sync({"playlist_id": "UU999", "full_sync_at": "2025-01-01T00:00:00+00:00"}, "UU123")
+    assert not videos_table.needs_full_sync({"playlist_id": "UU123", "full_sync_at": "2025-01-01T00:00:00+00:00"}, "UU123")
@@ -0,0 +1,263 @@
+import csv
+import json
+import os
+import sqlite3
+import threading
+
+# Catálogo de vídeos em SQLite indexado, importado de videos_table.csv (que continua sendo a fonte editável)
+
+CSV_PATH = os.path.join("YouTube_Data", "videos_table.csv")
+CATALOG_DB = os.path.join("YouTube_Data", "video_catalog.sqlite3")
+CSV_COLUMNS = ["video_id", "video_title", "file_name", "file_type", "reference_link"]
+PLACEHOLDER_FILE_NAME = "ADICIONAR_NOME_ARQUIVO_MANUALMENTE"
+IMPORT_BATCH_SIZE = 5000  # Linhas do CSV gravadas por executemany
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    video_id TEXT PRIMARY KEY,
+    video_title TEXT NOT NULL DEFAULT '',
+    file_name TEXT NOT NULL DEFAULT '',
+    file_type TEXT NOT NULL DEFAULT 'pdf',
+    reference_link TEXT NOT NULL DEFAULT '',
+    extra TEXT,
+    csv_row INTEGER,
+    position INTEGER,
+    status TEXT,
+    document_etag TEXT,
+    prompt_version TEXT,
+    scheduled_date TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_videos_file_name ON videos(file_name);
+CREATE INDEX IF NOT EXISTS idx_videos_status ON videos(status);
+CREATE INDEX IF NOT EXISTS idx_videos_position ON videos(position);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+# Colunas gravadas na geração: ETag do documento, versão do prompt e data agendada usados
+GENERATION_COLUMNS = ["document_etag", "prompt_version", "scheduled_date"]
+VIDEO_COLUMNS = "video_id, video_title, file_name, file_type, reference_link, position, status, " + ", ".join(GENERATION_COLUMNS)
+
+class VideoCatalog:
+    """Vídeos do canal em SQLite, com índices por video_id, file_name e status
+
+    O CSV continua sendo editado manualmente: ao abrir, o catálogo é
+    reimportado se o arquivo mudou (tamanho ou data de modificação),
+    preservando o status de pipeline de cada vídeo. position é a ordem do
+    vídeo entre os que têm file_name preenchido (base do agendamento em
+    03_generate_metadata.py). Consultas percorrem o cursor, sem carregar a
+    tabela inteira.
+    """
+
+    def __init__(self, db_path=CATALOG_DB, csv_path=CSV_PATH):
+        self.db_path = db_path
+        self.csv_path = csv_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(db_path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")  # Seguro com WAL; o CSV pode ser reimportado
+        self.connection.executescript(SCHEMA)
+        self._add_missing_columns()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, db_path=CATALOG_DB, csv_path=CSV_PATH):
+        """Abre o catálogo e sincroniza com o CSV se ele mudou"""
+        catalog = cls(db_path, csv_path)
+        catalog.sync_csv()
+        return catalog
+
+    def _add_missing_columns(self):
+        """Acrescenta as colunas de geração a catálogos criados antes delas"""
+        existing = {row["name"] for row in self.connection.execute("PRAGMA table_info(videos)")}
+        for column in GENERATION_COLUMNS:
+            if column not in existing:
+                self.connection.execute(f"ALTER TABLE videos ADD COLUMN {column} TEXT")
+        self.connection.commit()
+
+    def _meta(self, key):
+        row = self.connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def _csv_signature(self):
+        info = os.stat(self.csv_path)
+        return f"{info.st_size}:{info.st_mtime_ns}"
+
+    def sync_csv(self, force=False):
+        """Reimporta o CSV se ele mudou desde a última importação; retorna True se importou"""
+        if not os.path.exists(self.csv_path):
+            return False
+        signature = self._csv_signature()
+        if not force and self._meta("csv_signature") == signature:
+            return False
+        self.import_csv(signature)
+        return True
+
+    def import_csv(self, signature=None):
+        """Importa o CSV em uma transação, em blocos de IMPORT_BATCH_SIZE linhas
+
+        Vídeos removidos do CSV saem do catálogo; o status dos demais é mantido.
+        """
+        upsert = """
+            INSERT INTO videos (video_id, video_title, file_name, file_type, reference_link, extra, csv_row, position)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(video_id) DO UPDATE SET
+                video_title = excluded.video_title,
+                file_name = excluded.file_name,
+                file_type = excluded.file_type,
+                reference_link = excluded.reference_link,
+                extra = excluded.extra,
+                csv_row = excluded.csv_row,
+                position = excluded.position
+        """
+        with self._lock, self.connection:
+            self.connection.execute("UPDATE videos SET csv_row = NULL, position = NULL")
+            with open(self.csv_path, "r", newline="", encoding="utf-8") as file:
+                reader = csv.DictReader(file)
+                extra_columns = [name for name in (reader.fieldnames or []) if name not in CSV_COLUMNS]
+                batch = []
+                position = 0
+                for csv_row, row in enumerate(reader):
+                    file_name = row.get("file_name") or ""
+                    assigned = file_name != PLACEHOLDER_FILE_NAME
+                    position += assigned
+                    extra = {name: row.get(name, "") for name in extra_columns}
+                    batch.append((
+                        row["video_id"],
+                        row.get("video_title") or "",
+                        file_name,
+                        (row.get("file_type") or "pdf").lower(),  # Normaliza para minúsculo
+                        (row.get("reference_link") or "").strip(),  # Link opcional
+                        json.dumps(extra, ensure_ascii=False) if extra else None,
+                        csv_row,
+                        position if assigned else None
+                    ))
+                    if len(batch) >= IMPORT_BATCH_SIZE:
+                        self.connection.executemany(upsert, batch)
+                        batch = []
+                self.connection.executemany(upsert, batch)
+            self.connection.execute("DELETE FROM videos WHERE csv_row IS NULL")
+            self.connection.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('csv_signature', ?)",
+                (signature or self._csv_signature(),)
+            )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('extra_columns', ?)",
+                (json.dumps(extra_columns),)
+            )
+
+    def iter_videos(self, file_type=None, statuses=None):
+        """Vídeos com file_name preenchido, na ordem do CSV
+
+        file_type filtra pelo tipo; statuses restringe ao status de pipeline
+        (None na lista seleciona vídeos ainda sem status).
+        """
+        query = f"SELECT {VIDEO_COLUMNS} FROM videos WHERE position IS NOT NULL"
+        params = []
+        if file_type is not None:
+            query += " AND file_type = ?"
+            params.append(file_type)
+        if statuses is not None:
+            named = [status for status in statuses if status is not None]
+            conditions = []
+            if named:
+                conditions.append(f"status IN ({', '.join('?' for _ in named)})")
+                params.extend(named)
+            if None in statuses:
+                conditions.append("status IS NULL")
+            query += f" AND ({' OR '.join(conditions) or '0'})"
+        query += " ORDER BY position"
+        for row in self.connection.execute(query, params):
+            yield dict(row)
+
+    def series_titles(self, limit=None):
+        """Títulos de cada série na ordem do CSV: {reference_link: [títulos]}
+
+        Consulta só reference_link e video_title (sem montar os vídeos);
+        limit corta a lista de cada série no SQL.
+        """
+        query = """
+            SELECT reference_link, video_title FROM (
+                SELECT reference_link, video_title, position,
+                       ROW_NUMBER() OVER (PARTITION BY reference_link ORDER BY position) AS number
+                FROM videos WHERE position IS NOT NULL AND reference_link != ''
+            ) WHERE ? IS NULL OR number <= ? ORDER BY position
+        """
+        series = {}
+        for row in self.connection.execute(query, (limit, limit)):
+            series.setdefault(row["reference_link"], []).append(row["video_title"])
+        return series
+
+    def get(self, video_id):
+        """Vídeo pelo ID ou None"""
+        row = self.connection.execute("SELECT * FROM videos WHERE video_id = ?", (video_id,)).fetchone()
+        return dict(row) if row else None
+
+    def find_by_file_name(self, file_name):
+        """Vídeos que usam o arquivo file_name"""
+        return [dict(row) for row in self.connection.execute("SELECT * FROM videos WHERE file_name = ? ORDER BY csv_row", (file_name,))]
+
+    def set_statuses(self, statuses):
+        """Grava o status de pipeline de vários vídeos ({video_id: status})"""
+        with self._lock, self.connection:
+            self.connection.executemany(
+                "UPDATE videos SET status = ? WHERE video_id = ?",
+                [(status, video_id) for video_id, status in statuses.items()]
+            )
+
+    def record_generations(self, generations):
+        """Grava ETag do documento, versão do prompt e data de cada vídeo gerado
+
+        generations é {video_id: (document_etag, prompt_version, scheduled_date)};
+        03_generate_metadata.py compara esses valores com o inventário do S3
+        para saber quais vídeos gerados precisam ser revistos.
+        """
+        with self._lock, self.connection:
+            self.connection.executemany(
+                "UPDATE videos SET document_etag = ?, prompt_version = ?, scheduled_date = ? WHERE video_id = ?",
+                [(*values, video_id) for video_id, values in generations.items()]
+            )
+
+    def sync_statuses(self, state):
+        """Copia os estados de um PipelineState para a coluna status"""
+        self.set_statuses(state.statuses())
+
+    def count_by_status(self):
+        """Contagem de vídeos com file_name preenchido por status"""
+        rows = self.connection.execute(
+            "SELECT status, COUNT(*) AS total FROM videos WHERE position IS NOT NULL GROUP BY status"
+        )
+        return {row["status"]: row["total"] for row in rows}
+
+    def export_csv(self, csv_path=None):
+        """Grava o catálogo como CSV (colunas do CSV original, na mesma ordem de linhas)"""
+        csv_path = csv_path or self.csv_path
+        extra_columns = json.loads(self._meta("extra_columns") or "[]")
+        temp_path = f"{csv_path}.tmp"
+        with open(temp_path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.DictWriter(file, fieldnames=CSV_COLUMNS + extra_columns, restval="")
+            writer.writeheader()
+            for row in self.connection.execute("SELECT * FROM videos ORDER BY csv_row"):
+                record = {column: row[column] for column in CSV_COLUMNS}
+                record.update(json.loads(row["extra"]) if row["extra"] else {})
+                writer.writerow(record)
+        os.replace(temp_path, csv_path)
+        if csv_path == self.csv_path:
+            with self._lock, self.connection:
+                self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('csv_signature', ?)", (self._csv_signature(),))
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def load_video_data(file_type=None, statuses=None):
+    """Carrega dados dos vídeos com file_name preenchido (via catálogo SQLite)"""
+    with VideoCatalog.open() as catalog:
+        return list(catalog.iter_videos(file_type, statuses))